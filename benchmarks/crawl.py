@@ -0,0 +1,200 @@
+"""
+End-to-end crawl benchmark for HCMUT LMS Crawler.
+Starts the mock Moodle server, runs MainCrawler against it once per
+combination of workers, parser backend and storage backend (each in its own
+process, so peak memory is measured per run) and reports pages/sec, CPU per
+page, peak RSS and time spent writing output.
+
+Usage:
+    python -m benchmarks.crawl [--workers 1 4 8] [--parser bs4 lxml] [--storage files archive]
+                               [--users 1000] [--latency 0.02] [--error-rate 0.01] [--ws] [--json results.json]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_lms import MockLmsGraph, MockLmsServer
+
+
+def _histogram_sum(snapshot: dict, name: str) -> float:
+    """Total of a histogram over all labels."""
+    return sum(value["sum"] for value in snapshot.get(name, {}).get("values", []))
+
+
+def run_one(args) -> dict:
+    """
+    Run one crawl in this process and measure it.
+
+    Args:
+        args: Parsed run-one arguments
+
+    Returns:
+        Measurements of the run
+    """
+    os.environ.update({
+        "BASE_URL": args.base_url,
+        "COOKIE": "benchmark",
+        "OUTPUT_DIR": args.output_dir,
+        "NUMBER_OF_WORKERS": str(args.workers),
+        "PARSER_BACKEND": args.parser,
+        "STORAGE_BACKEND": args.storage,
+        "FETCH_ENGINE": args.fetch_engine,
+        "MIN_USER_ID": "1",
+        "MAX_USER_ID": str(args.max_user_id),
+        "RATE_LIMIT": "0",
+        "LISTING_FIRST": str(args.listing_first).lower(),
+        "WS_TOKEN": "benchmark" if args.ws else "",
+    })
+    # Per-page log lines would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from main import MainCrawler
+    from utils.config import Config
+    from utils.metrics import METRICS
+
+    config = Config(env_file=os.devnull)
+    crawler = MainCrawler(config)
+
+    started = time.perf_counter()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    try:
+        crawler.run()
+    finally:
+        crawler.fetcher.close()
+    elapsed = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    snapshot = METRICS.snapshot()
+    pages = sum(
+        value["value"] for value in snapshot["lms_requests_total"]["values"]
+        if value["labels"]["status"] == "200"
+    ) if "lms_requests_total" in snapshot else 0
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss_mb = usage_after.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    return {
+        "workers": args.workers,
+        "parser": args.parser,
+        "storage": args.storage,
+        "fetch_engine": args.fetch_engine,
+        "pages": pages,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed else 0,
+        "cpu_ms_per_page": cpu / pages * 1000 if pages else 0,
+        "peak_rss_mb": peak_rss_mb,
+        "write_seconds": _histogram_sum(snapshot, "lms_save_seconds") + _histogram_sum(snapshot, "lms_export_seconds"),
+    }
+
+
+def run_matrix(args) -> list:
+    """
+    Start the mock server and run every configuration in a child process.
+
+    Args:
+        args: Parsed benchmark arguments
+
+    Returns:
+        List of measurements
+    """
+    graph = MockLmsGraph(
+        semesters=args.semesters,
+        courses_per_semester=args.courses_per_semester,
+        users=args.users,
+        alert_rate=args.alert_rate
+    )
+    server = MockLmsServer(graph, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    server.start()
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    results = []
+    try:
+        for workers, parser, storage in itertools.product(args.workers, args.parser, args.storage):
+            output_dir = tempfile.mkdtemp(prefix="lms-bench-")
+            command = [
+                sys.executable, "-m", "benchmarks.crawl", "run-one",
+                "--base-url", server.base_url,
+                "--output-dir", output_dir,
+                "--workers", str(workers),
+                "--parser", parser,
+                "--storage", storage,
+                "--fetch-engine", args.fetch_engine,
+                "--max-user-id", str(args.users if args.mode == "sweep" else 0),
+            ] + (["--listing-first"] if args.listing_first else []) + (["--ws"] if args.ws else [])
+            try:
+                completed = subprocess.run(command, cwd=repo_root, capture_output=True, text=True)
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+            if completed.returncode != 0 or not completed.stdout.strip():
+                print(f"Run failed (workers={workers}, parser={parser}, storage={storage}):\n{completed.stderr}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"workers={workers:<3} parser={parser:<10} storage={storage:<8} "
+                f"{result['pages']:>6} pages  {result['pages_per_second']:>8.1f} pages/s  "
+                f"{result['cpu_ms_per_page']:>6.2f} ms CPU/page  {result['peak_rss_mb']:>7.1f} MB peak RSS  "
+                f"{result['write_seconds']:>6.3f} s writing"
+            )
+    finally:
+        server.stop()
+    return results
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="End-to-end crawl benchmark against a mock Moodle server")
+    subparsers = parser.add_subparsers(dest="command")
+
+    one = subparsers.add_parser("run-one", help="internal: run a single measured crawl")
+    one.add_argument("--base-url", required=True)
+    one.add_argument("--output-dir", required=True)
+    one.add_argument("--workers", type=int, default=4)
+    one.add_argument("--parser", default="bs4")
+    one.add_argument("--storage", default="files")
+    one.add_argument("--fetch-engine", default="requests")
+    one.add_argument("--max-user-id", type=int, default=0)
+    one.add_argument("--listing-first", action="store_true")
+    one.add_argument("--ws", action="store_true")
+
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="NUMBER_OF_WORKERS values")
+    parser.add_argument("--parser", nargs="+", default=["bs4"], help="PARSER_BACKEND values")
+    parser.add_argument("--storage", nargs="+", default=["files"], help="STORAGE_BACKEND values")
+    parser.add_argument("--fetch-engine", default="requests", help="FETCH_ENGINE")
+    parser.add_argument("--mode", choices=["graph", "sweep"], default="graph",
+                        help="graph: discover semesters and follow links; sweep: brute-force user IDs 1..users")
+    parser.add_argument("--semesters", type=int, default=3)
+    parser.add_argument("--courses-per-semester", type=int, default=50)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--alert-rate", type=float, default=0.1, help="share of user IDs showing an error alert")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random extra seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 503")
+    parser.add_argument("--listing-first", action="store_true",
+                        help="LISTING_FIRST: take course names and teachers from the semester listings")
+    parser.add_argument("--ws", action="store_true",
+                        help="WS_TOKEN: crawl through the web-service backend instead of HTML pages")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.command == "run-one":
+        print(json.dumps(run_one(args)))
+        return
+
+    results = run_matrix(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
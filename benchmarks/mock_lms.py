@@ -0,0 +1,437 @@
+"""
+Mock Moodle server for HCMUT LMS Crawler benchmarks.
+Serves synthetic /course/, /course/index.php?categoryid=, /enrol/index.php?id=,
+/user/profile.php?id= and /user/index.php?id= (participants) pages with the
+markup the crawler parses, over a
+generated semester/course/user graph, with configurable latency and errors.
+The same graph is served as JSON by the web-service functions the
+web-service backend calls (/webservice/rest/server.php).
+
+Usage:
+    python -m benchmarks.mock_lms [--port 8800] [--semesters 3] [--courses-per-semester 50] [--users 1000]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+WS_PATH = "/webservice/rest/server.php"
+
+# Page chrome repeated on every Moodle page, so parsing costs are realistic
+_CHROME = (
+    '<nav class="navbar fixed-top navbar-light bg-white navbar-expand" aria-label="Site navigation">'
+    + "".join(f'<div class="nav-item"><a class="nav-link" href="/my/?menu={i}">Menu item {i}</a></div>' for i in range(40))
+    + "</nav>"
+    + '<div id="page-footer"><div class="footer-content">'
+    + "".join(f'<p class="footer-line">Footer text line {i}, Ho Chi Minh City University of Technology</p>' for i in range(20))
+    + "</div></div>"
+)
+
+
+def _page(title: str, content: str) -> str:
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        f'<script>M.cfg = {{"sesskey":"{random.getrandbits(40):x}"}};</script></head>'
+        f'<body id="page">{_CHROME}<div id="page-content"><div role="main">{content}</div></div></body></html>'
+    )
+
+
+class MockLmsGraph:
+    """Deterministic semester/course/user graph."""
+
+    def __init__(
+        self,
+        semesters: int = 3,
+        courses_per_semester: int = 50,
+        users: int = 1000,
+        teachers_per_course: int = 2,
+        courses_per_user: int = 5,
+        alert_rate: float = 0.1,
+        listing_teacher_rate: float = 1.0,
+        seed: int = 0
+    ):
+        """
+        Generate the graph.
+
+        Args:
+            semesters: Number of semester categories
+            courses_per_semester: Number of courses listed in each semester
+            users: Number of user IDs (1..users)
+            teachers_per_course: Number of teachers on each course page
+            courses_per_user: Number of courses on each user profile
+            alert_rate: Share of user IDs that show an error alert instead of a profile
+            listing_teacher_rate: Share of courses whose box in the semester listing shows their teachers
+            seed: Random seed
+        """
+        rng = random.Random(seed)
+        self.users = users
+        self.semesters: Dict[int, List[int]] = {}
+        course_ids = []
+        for category_id in range(1, semesters + 1):
+            courses = [category_id * 100000 + i for i in range(courses_per_semester)]
+            self.semesters[category_id] = courses
+            course_ids.extend(courses)
+
+        self.course_teachers = {
+            course_id: rng.sample(range(1, users + 1), min(teachers_per_course, users)) for course_id in course_ids
+        }
+        self.user_courses = {
+            user_id: rng.sample(course_ids, min(courses_per_user, len(course_ids))) for user_id in range(1, users + 1)
+        }
+        self.dead_users = {user_id for user_id in range(1, users + 1) if rng.random() < alert_rate}
+        self.listed_teachers = {course_id for course_id in course_ids if rng.random() < listing_teacher_rate}
+
+        # Participants: the teachers and every existing user enrolled in the course
+        participants = {course_id: set(teachers) for course_id, teachers in self.course_teachers.items()}
+        for user_id, courses in self.user_courses.items():
+            if user_id not in self.dead_users:
+                for course_id in courses:
+                    participants[course_id].add(user_id)
+        self.course_participants = {course_id: sorted(users) for course_id, users in participants.items()}
+
+    def course_list_page(self) -> str:
+        options = "".join(
+            f'<option value="/course/index.php?categoryid={category_id}">'
+            f"Học kỳ (Semester) {category_id}/2025-2026 / Khoa {category_id} / Ngành {category_id}</option>"
+            for category_id in self.semesters
+        )
+        return _page("Courses", f'<select class="custom-select urlselect"><option value="">Choose...</option>{options}</select>')
+
+    @staticmethod
+    def course_name(course_id: int) -> str:
+        return f"Course {course_id} (CO{course_id % 10000:04d}) (CQ_HK252) [L01]"
+
+    def _teacher_items(self, course_id: int) -> str:
+        return "".join(
+            f'<li>Teacher: <a href="/user/profile.php?id={user_id}&course={course_id}">Teacher {user_id}</a></li>'
+            for user_id in self.course_teachers.get(course_id, [])
+        )
+
+    def semester_page(self, category_id: int) -> str:
+        boxes = "".join(
+            f'<div class="coursebox clearfix"><div class="info"><h3 class="coursename">'
+            f'<a class="aalink" href="/course/view.php?id={course_id}">{self.course_name(course_id)}</a></h3></div>'
+            + (f'<div class="content"><ul class="teachers">{self._teacher_items(course_id)}</ul></div>'
+               if course_id in self.listed_teachers else "")
+            + "</div>"
+            for course_id in self.semesters.get(category_id, [])
+        )
+        return _page(f"Category {category_id}", f'<div class="courses category-browse">{boxes}</div>')
+
+    def course_page(self, course_id: int) -> str:
+        return _page(
+            f"Enrol {course_id}",
+            f'<div class="coursebox"><h3 class="coursename">{self.course_name(course_id)}</h3>'
+            f'<ul class="teachers">{self._teacher_items(course_id)}</ul></div>'
+        )
+
+    def user_page(self, user_id: int) -> str:
+        if user_id in self.dead_users or not 1 <= user_id <= self.users:
+            return _page("Error", '<div class="alert alert-danger">Invalid user</div>')
+        courses = "".join(
+            f'<li><a href="/course/user.php?id={course_id}&course={course_id}&showallcourses=1">Course {course_id}</a></li>'
+            for course_id in self.user_courses[user_id]
+        )
+        return _page(
+            f"User {user_id}",
+            f'<div class="page-header-headings"><h1>User {user_id}</h1></div>'
+            f'<div class="userprofile"><div class="description">Giảng viên</div></div>'
+            f'<div class="profile_tree"><section class="node_category"><dl>'
+            f"<dt>Email address</dt><dd>user{user_id}@hcmut.edu.vn</dd>"
+            f"<dt>Country</dt><dd>Vietnam</dd><dt>City/town</dt><dd>Ho Chi Minh</dd>"
+            f"<dt>Timezone</dt><dd>Asia/Ho_Chi_Minh</dd></dl></section>"
+            f'<section class="node_category"><ul>{courses}</ul></section></div>'
+        )
+
+
+    def participants_page(self, course_id: int, perpage: int, page: int) -> str:
+        participants = self.course_participants[course_id]
+        rows = "".join(
+            f'<tr id="user-index-participants-{course_id}_r{i}"><th class="cell c1">'
+            f'<a href="/user/view.php?id={user_id}&course={course_id}"><img class="userpicture" alt="">User {user_id}</a></th>'
+            f'<td class="cell c2">{"Teacher" if user_id in self.course_teachers[course_id] else "Student"}</td></tr>'
+            for i, user_id in enumerate(participants[page * perpage:(page + 1) * perpage])
+        )
+        return _page(
+            f"Participants {course_id}",
+            f'<div class="userlist"><p data-region="participant-count">{len(participants)} participants found</p>'
+            f'<table id="participants" class="generaltable"><tbody>{rows}</tbody></table></div>'
+        )
+
+    # Web-service functions (JSON)
+
+    def ws_categories(self) -> List[Dict[str, Any]]:
+        """core_course_get_categories: semester > faculty > major, majors holding the courses."""
+        categories = []
+        for category_id in self.semesters:
+            semester_id, faculty_id = 10000 + category_id, 20000 + category_id
+            categories += [
+                {"id": semester_id, "name": f"Học kỳ (Semester) {category_id}/2025-2026", "parent": 0,
+                 "path": f"/{semester_id}", "depth": 1},
+                {"id": faculty_id, "name": f"Khoa {category_id}", "parent": semester_id,
+                 "path": f"/{semester_id}/{faculty_id}", "depth": 2},
+                {"id": category_id, "name": f"Ngành {category_id}", "parent": faculty_id,
+                 "path": f"/{semester_id}/{faculty_id}/{category_id}", "depth": 3},
+            ]
+        for sortorder, category in enumerate(categories):
+            category["sortorder"] = sortorder
+        return categories
+
+    def ws_course(self, course_id: int) -> Dict[str, Any]:
+        return {
+            "id": course_id,
+            "fullname": self.course_name(course_id),
+            "displayname": self.course_name(course_id),
+            "shortname": f"CO{course_id % 10000:04d}_{course_id}",
+            "categoryid": course_id // 100000,
+            "contacts": [
+                {"id": user_id, "fullname": f"Teacher {user_id}"} for user_id in self.course_teachers[course_id]
+            ],
+        }
+
+    def ws_courses_by_field(self, field: str, value: str) -> Dict[str, Any]:
+        """core_course_get_courses_by_field for field "category" or "ids"."""
+        if field == "category":
+            course_ids = self.semesters.get(int(value), [])
+        else:
+            course_ids = [int(course_id) for course_id in value.split(",") if int(course_id) in self.course_teachers]
+        return {"courses": [self.ws_course(course_id) for course_id in course_ids], "warnings": []}
+
+    def ws_users_by_field(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        """core_user_get_users_by_field for field "id"; missing and dead users are left out."""
+        return [
+            {"id": user_id, "fullname": f"User {user_id}", "email": f"user{user_id}@hcmut.edu.vn",
+             "country": "VN", "city": "Ho Chi Minh", "timezone": "99", "description": "<p>Giảng viên</p>"}
+            for user_id in user_ids
+            if 1 <= user_id <= self.users and user_id not in self.dead_users
+        ]
+
+    def ws_enrolled_users(self, course_id: int, limit_from: int, limit_number: int) -> List[Dict[str, Any]]:
+        """core_enrol_get_enrolled_users with the userfields, limitfrom and limitnumber options."""
+        participants = self.course_participants[course_id]
+        end = limit_from + limit_number if limit_number else len(participants)
+        return [{"id": user_id} for user_id in participants[limit_from:end]]
+
+    def ws_users_courses(self, user_id: int) -> List[Dict[str, Any]]:
+        """core_enrol_get_users_courses."""
+        return [
+            {"id": course_id, "fullname": self.course_name(course_id), "shortname": f"CO{course_id % 10000:04d}_{course_id}"}
+            for course_id in self.user_courses.get(user_id, [])
+        ]
+
+
+class MockLmsServer:
+    """Threaded HTTP server for a MockLmsGraph."""
+
+    def __init__(
+        self,
+        graph: MockLmsGraph,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        session_lifetime: int = 0,
+        ws_token: str = ""
+    ):
+        """
+        Initialize server.
+
+        Args:
+            graph: Graph to serve
+            port: Port to listen on (0 = any free port)
+            latency: Seconds added to every response
+            jitter: Maximum random seconds added on top of latency
+            error_rate: Share of requests answered with HTTP 503
+            session_lifetime: Requests after which a cookie is logged out and
+                redirected to the login page (0 = sessions never expire)
+            ws_token: Token web-service calls must send (empty = any token)
+        """
+        self.graph = graph
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.ws_token = ws_token
+        self.session_requests = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond({})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._respond(parse_qs(self.rfile.read(length).decode("utf-8")))
+
+            def _respond(self, form: Dict[str, List[str]]):
+                cookie = self.headers.get("Cookie", "")
+                webservice = self.path.startswith(WS_PATH)
+                with server._lock:
+                    server.requests += 1
+                    server.session_requests[cookie] = server.session_requests.get(cookie, 0) + 1
+                    # Web-service calls are authenticated by their token
+                    logged_out = (
+                        server.session_lifetime and not webservice
+                        and server.session_requests[cookie] > server.session_lifetime
+                    )
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                if server.error_rate and random.random() < server.error_rate:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if logged_out and not self.path.startswith("/login/"):
+                    self.send_response(303)
+                    self.send_header("Location", "/login/index.php")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if webservice:
+                    body = json.dumps(server.render_ws(self.path, form), ensure_ascii=False)
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    body = server.render(self.path)
+                    content_type = "text/html; charset=utf-8"
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockLmsServer", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def render(self, path: str):
+        """Render the page for a request path, or None for unknown paths."""
+        parsed = urlparse(path)
+        query = parse_qs(parsed.query)
+        try:
+            if parsed.path == "/login/index.php":
+                return f'<html><body id="page-login-index">{_CHROME}<form id="login"></form></body></html>'
+            if parsed.path == "/course/index.php" and "categoryid" in query:
+                return self.graph.semester_page(int(query["categoryid"][0]))
+            if parsed.path in ("/course/", "/course/index.php"):
+                return self.graph.course_list_page()
+            if parsed.path == "/enrol/index.php":
+                return self.graph.course_page(int(query["id"][0]))
+            if parsed.path == "/user/profile.php":
+                return self.graph.user_page(int(query["id"][0]))
+            if parsed.path == "/user/index.php":
+                return self.graph.participants_page(
+                    int(query["id"][0]), int(query.get("perpage", ["20"])[0]), int(query.get("page", ["0"])[0])
+                )
+        except (KeyError, ValueError):
+            return None
+        return None
+
+    def render_ws(self, path: str, form: Dict[str, List[str]]) -> Any:
+        """
+        Answer a web-service call, with a Moodle exception object for errors.
+
+        Args:
+            path: Request path (wsfunction may be in the query string)
+            form: POSTed form fields
+        """
+        params = {**parse_qs(urlparse(path).query), **form}
+        arg = lambda name: params.get(name, [""])[0]
+        if self.ws_token and arg("wstoken") != self.ws_token:
+            return {"exception": "moodle_exception", "errorcode": "invalidtoken",
+                    "message": "Invalid token - token not found"}
+
+        function = arg("wsfunction")
+        try:
+            if function == "core_course_get_categories":
+                return self.graph.ws_categories()
+            if function == "core_course_get_courses_by_field":
+                return self.graph.ws_courses_by_field(arg("field"), arg("value"))
+            if function == "core_user_get_users_by_field":
+                values = sorted(
+                    (int(name[len("values["):-1]), int(value[0]))
+                    for name, value in params.items() if name.startswith("values[")
+                )
+                return self.graph.ws_users_by_field([user_id for _, user_id in values])
+            if function == "core_enrol_get_enrolled_users":
+                options = {
+                    arg(f"options[{i}][name]"): arg(f"options[{i}][value]")
+                    for i in range(len(params)) if f"options[{i}][name]" in params
+                }
+                return self.graph.ws_enrolled_users(
+                    int(arg("courseid")), int(options.get("limitfrom") or 0), int(options.get("limitnumber") or 0)
+                )
+            if function == "core_enrol_get_users_courses":
+                return self.graph.ws_users_courses(int(arg("userid")))
+        except (KeyError, ValueError) as e:
+            return {"exception": "invalid_parameter_exception", "errorcode": "invalidparameter", "message": str(e)}
+        return {"exception": "dml_missing_record_exception", "errorcode": "invalidrecord",
+                "message": f"Can't find data record in database table external_functions. ({function})"}
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Mock Moodle server for crawler benchmarks")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--semesters", type=int, default=3)
+    parser.add_argument("--courses-per-semester", type=int, default=50)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--alert-rate", type=float, default=0.1, help="share of user IDs showing an error alert")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random extra seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 503")
+    parser.add_argument("--session-lifetime", type=int, default=0, help="requests after which a cookie is logged out")
+    parser.add_argument("--listing-teacher-rate", type=float, default=1.0,
+                        help="share of courses whose semester listing box shows their teachers")
+    parser.add_argument("--ws-token", default="", help="token web-service calls must send (default: any)")
+    args = parser.parse_args()
+
+    graph = MockLmsGraph(
+        args.semesters, args.courses_per_semester, args.users,
+        alert_rate=args.alert_rate, listing_teacher_rate=args.listing_teacher_rate
+    )
+    server = MockLmsServer(
+        graph, args.port, args.latency, args.jitter, args.error_rate, args.session_lifetime, args.ws_token
+    )
+    print(f"Serving mock LMS on {server.base_url} (Ctrl+C to stop)")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Parse-once benchmark for HCMUT LMS Crawler.
+Measures the per-page CPU time of handling a freshly fetched user profile,
+comparing the previous flow (a separate BeautifulSoup parse for the
+div.alert check followed by extraction) with the current single extraction.
+
+Usage:
+    python -m benchmarks.parse_once [--limit 2000] [--backend bs4]
+"""
+import argparse
+import logging
+import time
+
+from bs4 import BeautifulSoup
+
+from crawler.parsers import create_parser
+from crawler.user_crawler import UserCrawler
+from utils.config import Config
+from utils.html_saver import create_html_store
+
+
+def main():
+    """Run the benchmark on the saved user profiles."""
+    parser = argparse.ArgumentParser(description="Parse-once benchmark on saved user profiles")
+    parser.add_argument("--limit", type=int, default=2000, help="maximum number of user pages")
+    parser.add_argument("--backend", default="bs4", help="parser backend used for extraction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("UserCrawler").setLevel(logging.ERROR)
+
+    config = Config(require_cookie=False)
+    html_saver = create_html_store(config.storage_backend, config.output_dir, config.archive_compression_level)
+    crawler = UserCrawler(config.base_url, {}, html_saver, parser=create_parser(args.backend))
+
+    pages = []
+    for user_id in html_saver.list_ids("users"):
+        if len(pages) >= args.limit:
+            break
+        pages.append((user_id, html_saver.read_html("users", user_id)))
+
+    if not pages:
+        print("No saved user profiles found")
+        return
+
+    # Previous flow: alert check on its own parse, then extraction parses again
+    started = time.process_time()
+    for user_id, html_content in pages:
+        if BeautifulSoup(html_content, "html.parser").find("div", class_="alert"):
+            continue
+        crawler.extract_user_info(html_content, user_id)
+    double_parse = time.process_time() - started
+
+    # Current flow: one extraction also performs the alert check
+    started = time.process_time()
+    for user_id, html_content in pages:
+        crawler.extract_user_info(html_content, user_id)
+    single_parse = time.process_time() - started
+
+    count = len(pages)
+    print(f"User pages:           {count}")
+    print(f"Parse twice (before): {double_parse / count * 1000:.3f} ms CPU/page")
+    print(f"Parse once (now):     {single_parse / count * 1000:.3f} ms CPU/page")
+    print(f"Saving:               {(1 - single_parse / double_parse) * 100:.1f}% per page")
+
+
+if __name__ == "__main__":
+    main()
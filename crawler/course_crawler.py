@@ -10,7 +10,15 @@ from utils.html_saver import HtmlSaver
 class CourseCrawler(LmsCrawler):
     """Crawler for course pages."""
     
-    def __init__(self, base_url: str, headers: dict, html_saver: HtmlSaver):
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        html_saver: HtmlSaver,
+        fetcher=None,
+        parser=None,
+        page_metadata=None
+    ):
         """
         Initialize course crawler.
         
@@ -18,10 +26,24 @@ class CourseCrawler(LmsCrawler):
             base_url: Base URL of the LMS
             headers: HTTP headers including authentication
             html_saver: HtmlSaver instance for file operations
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
         """
-        super().__init__(base_url, headers)
+        super().__init__(base_url, headers, fetcher, parser, page_metadata)
         self.html_saver = html_saver
     
+    def prefetch_course(self, course_url: str):
+        """
+        Start downloading the page crawl_course will need (see LmsCrawler.prefetch_page).
+        
+        Args:
+            course_url: URL of the course page
+        """
+        course_id = self.extract_id_from_url(course_url, "id")
+        if course_id:
+            self.prefetch_page("courses", course_id, self.build_url(f"enrol/index.php?id={course_id}"))
+    
     def crawl_course(self, course_url: str) -> Optional[Dict[str, any]]:
         """
         Crawl a single course page and save it.
@@ -38,27 +60,19 @@ class CourseCrawler(LmsCrawler):
             self.logger.warning(f"Could not extract course ID from: {course_url}")
             return None
         
-        # Check if file already exists (idempotency)
-        if self.html_saver.file_exists("courses", course_id):
-            self.logger.info(f"Course {course_id} already exists, skipping download")
-            # Still need to extract teacher links for processing
-            file_path = self.html_saver.get_file_path("courses", course_id)
-            with open(file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-        else:
-            # Fetch the page
-            course_url = self.build_url(f"enrol/index.php?id={course_id}")
-            html_content = self.fetch_page(course_url)
-            if not html_content:
-                self.logger.error(f"Failed to fetch course {course_id}")
-                return None
-            
-            # Save the HTML
-            file_path = self.html_saver.save_html("courses", course_id, html_content)
-            self.logger.info(f"Saved course {course_id} to {file_path}")
+        # Reuse the saved page unless it is missing or due for revalidation
+        enrol_url = self.build_url(f"enrol/index.php?id={course_id}")
+        html_content, result = self.load_page("courses", course_id, enrol_url)
+        if not html_content:
+            self.logger.error(f"Failed to fetch course {course_id}")
+            return None
         
         # Extract course information
         course_info = self.extract_course_info(html_content, course_id)
+        
+        # Save the HTML if it was downloaded
+        if result:
+            self.save_page("courses", course_id, enrol_url, result, course_info)
         return course_info
     
     def extract_course_info(self, html_content: str, course_id: str) -> Dict[str, any]:
@@ -72,43 +86,96 @@ class CourseCrawler(LmsCrawler):
         Returns:
             Dictionary with course information
         """
-        soup = self.parse_html(html_content)
-        if not soup:
+        fields = self.parse_fields(self.parser.extract_course, html_content)
+        if not fields:
             return {"course_id": course_id, "teacher_links": []}
         
-        # Extract course name
-        course_name = ""
-        coursename_div = soup.find("h3", class_="coursename")
-        if coursename_div:
-            course_name = self.normalize_text(coursename_div.get_text())
-        
-        # Extract teachers text
-        teachers_text = ""
-        teachers_ul = soup.find("ul", class_="teachers")
-        if teachers_ul:
-            teacher_items = teachers_ul.find_all("a")
-            teachers_text = ", ".join([self.normalize_text(li.get_text()) for li in teacher_items])
-        
-        # Extract teacher links
-        teacher_links = []
-        if teachers_ul:
-            teacher_anchors = teachers_ul.find_all("a")
-            for anchor in teacher_anchors:
-                href = anchor.get("href", "")
-                if href and "/user/profile.php" in href:
-                    full_url = self.build_url(href)
-                    teacher_links.append(full_url)
-        
-        course_info = {
-            "course_id": course_id,
-            "course_name": course_name,
-            "teachers_text": teachers_text,
-            "teacher_links": teacher_links
-        }
-        
-        self.logger.info(f"Course {course_id}: {course_name}, {len(teacher_links)} teachers")
+        course_info = self.build_course_info(course_id, fields["course_name"], fields["teachers"])
+        self.logger.info(
+            f"Course {course_id}: {course_info['course_name']}, {len(course_info['teacher_links'])} teachers"
+        )
         return course_info
     
+    def crawl_participants(self, course_id: str, per_page: int = 5000) -> Optional[List[str]]:
+        """
+        Crawl the participant list of a course (user/index.php) and save its pages.
+        
+        Each page lists up to per_page participants; further pages are
+        requested until one comes back short.
+        
+        Args:
+            course_id: ID of the course
+            per_page: Participants per page (Moodle's "Show all" uses 5000)
+            
+        Returns:
+            IDs of the participants, or None if a page could not be fetched
+        """
+        user_ids = []
+        seen = set()
+        page = 0
+        while True:
+            url = self.build_url(f"user/index.php?id={course_id}&perpage={per_page}&page={page}")
+            file_id = course_id if page == 0 else f"{course_id}-{page}"
+            html_content, result = self.load_page("participants", file_id, url)
+            if not html_content:
+                self.logger.error(f"Failed to fetch participants page {page} of course {course_id}")
+                return None
+            
+            page_ids = self.extract_participant_ids(html_content)
+            if page_ids is None:
+                # Not saved: no access to the participants, or an error page
+                self.logger.warning(f"No participants table for course {course_id}, skipping")
+                return user_ids
+            
+            # Save the HTML if it was downloaded
+            if result:
+                self.save_page("participants", file_id, url, result, page_ids)
+            
+            new_ids = [user_id for user_id in page_ids if user_id not in seen]
+            seen.update(new_ids)
+            user_ids.extend(new_ids)
+            # A short page is the last one; no new IDs means the page parameter was ignored
+            if len(page_ids) < per_page or not new_ids:
+                break
+            page += 1
+        
+        self.logger.info(f"Course {course_id}: {len(user_ids)} participants ({page + 1} pages)")
+        return user_ids
+    
+    def extract_participant_ids(self, html_content: str) -> Optional[List[str]]:
+        """
+        Extract the user IDs of a participants page.
+        
+        Args:
+            html_content: HTML content of a participants page
+            
+        Returns:
+            User IDs in table order, or None if the page has no participants table
+        """
+        anchors = self.parse_fields(self.parser.extract_participants, html_content)
+        if anchors is None:
+            return None
+        
+        # The picture and the name of a participant may both link to the profile
+        user_ids = []
+        for _, href in anchors:
+            if href and ("/user/view.php" in href or "/user/profile.php" in href):
+                user_ids.append(self.extract_id_from_url(href, "id"))
+        return [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+    
+    def build_participant_courses(self, course_id: str, user_ids: List[str]) -> List[Dict[str, any]]:
+        """
+        Build the user-course link records of a course's participants.
+        
+        Args:
+            course_id: ID of the course
+            user_ids: Participant IDs returned by crawl_participants
+            
+        Returns:
+            List of {"user_id", "course_id"} dictionaries
+        """
+        return [{"user_id": user_id, "course_id": course_id} for user_id in user_ids]
+    
     def extract_teacher_links_from_file(self, course_id: str) -> List[str]:
         """
         Extract teacher links from a saved course file.
@@ -122,11 +189,8 @@ class CourseCrawler(LmsCrawler):
         if not self.html_saver.file_exists("courses", course_id):
             return []
         
-        file_path = self.html_saver.get_file_path("courses", course_id)
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-            
+            html_content = self.html_saver.read_html("courses", course_id)
             course_info = self.extract_course_info(html_content, course_id)
             return course_info.get("teacher_links", [])
         except Exception as e:
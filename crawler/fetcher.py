@@ -0,0 +1,526 @@
+"""
+Fetcher module for HCMUT LMS Crawler.
+Provides the HTTP engines shared by all crawlers: a blocking requests-based
+engine and an optional asyncio engine built on httpx.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawler.session_pool import SessionPool, SessionsExhausted
+from utils.metrics import ERRORS, METRICS, per_page_logger
+from utils.rate_limiter import AdaptiveRateLimiter, RETRYABLE_STATUS_CODES, backoff_delay, parse_retry_after
+
+
+# Statuses of pages that do not exist, reported to callers that ask for them
+NOT_FOUND_STATUS_CODES = (404, 410)
+
+REQUESTS = METRICS.counter("lms_requests_total", "HTTP requests sent", ("category", "status"))
+REQUEST_SECONDS = METRICS.histogram("lms_request_seconds", "HTTP request latency", ("category",))
+DOWNLOADED_BYTES = METRICS.counter("lms_downloaded_bytes_total", "Response body bytes downloaded", ("category",))
+
+
+def page_category(url: str) -> str:
+    """
+    Get the page category of an LMS URL, used as a metrics label.
+
+    Args:
+        url: Requested URL
+
+    Returns:
+        "users", "courses", "semesters", "participants", "webservice" or "other"
+    """
+    path = urlparse(url).path
+    if path.startswith("/webservice/"):
+        return "webservice"
+    if path == "/user/index.php":
+        return "participants"
+    if path.startswith("/user/"):
+        return "users"
+    if path.startswith("/enrol/") or path.startswith("/course/view.php"):
+        return "courses"
+    if path.startswith("/course"):
+        return "semesters"
+    return "other"
+
+
+def _record_request(url: str, status: Optional[int], elapsed: float, size: int, error: Optional[Exception]):
+    """Update the request metrics after one attempt."""
+    category = page_category(url)
+    REQUESTS.inc(category=category, status=status or "none")
+    REQUEST_SECONDS.observe(elapsed, category=category)
+    if size:
+        DOWNLOADED_BYTES.inc(size, category=category)
+    if error is not None:
+        ERRORS.inc(type=f"http_{status}" if status else type(error).__name__)
+
+
+def _retry_wait(
+    rate_limiter: Optional[AdaptiveRateLimiter],
+    attempt: int,
+    retry_after: Optional[str],
+    max_backoff: float
+) -> float:
+    """
+    Get how long to sleep before retrying a failed request.
+
+    With a rate limiter, Retry-After is enforced by its per-host backoff
+    window, so only the jittered exponential delay is added here.
+    """
+    wait = backoff_delay(attempt, 1.0, max_backoff)
+    if rate_limiter is None:
+        wait = max(wait, min(parse_retry_after(retry_after) or 0.0, max_backoff))
+    return wait
+
+
+def _prefetch_key(url: str, headers: Optional[dict], report_not_found: bool) -> tuple:
+    """Get the key matching a prefetch() with the fetch_response() that consumes it."""
+    return url, tuple(sorted(headers.items())) if headers else (), report_not_found
+
+
+class FetchResult:
+    """Response of a fetch: status code, body and cache validators."""
+
+    __slots__ = ("status", "text", "etag", "last_modified")
+
+    def __init__(self, status: int, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Initialize fetch result.
+
+        Args:
+            status: HTTP status code (304 when a conditional request matched)
+            text: Response body (empty for 304)
+            etag: ETag response header
+            last_modified: Last-Modified response header
+        """
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self) -> bool:
+        """Whether the server confirmed the cached page is still current."""
+        return self.status == 304
+
+    @property
+    def not_found(self) -> bool:
+        """Whether the server answered that the page does not exist."""
+        return self.status in NOT_FOUND_STATUS_CODES
+
+
+class RequestsFetcher:
+    """Blocking HTTP engine backed by a single pooled requests.Session."""
+
+    def __init__(
+        self,
+        headers: dict,
+        pool_size: int = 10,
+        timeout: float = 30,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        max_backoff: float = 60.0,
+        session_pool: Optional[SessionPool] = None
+    ):
+        """
+        Initialize requests fetcher.
+
+        Args:
+            headers: HTTP headers including authentication
+            pool_size: Maximum number of keep-alive connections per host
+            timeout: Request timeout in seconds
+            rate_limiter: Shared rate limiter (None disables rate limiting)
+            max_backoff: Upper bound of the delay between retries in seconds
+            session_pool: Sessions whose cookies replace the one in headers, round-robin
+        """
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_backoff = max_backoff
+        self.session_pool = session_pool
+        self.logger = per_page_logger(self.__class__.__name__)
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str, max_retries: int = 3) -> Optional[str]:
+        """
+        Fetch a page with retry logic.
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+
+        Returns:
+            HTML content as string, or None if failed
+        """
+        result = self.fetch_response(url, max_retries)
+        return result.text if result else None
+
+    def fetch_response(
+        self,
+        url: str,
+        max_retries: int = 3,
+        headers: Optional[dict] = None,
+        data: Optional[dict] = None,
+        report_not_found: bool = False
+    ) -> Optional[FetchResult]:
+        """
+        Fetch a page with retry logic, keeping the status and validators.
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+            headers: Extra request headers (e.g. If-None-Match for a conditional request)
+            data: Form fields to POST instead of sending a GET (e.g. web-service calls)
+            report_not_found: Return a FetchResult without body for 404 and 410
+                instead of None, so the caller can tell missing pages from failures
+
+        Returns:
+            FetchResult, or None if failed
+        """
+        method = "GET" if data is None else "POST"
+        attempt = 0
+        while attempt < max_retries:
+            lms_session = None
+            request_headers = headers
+            if self.session_pool:
+                try:
+                    lms_session = self.session_pool.acquire()
+                except SessionsExhausted as e:
+                    self.logger.error(f"Not fetching {url}: {e}")
+                    return None
+                request_headers = {**(headers or {}), "cookie": lms_session.cookie}
+            session_name = lms_session.name if lms_session else None
+
+            if self.rate_limiter:
+                delay = self.rate_limiter.acquire(url, session_name)
+                if delay:
+                    time.sleep(delay)
+
+            status = None
+            retry_after = None
+            error = None
+            started = time.monotonic()
+            try:
+                self.logger.info(f"Fetching: {url}")
+                response = self.session.request(
+                    method, url, data=data, headers=request_headers, timeout=self.timeout, verify=False
+                )
+                status = response.status_code
+                retry_after = response.headers.get("Retry-After")
+                response.raise_for_status()
+            except requests.RequestException as e:
+                error = e
+
+            elapsed = time.monotonic() - started
+            _record_request(url, status, elapsed, len(response.content) if status else 0, error)
+            if self.rate_limiter:
+                self.rate_limiter.release(url, status, elapsed, retry_after, session_name)
+
+            if error is None and lms_session and self.session_pool.check_response(
+                lms_session, url, response.url, response.text
+            ):
+                # Logged out: fail over to the next session, without using up an attempt
+                continue
+            if error is None:
+                return FetchResult(
+                    status, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                )
+
+            if report_not_found and status in NOT_FOUND_STATUS_CODES:
+                self.logger.warning(f"{url} not found (HTTP {status})")
+                return FetchResult(status, "")
+            self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {url}: {error}")
+            if status is not None and status not in RETRYABLE_STATUS_CODES:
+                self.logger.error(f"Failed to fetch {url}: HTTP {status} is not retryable")
+                return None
+            if attempt == max_retries - 1:
+                self.logger.error(f"Failed to fetch {url} after {max_retries} attempts")
+                return None
+            time.sleep(_retry_wait(self.rate_limiter, attempt, retry_after, self.max_backoff))
+            attempt += 1
+        return None
+
+    def close(self):
+        """Release pooled connections."""
+        self.session.close()
+
+
+class AsyncFetcher:
+    """
+    Asyncio HTTP engine backed by one shared httpx.AsyncClient.
+
+    The client runs on a dedicated event loop thread. A global semaphore bounds
+    the number of requests in flight, and all crawlers share the same
+    keep-alive connection pool (HTTP/2 when the server and the h2 package
+    support it). Blocking callers use fetch() or fetch_response(); asyncio
+    callers await fetch_async().
+
+    prefetch() starts a download in the background, and a later
+    fetch_response() with the same arguments waits for it instead of sending
+    another request. Callers that know which pages they will need keep up to
+    max_concurrency requests in flight with a handful of worker threads.
+    """
+
+    def __init__(
+        self,
+        headers: dict,
+        max_concurrency: int = 100,
+        http2: bool = True,
+        timeout: float = 30,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        max_backoff: float = 60.0,
+        session_pool: Optional[SessionPool] = None
+    ):
+        """
+        Initialize async fetcher.
+
+        Args:
+            headers: HTTP headers including authentication
+            max_concurrency: Maximum number of requests in flight across all crawlers
+            http2: Negotiate HTTP/2 when available
+            timeout: Request timeout in seconds
+            rate_limiter: Shared rate limiter (None disables rate limiting)
+            max_backoff: Upper bound of the delay between retries in seconds
+            session_pool: Sessions whose cookies replace the one in headers, round-robin
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("FETCH_ENGINE=async requires httpx (pip install 'httpx[http2]')") from e
+
+        self.logger = per_page_logger(self.__class__.__name__)
+        self.rate_limiter = rate_limiter
+        self.max_backoff = max_backoff
+        self.session_pool = session_pool
+        self._httpx = httpx
+        self.max_prefetched = 4 * max_concurrency
+        self._prefetched = OrderedDict()
+        self._prefetch_lock = threading.Lock()
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                self.logger.warning("h2 package not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="AsyncFetcher", daemon=True)
+        self._thread.start()
+
+        async def _setup():
+            semaphore = asyncio.Semaphore(max_concurrency)
+            client = httpx.AsyncClient(
+                headers=headers,
+                http2=http2,
+                verify=False,
+                timeout=timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency
+                )
+            )
+            return semaphore, client
+
+        self._semaphore, self._client = self._run(_setup())
+
+    def _run(self, coro):
+        """Run a coroutine on the fetcher loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def fetch_async(self, url: str, max_retries: int = 3) -> Optional[str]:
+        """
+        Fetch a page with retry logic. Must be awaited on the fetcher loop.
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+
+        Returns:
+            HTML content as string, or None if failed
+        """
+        result = await self.fetch_response_async(url, max_retries)
+        return result.text if result else None
+
+    async def fetch_response_async(
+        self,
+        url: str,
+        max_retries: int = 3,
+        headers: Optional[dict] = None,
+        data: Optional[dict] = None,
+        report_not_found: bool = False
+    ) -> Optional[FetchResult]:
+        """
+        Fetch a page with retry logic, keeping the status and validators.
+        Must be awaited on the fetcher loop.
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+            headers: Extra request headers (e.g. If-None-Match for a conditional request)
+            data: Form fields to POST instead of sending a GET (e.g. web-service calls)
+            report_not_found: Return a FetchResult without body for 404 and 410
+                instead of None, so the caller can tell missing pages from failures
+
+        Returns:
+            FetchResult, or None if failed
+        """
+        method = "GET" if data is None else "POST"
+        attempt = 0
+        while attempt < max_retries:
+            lms_session = None
+            request_headers = headers
+            if self.session_pool:
+                try:
+                    lms_session = self.session_pool.try_acquire()
+                    while lms_session is None:
+                        await asyncio.sleep(1)
+                        lms_session = self.session_pool.try_acquire()
+                except SessionsExhausted as e:
+                    self.logger.error(f"Not fetching {url}: {e}")
+                    return None
+                request_headers = {**(headers or {}), "cookie": lms_session.cookie}
+            session_name = lms_session.name if lms_session else None
+
+            if self.rate_limiter:
+                delay = self.rate_limiter.try_acquire(url, session_name)
+                while delay is None:
+                    await asyncio.sleep(0.05)
+                    delay = self.rate_limiter.try_acquire(url, session_name)
+                if delay:
+                    await asyncio.sleep(delay)
+
+            status = None
+            retry_after = None
+            error = None
+            final_url = url
+            started = time.monotonic()
+            try:
+                async with self._semaphore:
+                    self.logger.info(f"Fetching: {url}")
+                    response = await self._client.request(method, url, data=data, headers=request_headers)
+                status = response.status_code
+                retry_after = response.headers.get("Retry-After")
+                # An expired session is redirected to the login page, possibly through several hops
+                visited = [str(hop.url) for hop in response.history] + [str(response.url)]
+                final_url = next((hop for hop in visited if urlparse(hop).path.startswith("/login/")), visited[-1])
+                # A 304 answers a conditional request (httpx treats it as an error, requests does not)
+                if status != 304:
+                    response.raise_for_status()
+            except self._httpx.HTTPError as e:
+                error = e
+
+            elapsed = time.monotonic() - started
+            _record_request(url, status, elapsed, len(response.content) if status else 0, error)
+            if self.rate_limiter:
+                self.rate_limiter.release(url, status, elapsed, retry_after, session_name)
+
+            if error is None and lms_session and self.session_pool.check_response(
+                lms_session, url, final_url, response.text
+            ):
+                # Logged out: fail over to the next session, without using up an attempt
+                continue
+            if error is None:
+                return FetchResult(
+                    status, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                )
+
+            if report_not_found and status in NOT_FOUND_STATUS_CODES:
+                self.logger.warning(f"{url} not found (HTTP {status})")
+                return FetchResult(status, "")
+            self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {url}: {error}")
+            if status is not None and status not in RETRYABLE_STATUS_CODES:
+                self.logger.error(f"Failed to fetch {url}: HTTP {status} is not retryable")
+                return None
+            if attempt == max_retries - 1:
+                self.logger.error(f"Failed to fetch {url} after {max_retries} attempts")
+                return None
+            await asyncio.sleep(_retry_wait(self.rate_limiter, attempt, retry_after, self.max_backoff))
+            attempt += 1
+        return None
+
+    def fetch(self, url: str, max_retries: int = 3) -> Optional[str]:
+        """
+        Fetch a page from a blocking caller (e.g. a crawler worker thread).
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+
+        Returns:
+            HTML content as string, or None if failed
+        """
+        return self._run(self.fetch_async(url, max_retries))
+
+    def fetch_response(
+        self,
+        url: str,
+        max_retries: int = 3,
+        headers: Optional[dict] = None,
+        data: Optional[dict] = None,
+        report_not_found: bool = False
+    ) -> Optional[FetchResult]:
+        """
+        Fetch a page from a blocking caller, keeping the status and validators.
+
+        Args:
+            url: URL to fetch
+            max_retries: Maximum number of retry attempts
+            headers: Extra request headers (e.g. If-None-Match for a conditional request)
+            data: Form fields to POST instead of sending a GET (e.g. web-service calls)
+            report_not_found: Return a FetchResult without body for 404 and 410
+                instead of None, so the caller can tell missing pages from failures
+
+        Returns:
+            FetchResult, or None if failed
+        """
+        if data is None:
+            with self._prefetch_lock:
+                prefetched = self._prefetched.pop(_prefetch_key(url, headers, report_not_found), None)
+            if prefetched is not None:
+                return prefetched.result()
+        return self._run(self.fetch_response_async(url, max_retries, headers, data, report_not_found))
+
+    def prefetch(self, url: str, headers: Optional[dict] = None, report_not_found: bool = False):
+        """
+        Start downloading a page in the background without waiting for it.
+
+        The next fetch_response() call with the same url, headers and
+        report_not_found gets the result of this download. The oldest
+        downloads nobody asked for are cancelled once more than
+        max_prefetched are pending.
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers (e.g. If-None-Match for a conditional request)
+            report_not_found: See fetch_response()
+        """
+        key = _prefetch_key(url, headers, report_not_found)
+        with self._prefetch_lock:
+            if key in self._prefetched:
+                return
+            self._prefetched[key] = asyncio.run_coroutine_threadsafe(
+                self.fetch_response_async(url, headers=headers, report_not_found=report_not_found), self._loop
+            )
+            while len(self._prefetched) > self.max_prefetched:
+                self._prefetched.popitem(last=False)[1].cancel()
+
+    def close(self):
+        """Close the client and stop the event loop."""
+        with self._prefetch_lock:
+            for prefetched in self._prefetched.values():
+                prefetched.cancel()
+            self._prefetched.clear()
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
@@ -3,10 +3,14 @@ Base crawler class for HCMUT LMS Crawler.
 Provides shared logic for HTTP requests, error handling, and text normalization.
 """
 import re
-import requests
 import logging
-from typing import Optional
-from bs4 import BeautifulSoup
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from crawler.fetcher import FetchResult, RequestsFetcher
+from crawler.parsers import Anchor, ParserBackend, create_parser
+from utils.normalize import parse_course_name
+from utils.metrics import ERRORS, METRICS, PARSE_BUCKETS, per_page_logger
+from utils.page_metadata import PageMetadataStore, fingerprint
 
 
 # Configure logging
@@ -19,23 +23,43 @@ logging.basicConfig(
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+PARSE_SECONDS = METRICS.histogram("lms_parse_seconds", "Parse time per page", ("extract",), PARSE_BUCKETS)
+PAGE_LOOKUPS = METRICS.counter(
+    "lms_page_lookups_total",
+    "Saved-page lookups by result (hit, miss, not_modified, refetched, stale_fallback)",
+    ("category", "result")
+)
+
 
 class LmsCrawler:
     """Base class for LMS crawling operations."""
     
-    def __init__(self, base_url: str, headers: dict):
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        fetcher=None,
+        parser: Optional[ParserBackend] = None,
+        page_metadata: Optional[PageMetadataStore] = None
+    ):
         """
         Initialize the base crawler.
         
         Args:
             base_url: Base URL of the LMS
             headers: HTTP headers including authentication
+            fetcher: Shared HTTP engine (RequestsFetcher or AsyncFetcher);
+                a private RequestsFetcher is created if omitted
+            parser: Parser backend used by the extract methods (defaults to BeautifulSoup)
+            page_metadata: Validators and TTLs of saved pages; without it a saved
+                page is never downloaded again
         """
         self.base_url = base_url.rstrip("/")
         self.headers = headers
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self.session = requests.Session()
-        self.session.headers.update(headers)
+        self.logger = per_page_logger(self.__class__.__name__)
+        self.fetcher = fetcher or RequestsFetcher(headers)
+        self.parser = parser or create_parser()
+        self.page_metadata = page_metadata
     
     def fetch_page(self, url: str, max_retries: int = 3) -> Optional[str]:
         """
@@ -48,34 +72,135 @@ class LmsCrawler:
         Returns:
             HTML content as string, or None if failed
         """
-        for attempt in range(max_retries):
-            try:
-                self.logger.info(f"Fetching: {url}")
-                response = self.session.get(url, timeout=30, verify=False)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {url}: {e}")
-                if attempt == max_retries - 1:
-                    self.logger.error(f"Failed to fetch {url} after {max_retries} attempts")
-                    return None
-        return None
+        return self.fetcher.fetch(url, max_retries)
+    
+    def _download_headers(self, category: str, file_id: str) -> Tuple[bool, Optional[dict]]:
+        """
+        Decide whether load_page has to download a page.
+
+        Args:
+            category: Category of the page
+            file_id: ID of the page
+
+        Returns:
+            Tuple of (whether the page must be downloaded, conditional request
+            headers if a saved copy is revalidated, else None)
+        """
+        cached = self.html_saver.file_exists(category, file_id)
+        if cached and not (self.page_metadata and self.page_metadata.is_stale(category, file_id)):
+            return False, None
+        return True, self.page_metadata.conditional_headers(category, file_id) if cached else None
+
+    def prefetch_page(self, category: str, file_id: str, url: str):
+        """
+        Start downloading a page that load_page will need, if the fetcher can
+        do so in the background (AsyncFetcher) and no fresh copy is saved.
+
+        Args:
+            category: Category of the page
+            file_id: ID of the page
+            url: URL to download the page from
+        """
+        prefetch = getattr(self.fetcher, "prefetch", None)
+        if prefetch is None:
+            return
+        download, headers = self._download_headers(category, file_id)
+        if download:
+            prefetch(url, headers=headers, report_not_found=True)
+
+    def load_page(self, category: str, file_id: str, url: str) -> Tuple[Optional[str], Optional[FetchResult]]:
+        """
+        Get a page from the HTML store (self.html_saver), downloading it if missing or stale.
+        
+        A saved page is reused unless page metadata marks it older than the
+        TTL of its category; it is then revalidated with a conditional
+        request. If the server answers 304 or the download fails, the saved
+        copy is used. A page that is not saved and does not exist (404 or
+        410) is reported through the FetchResult.
+        
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+            url: URL to download the page from
+            
+        Returns:
+            Tuple of (HTML content or None if failed, FetchResult if the
+            content was downloaded and should be passed to save_page, or
+            if the page was not found)
+        """
+        download, headers = self._download_headers(category, file_id)
+        if not download:
+            self.logger.info(f"Page {category}/{file_id} already exists, skipping download")
+            PAGE_LOOKUPS.inc(category=category, result="hit")
+            return self.html_saver.read_html(category, file_id), None
+        
+        # A saved copy is revalidated with (possibly empty) conditional headers
+        cached = headers is not None
+        result = self.fetcher.fetch_response(url, headers=headers, report_not_found=True)
+        if cached and (result is None or result.not_found or result.not_modified):
+            if result is None or result.not_found:
+                self.logger.warning(f"Could not revalidate {category}/{file_id}, using saved page")
+                PAGE_LOOKUPS.inc(category=category, result="stale_fallback")
+            else:
+                self.logger.info(f"Page {category}/{file_id} not modified")
+                PAGE_LOOKUPS.inc(category=category, result="not_modified")
+                self.page_metadata.mark_checked(category, file_id)
+            return self.html_saver.read_html(category, file_id), None
+        
+        PAGE_LOOKUPS.inc(category=category, result="refetched" if cached else "miss")
+        if result is None:
+            return None, None
+        if result.not_found:
+            return None, result
+        return result.text, result
     
-    def parse_html(self, html_content: str) -> Optional[BeautifulSoup]:
+    def save_page(self, category: str, file_id: str, url: str, result: FetchResult, data: Any) -> str:
         """
-        Parse HTML content into BeautifulSoup object.
+        Save a downloaded page and record its validators and fingerprint.
         
         Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+            url: URL the page was downloaded from
+            result: FetchResult returned by load_page
+            data: Data extracted from the page, used to detect real changes
+            
+        Returns:
+            Path to saved file
+        """
+        file_path = self.html_saver.save_html(category, file_id, result.text)
+        self.logger.info(f"Saved {category}/{file_id} to {file_path}")
+        
+        if self.page_metadata:
+            change = self.page_metadata.record(
+                category, file_id, url, result.etag, result.last_modified, fingerprint(data)
+            )
+            if change == "modified":
+                self.logger.info(f"Page {category}/{file_id} changed since the last crawl")
+        return file_path
+    
+    def parse_fields(self, extract: Callable[[str], Any], html_content: str) -> Optional[Any]:
+        """
+        Run a parser backend extraction, logging instead of raising on failure.
+        
+        Args:
+            extract: Bound extraction method of the parser backend
             html_content: Raw HTML string
             
         Returns:
-            BeautifulSoup object, or None if parsing failed
+            Extracted fields, or None if parsing failed
         """
+        if html_content is None:
+            return None
+        started = time.perf_counter()
         try:
-            return BeautifulSoup(html_content, "html.parser")
+            return extract(html_content)
         except Exception as e:
             self.logger.error(f"Failed to parse HTML: {e}")
+            ERRORS.inc(type="parse_error")
             return None
+        finally:
+            PARSE_SECONDS.observe(time.perf_counter() - started, extract=extract.__name__)
     
     @staticmethod
     def normalize_text(text: str) -> str:
@@ -94,6 +219,41 @@ class LmsCrawler:
         text = re.sub(r'\s+', ' ', text)
         return text.strip()
     
+    def build_course_info(self, course_id: str, course_name: Optional[str], teachers: List[Anchor]) -> Dict[str, Any]:
+        """
+        Build a course record from the raw fields of a course box.
+        
+        Enrolment pages and semester listings render a course with the same
+        box (h3.coursename, ul.teachers), so both are normalized here.
+        
+        Args:
+            course_id: ID of the course
+            course_name: Raw text of h3.coursename
+            teachers: (text, href) of the ul.teachers anchors
+            
+        Returns:
+            Dictionary with course information
+        """
+        course_name = self.normalize_text(course_name or "")
+        
+        # Extract teachers text from ul.teachers anchors
+        teachers_text = ", ".join([self.normalize_text(text) for text, _ in teachers])
+        
+        # Extract teacher links
+        teacher_links = []
+        for _, href in teachers:
+            if href and "/user/profile.php" in href:
+                full_url = self.build_url(href)
+                teacher_links.append(full_url)
+        
+        return {
+            "course_id": course_id,
+            "course_name": course_name,
+            "teachers_text": teachers_text,
+            "teacher_links": teacher_links,
+            **parse_course_name(course_name)
+        }
+    
     @staticmethod
     def extract_id_from_url(url: str, param_name: str = "id") -> Optional[str]:
         """
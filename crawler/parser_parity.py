@@ -0,0 +1,90 @@
+"""
+Parser parity check for HCMUT LMS Crawler.
+Runs the extract methods of every crawler with each parser backend over
+the saved HTML and reports records that differ from the BeautifulSoup
+reference, along with the parsing time of each backend.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from crawler.course_crawler import CourseCrawler
+from crawler.parsers import create_parser
+from crawler.semester_crawler import DISCOVERY_PAGE, SemesterCrawler
+from crawler.user_crawler import UserCrawler
+from utils.html_saver import HtmlSaver
+
+
+logger = logging.getLogger("ParserParity")
+
+
+def _extractors(base_url: str, html_saver: HtmlSaver, backend: str) -> Dict[str, callable]:
+    """Build per-category extraction functions using one parser backend."""
+    parser = create_parser(backend)
+    semester_crawler = SemesterCrawler(base_url, {}, html_saver, parser=parser)
+    course_crawler = CourseCrawler(base_url, {}, html_saver, parser=parser)
+    user_crawler = UserCrawler(base_url, {}, html_saver, parser=parser)
+    return {
+        "semesters": lambda html, _: (
+            semester_crawler.extract_course_links(html), semester_crawler.extract_listed_courses(html)
+        ),
+        "courses": course_crawler.extract_course_info,
+        "users": user_crawler.extract_user_info,
+        "participants": lambda html, _: course_crawler.extract_participant_ids(html),
+    }
+
+
+def check_parser_parity(
+    base_url: str,
+    html_saver: HtmlSaver,
+    backends: List[str],
+    limit: Optional[int] = None
+) -> Dict[str, dict]:
+    """
+    Compare every backend against the bs4 reference on saved pages.
+
+    Args:
+        base_url: Base URL of the LMS (used to build absolute links)
+        html_saver: Store holding the saved pages
+        backends: Backends to compare (e.g. ["lxml", "selectolax"])
+        limit: Maximum number of pages per category
+
+    Returns:
+        Mapping of backend to {"pages", "mismatches", "seconds"} including "bs4"
+    """
+    # Extraction logs one line per page; keep the report readable
+    for name in ("SemesterCrawler", "CourseCrawler", "UserCrawler"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    names = ["bs4"] + [backend for backend in backends if backend != "bs4"]
+    extractors = {name: _extractors(base_url, html_saver, name) for name in names}
+    report = {name: {"pages": 0, "mismatches": 0, "seconds": 0.0} for name in names}
+
+    for category in ("semesters", "courses", "users", "participants"):
+        for count, file_id in enumerate(html_saver.list_ids(category)):
+            if limit is not None and count >= limit:
+                break
+            html_content = html_saver.read_html(category, file_id)
+            if html_content is None or file_id == DISCOVERY_PAGE:
+                continue
+
+            reference = None
+            for name in names:
+                started = time.perf_counter()
+                result = extractors[name][category](html_content, file_id)
+                report[name]["seconds"] += time.perf_counter() - started
+                report[name]["pages"] += 1
+
+                if name == "bs4":
+                    reference = result
+                elif result != reference:
+                    report[name]["mismatches"] += 1
+                    logger.warning(f"{name} differs on {category}/{file_id}: {result!r} != {reference!r}")
+
+    for name, stats in report.items():
+        per_page = stats["seconds"] / stats["pages"] * 1000 if stats["pages"] else 0
+        logger.info(
+            f"{name}: {stats['pages']} pages, {stats['mismatches']} mismatches, "
+            f"{stats['seconds']:.2f}s total ({per_page:.2f} ms/page)"
+        )
+    return report
@@ -0,0 +1,394 @@
+"""
+Parser backends for HCMUT LMS Crawler.
+Extract only the elements the crawlers need (h3.coursename, ul.teachers a,
+div.profile_tree sections, a.aalink, div.coursebox, select.urlselect options,
+table#participants a) with
+BeautifulSoup, lxml or selectolax/lexbor. Backends return raw text and
+attributes; normalization and filtering stay in the crawlers.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+
+Anchor = Tuple[str, str]
+
+
+class ParserBackend:
+    """Interface of a parser backend."""
+
+    name = ""
+
+    def extract_course(self, html_content: str) -> Dict[str, object]:
+        """
+        Extract the raw fields of a course page.
+
+        Args:
+            html_content: HTML content of course page
+
+        Returns:
+            Dictionary with "course_name" (str or None) and "teachers" (list of (text, href))
+        """
+        raise NotImplementedError
+
+    def extract_user(self, html_content: str) -> Dict[str, object]:
+        """
+        Extract the raw fields of a user profile page.
+
+        Args:
+            html_content: HTML content of user profile page
+
+        Returns:
+            Dictionary with "has_alert", "header" and "role" (str or None),
+            "details" (list of (dt text, dd text)) and "courses" (list of (text, href))
+        """
+        raise NotImplementedError
+
+    def extract_course_links(self, html_content: str) -> List[str]:
+        """
+        Extract the href of every a.aalink.
+
+        Args:
+            html_content: HTML content of semester page
+
+        Returns:
+            List of hrefs
+        """
+        raise NotImplementedError
+
+    def extract_course_boxes(self, html_content: str) -> List[Dict[str, object]]:
+        """
+        Extract the course boxes of a semester listing.
+
+        Args:
+            html_content: HTML content of semester page
+
+        Returns:
+            List of dictionaries with "href" (link in h3.coursename), "course_name"
+            (str or None) and "teachers" (list of (text, href), or None if the box
+            has no ul.teachers)
+        """
+        raise NotImplementedError
+
+    def extract_participants(self, html_content: str) -> Optional[List[Anchor]]:
+        """
+        Extract the anchors of the participants table (user/index.php).
+
+        Args:
+            html_content: HTML content of a participants page
+
+        Returns:
+            List of (text, href), or None if there is no table#participants
+        """
+        raise NotImplementedError
+
+    def extract_semester_options(self, html_content: str) -> Optional[List[Anchor]]:
+        """
+        Extract the options of select.urlselect.
+
+        Args:
+            html_content: HTML content of the course list page
+
+        Returns:
+            List of (text, value) pairs, or None if there is no select.urlselect
+        """
+        raise NotImplementedError
+
+
+class BeautifulSoupBackend(ParserBackend):
+    """BeautifulSoup backend (reference implementation)."""
+
+    name = "bs4"
+
+    def __init__(self, features: str = "html.parser"):
+        """
+        Initialize backend.
+
+        Args:
+            features: BeautifulSoup tree builder
+        """
+        self.features = features
+
+    def _parse(self, html_content: str) -> BeautifulSoup:
+        return BeautifulSoup(html_content, self.features)
+
+    def extract_course(self, html_content: str) -> Dict[str, object]:
+        soup = self._parse(html_content)
+        coursename = soup.find("h3", class_="coursename")
+        teachers_ul = soup.find("ul", class_="teachers")
+        return {
+            "course_name": coursename.get_text() if coursename else None,
+            "teachers": [(a.get_text(), a.get("href", "")) for a in teachers_ul.find_all("a")] if teachers_ul else [],
+        }
+
+    def extract_user(self, html_content: str) -> Dict[str, object]:
+        soup = self._parse(html_content)
+        result = {"has_alert": soup.find("div", class_="alert") is not None,
+                  "header": None, "role": None, "details": [], "courses": []}
+        if result["has_alert"]:
+            return result
+
+        header = soup.find(class_="page-header-headings")
+        if header:
+            result["header"] = header.get_text()
+
+        userprofile = soup.find(class_="userprofile")
+        if userprofile:
+            description = userprofile.find(class_="description")
+            if description:
+                result["role"] = description.get_text()
+
+        profile_tree = soup.find("div", class_="profile_tree")
+        if profile_tree:
+            sections = profile_tree.find_all("section", recursive=False)
+            if sections:
+                dts = sections[0].find_all("dt")
+                dds = sections[0].find_all("dd")
+                result["details"] = [(dt.get_text(), dd.get_text()) for dt, dd in zip(dts, dds)]
+            if len(sections) > 1:
+                result["courses"] = [(a.get_text(), a.get("href", "")) for a in sections[1].find_all("a")]
+        return result
+
+    def extract_course_links(self, html_content: str) -> List[str]:
+        soup = self._parse(html_content)
+        return [a.get("href", "") for a in soup.find_all("a", class_="aalink")]
+
+    def extract_course_boxes(self, html_content: str) -> List[Dict[str, object]]:
+        soup = self._parse(html_content)
+        boxes = []
+        for box in soup.find_all("div", class_="coursebox"):
+            coursename = box.find("h3", class_="coursename")
+            link = coursename.find("a") if coursename else None
+            teachers_ul = box.find("ul", class_="teachers")
+            boxes.append({
+                "href": link.get("href", "") if link else "",
+                "course_name": coursename.get_text() if coursename else None,
+                "teachers": [(a.get_text(), a.get("href", "")) for a in teachers_ul.find_all("a")]
+                if teachers_ul else None,
+            })
+        return boxes
+
+    def extract_participants(self, html_content: str) -> Optional[List[Anchor]]:
+        soup = self._parse(html_content)
+        table = soup.find("table", id="participants")
+        if not table:
+            return None
+        return [(a.get_text(), a.get("href", "")) for a in table.find_all("a")]
+
+    def extract_semester_options(self, html_content: str) -> Optional[List[Anchor]]:
+        soup = self._parse(html_content)
+        select_elem = soup.find("select", class_="urlselect")
+        if not select_elem:
+            return None
+        return [(option.get_text(), option.get("value", "")) for option in select_elem.find_all("option")]
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching an element whose class list contains name."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlBackend(ParserBackend):
+    """lxml backend using XPath (no BeautifulSoup tree)."""
+
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            import lxml.html
+        except ImportError as e:
+            raise ImportError("PARSER_BACKEND=lxml requires lxml (pip install lxml)") from e
+        self._html = lxml.html
+
+    def _parse(self, html_content: str):
+        return self._html.document_fromstring(html_content)
+
+    @staticmethod
+    def _first(root, xpath: str):
+        found = root.xpath(xpath)
+        return found[0] if found else None
+
+    def extract_course(self, html_content: str) -> Dict[str, object]:
+        root = self._parse(html_content)
+        coursename = self._first(root, f"//h3[{_has_class('coursename')}]")
+        teachers_ul = self._first(root, f"//ul[{_has_class('teachers')}]")
+        return {
+            "course_name": coursename.text_content() if coursename is not None else None,
+            "teachers": [(a.text_content(), a.get("href", "")) for a in teachers_ul.iter("a")]
+            if teachers_ul is not None else [],
+        }
+
+    def extract_user(self, html_content: str) -> Dict[str, object]:
+        root = self._parse(html_content)
+        result = {"has_alert": self._first(root, f"//div[{_has_class('alert')}]") is not None,
+                  "header": None, "role": None, "details": [], "courses": []}
+        if result["has_alert"]:
+            return result
+
+        header = self._first(root, f"//*[{_has_class('page-header-headings')}]")
+        if header is not None:
+            result["header"] = header.text_content()
+
+        userprofile = self._first(root, f"//*[{_has_class('userprofile')}]")
+        if userprofile is not None:
+            description = self._first(userprofile, f".//*[{_has_class('description')}]")
+            if description is not None:
+                result["role"] = description.text_content()
+
+        profile_tree = self._first(root, f"//div[{_has_class('profile_tree')}]")
+        if profile_tree is not None:
+            sections = profile_tree.xpath("./section")
+            if sections:
+                dts = sections[0].xpath(".//dt")
+                dds = sections[0].xpath(".//dd")
+                result["details"] = [(dt.text_content(), dd.text_content()) for dt, dd in zip(dts, dds)]
+            if len(sections) > 1:
+                result["courses"] = [(a.text_content(), a.get("href", "")) for a in sections[1].iter("a")]
+        return result
+
+    def extract_course_links(self, html_content: str) -> List[str]:
+        root = self._parse(html_content)
+        return [a.get("href", "") for a in root.xpath(f"//a[{_has_class('aalink')}]")]
+
+    def extract_course_boxes(self, html_content: str) -> List[Dict[str, object]]:
+        root = self._parse(html_content)
+        boxes = []
+        for box in root.xpath(f"//div[{_has_class('coursebox')}]"):
+            coursename = self._first(box, f".//h3[{_has_class('coursename')}]")
+            link = self._first(coursename, ".//a") if coursename is not None else None
+            teachers_ul = self._first(box, f".//ul[{_has_class('teachers')}]")
+            boxes.append({
+                "href": link.get("href", "") if link is not None else "",
+                "course_name": coursename.text_content() if coursename is not None else None,
+                "teachers": [(a.text_content(), a.get("href", "")) for a in teachers_ul.iter("a")]
+                if teachers_ul is not None else None,
+            })
+        return boxes
+
+    def extract_participants(self, html_content: str) -> Optional[List[Anchor]]:
+        root = self._parse(html_content)
+        table = self._first(root, "//table[@id='participants']")
+        if table is None:
+            return None
+        return [(a.text_content(), a.get("href", "")) for a in table.iter("a")]
+
+    def extract_semester_options(self, html_content: str) -> Optional[List[Anchor]]:
+        root = self._parse(html_content)
+        select_elem = self._first(root, f"//select[{_has_class('urlselect')}]")
+        if select_elem is None:
+            return None
+        return [(option.text_content(), option.get("value", "")) for option in select_elem.iter("option")]
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax backend using the lexbor engine and CSS selectors."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError as e:
+            raise ImportError("PARSER_BACKEND=selectolax requires selectolax (pip install selectolax)") from e
+        self._parser = LexborHTMLParser
+
+    @staticmethod
+    def _text(node) -> str:
+        return node.text(deep=True, separator="", strip=False)
+
+    @staticmethod
+    def _href(node) -> str:
+        return node.attributes.get("href") or ""
+
+    def extract_course(self, html_content: str) -> Dict[str, object]:
+        tree = self._parser(html_content)
+        coursename = tree.css_first("h3.coursename")
+        teachers_ul = tree.css_first("ul.teachers")
+        return {
+            "course_name": self._text(coursename) if coursename is not None else None,
+            "teachers": [(self._text(a), self._href(a)) for a in teachers_ul.css("a")]
+            if teachers_ul is not None else [],
+        }
+
+    def extract_user(self, html_content: str) -> Dict[str, object]:
+        tree = self._parser(html_content)
+        result = {"has_alert": tree.css_first("div.alert") is not None,
+                  "header": None, "role": None, "details": [], "courses": []}
+        if result["has_alert"]:
+            return result
+
+        header = tree.css_first(".page-header-headings")
+        if header is not None:
+            result["header"] = self._text(header)
+
+        userprofile = tree.css_first(".userprofile")
+        if userprofile is not None:
+            description = userprofile.css_first(".description")
+            if description is not None:
+                result["role"] = self._text(description)
+
+        profile_tree = tree.css_first("div.profile_tree")
+        if profile_tree is not None:
+            sections = [child for child in profile_tree.iter() if child.tag == "section"]
+            if sections:
+                dts = sections[0].css("dt")
+                dds = sections[0].css("dd")
+                result["details"] = [(self._text(dt), self._text(dd)) for dt, dd in zip(dts, dds)]
+            if len(sections) > 1:
+                result["courses"] = [(self._text(a), self._href(a)) for a in sections[1].css("a")]
+        return result
+
+    def extract_course_links(self, html_content: str) -> List[str]:
+        tree = self._parser(html_content)
+        return [self._href(a) for a in tree.css("a.aalink")]
+
+    def extract_course_boxes(self, html_content: str) -> List[Dict[str, object]]:
+        tree = self._parser(html_content)
+        boxes = []
+        for box in tree.css("div.coursebox"):
+            coursename = box.css_first("h3.coursename")
+            link = coursename.css_first("a") if coursename is not None else None
+            teachers_ul = box.css_first("ul.teachers")
+            boxes.append({
+                "href": self._href(link) if link is not None else "",
+                "course_name": self._text(coursename) if coursename is not None else None,
+                "teachers": [(self._text(a), self._href(a)) for a in teachers_ul.css("a")]
+                if teachers_ul is not None else None,
+            })
+        return boxes
+
+    def extract_participants(self, html_content: str) -> Optional[List[Anchor]]:
+        tree = self._parser(html_content)
+        table = tree.css_first("table#participants")
+        if table is None:
+            return None
+        return [(self._text(a), self._href(a)) for a in table.css("a")]
+
+    def extract_semester_options(self, html_content: str) -> Optional[List[Anchor]]:
+        tree = self._parser(html_content)
+        select_elem = tree.css_first("select.urlselect")
+        if select_elem is None:
+            return None
+        return [(self._text(option), option.attributes.get("value") or "") for option in select_elem.css("option")]
+
+
+PARSER_BACKENDS = {
+    "bs4": BeautifulSoupBackend,
+    "lxml": LxmlBackend,
+    "selectolax": SelectolaxBackend,
+}
+
+
+def create_parser(name: str = "bs4") -> ParserBackend:
+    """
+    Create the parser backend selected by PARSER_BACKEND.
+
+    Args:
+        name: "bs4", "lxml" or "selectolax"
+
+    Returns:
+        ParserBackend instance
+    """
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+    return PARSER_BACKENDS[name]()
@@ -0,0 +1,162 @@
+"""
+Offline re-extraction for HCMUT LMS Crawler.
+Rebuilds the JSON datasets from the saved HTML without any network access,
+running the course and user extract methods on all cores. With LISTING_FIRST,
+courses recorded from semester listings are re-extracted from the saved
+semester pages, and with PARTICIPANTS the user-course links of the saved
+participant lists are added.
+"""
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from crawler.course_crawler import CourseCrawler
+from crawler.parsers import create_parser
+from crawler.semester_crawler import DISCOVERY_PAGE, SemesterCrawler
+from crawler.user_crawler import UserCrawler
+from utils.data_sink import JsonlDataSink, DATASETS
+from utils.html_saver import create_html_store
+
+
+logger = logging.getLogger("Reparser")
+
+# Per-process state created by _init_worker
+_worker = {}
+
+
+def _init_worker(base_url: str, storage_backend: str, output_dir: str, compression_level: int, parser_backend: str):
+    """Create the store and crawlers of a worker process."""
+    for name in ("SemesterCrawler", "CourseCrawler", "UserCrawler"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    html_saver = create_html_store(storage_backend, output_dir, compression_level)
+    parser = create_parser(parser_backend)
+    _worker["html_saver"] = html_saver
+    _worker["semester_crawler"] = SemesterCrawler(base_url, {}, html_saver, parser=parser)
+    _worker["course_crawler"] = CourseCrawler(base_url, {}, html_saver, parser=parser)
+    _worker["user_crawler"] = UserCrawler(base_url, {}, html_saver, parser=parser)
+
+
+def _reparse_chunk(category: str, file_ids: List[str]) -> Dict[str, list]:
+    """
+    Re-extract one chunk of saved pages.
+
+    Args:
+        category: "semesters", "courses", "users" or "participants"
+        file_ids: IDs of the pages to extract
+
+    Returns:
+        New records keyed by dataset name
+    """
+    html_saver = _worker["html_saver"]
+    records = {dataset: [] for dataset in DATASETS}
+
+    for file_id in file_ids:
+        html_content = html_saver.read_html(category, file_id)
+        if html_content is None or file_id == DISCOVERY_PAGE:
+            continue
+
+        if category == "semesters":
+            # Listed courses, unless their course page was crawled
+            for _, course_info in _worker["semester_crawler"].extract_listed_courses(html_content):
+                if course_info and not html_saver.file_exists("courses", course_info["course_id"]):
+                    records["all_courses"].append(course_info)
+        elif category == "courses":
+            records["all_courses"].append(_worker["course_crawler"].extract_course_info(html_content, file_id))
+        elif category == "participants":
+            # Pages after the first are saved as <course ID>-<page>
+            course_id = file_id.split("-")[0]
+            course_crawler = _worker["course_crawler"]
+            user_ids = course_crawler.extract_participant_ids(html_content) or []
+            records["users_courses"].extend(course_crawler.build_participant_courses(course_id, user_ids))
+        else:
+            user_crawler = _worker["user_crawler"]
+            user_info = user_crawler.extract_user_info(html_content, file_id)
+            if user_info:
+                records["all_users"].append(user_info)
+                records["users_courses"].extend(user_crawler.build_user_courses(user_info))
+
+    return records
+
+
+def _chunks(html_saver, chunk_size: int, categories: Tuple[str, ...]) -> Iterator[Tuple[str, List[str]]]:
+    """Stream (category, ids) work units over the stores of the given categories."""
+    for category in categories:
+        file_ids = iter(html_saver.list_ids(category))
+        while True:
+            chunk = list(islice(file_ids, chunk_size))
+            if not chunk:
+                break
+            yield category, chunk
+
+
+def reparse(config, workers: int = 0, chunk_size: int = 500) -> Dict[str, int]:
+    """
+    Rebuild all_courses, all_users and users_courses from the saved HTML.
+
+    Results are streamed to .jsonl files in a staging directory, which
+    replace the current ones only once every page has been processed, and
+    are then exported as JSON arrays.
+
+    Args:
+        config: Configuration object
+        workers: Number of worker processes (0 means one per CPU core)
+        chunk_size: Number of pages per work unit
+
+    Returns:
+        Mapping of dataset name to number of records written
+    """
+    workers = workers or os.cpu_count() or 1
+    html_saver = create_html_store(config.storage_backend, config.output_dir, config.archive_compression_level)
+    staging_dir = Path(config.output_dir) / "reparse_staging"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging = JsonlDataSink(str(staging_dir))
+
+    totals = {dataset: 0 for dataset in DATASETS}
+    categories = ("semesters", "courses", "users") if config.listing_first else ("courses", "users")
+    if config.participants:
+        categories += ("participants",)
+    chunks = _chunks(html_saver, chunk_size, categories)
+    pages = 0
+    logger.info(f"Re-extracting saved pages with {workers} processes, {chunk_size} pages per chunk")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(config.base_url, config.storage_backend, config.output_dir,
+                  config.archive_compression_level, config.parser_backend)
+    ) as executor:
+        in_flight = {}
+        while True:
+            # Keep a bounded number of chunks queued so memory stays flat
+            while len(in_flight) < workers * 2:
+                work = next(chunks, None)
+                if work is None:
+                    break
+                in_flight[executor.submit(_reparse_chunk, *work)] = work
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                category, file_ids = in_flight.pop(future)
+                pages += len(file_ids)
+                for dataset, count in staging.write_batch(future.result()).items():
+                    totals[dataset] += count
+                logger.info(f"Re-extracted {pages} pages ({category})")
+
+    # Swap the rebuilt datasets in and export them
+    sink = JsonlDataSink(config.output_dir)
+    for dataset in DATASETS:
+        staging.get_jsonl_path(dataset).touch()
+        shutil.move(str(staging.get_jsonl_path(dataset)), str(sink.get_jsonl_path(dataset)))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    sink.export_all()
+
+    logger.info(f"Re-extraction completed: {totals}")
+    return totals
@@ -3,15 +3,27 @@ Semester Crawler module for HCMUT LMS Crawler.
 Handles parsing and crawling of semester pages.
 """
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from crawler.lms_crawler import LmsCrawler
 from utils.html_saver import HtmlSaver
 
 
+# File ID of the saved course list page the semesters are discovered from
+DISCOVERY_PAGE = "discover_semester_result"
+
+
 class SemesterCrawler(LmsCrawler):
     """Crawler for semester pages."""
     
-    def __init__(self, base_url: str, headers: dict, html_saver: HtmlSaver):
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        html_saver: HtmlSaver,
+        fetcher=None,
+        parser=None,
+        page_metadata=None
+    ):
         """
         Initialize semester crawler.
         
@@ -19,81 +31,95 @@ class SemesterCrawler(LmsCrawler):
             base_url: Base URL of the LMS
             headers: HTTP headers including authentication
             html_saver: HtmlSaver instance for file operations
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
         """
-        super().__init__(base_url, headers)
+        super().__init__(base_url, headers, fetcher, parser, page_metadata)
         self.html_saver = html_saver
     
     def discover_semesters(self) -> List[Dict[str, str]]:
         """
         Discover all semesters from the course list page.
         
+        The page is saved as semesters/discover_semester_result.html. With
+        REFRESH_TTL_SEMESTERS it is reused until it is older than the TTL and
+        then revalidated; without it, it is requested on every run so new
+        semesters are found, and the saved copy is only used if that fails.
+        
         Returns:
             List of semester dictionaries with url, category_id, and metadata
         """
-        html_content = None
-        if self.html_saver.file_exists("semesters", "discover_semester_result"):
-            self.logger.info("Using cached discover_semester_result.html")
-            file_path = self.html_saver.get_file_path("semesters", "discover_semester_result")
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    html_content = f.read()
-            except Exception as e:
-                self.logger.error(f"Failed to read discover_semester_result.html: {e}")
-        
-        if not html_content:
-            course_list_url = self.build_url("/course/")
-            html_content = self.fetch_page(course_list_url)
-        
-        soup = self.parse_html(html_content)
-        if not soup:
-            return []
+        course_list_url = self.build_url("/course/")
+        if self.page_metadata and self.page_metadata.ttl("semesters") > 0:
+            html_content, result = self.load_page("semesters", DISCOVERY_PAGE, course_list_url)
+        else:
+            result = self.fetcher.fetch_response(course_list_url)
+            html_content = result.text if result else None
+            if html_content is None and self.html_saver.file_exists("semesters", DISCOVERY_PAGE):
+                self.logger.warning(f"Could not fetch the semester list, using the saved {DISCOVERY_PAGE}.html")
+                html_content = self.html_saver.read_html("semesters", DISCOVERY_PAGE)
         
-        # Find the select.urlselect element
-        select_elem = soup.find("select", class_="urlselect")
-        if not select_elem:
+        # Find the options of the select.urlselect element
+        options = self.parse_fields(self.parser.extract_semester_options, html_content)
+        if options is None:
             self.logger.error("Could not find select.urlselect element")
             return []
         
-        semesters = []
-        options = select_elem.find_all("option")
+        if result:
+            self.save_page("semesters", DISCOVERY_PAGE, course_list_url, result, options)
         
-        for option in options:
-            option_text = self.normalize_text(option.get_text())
-            option_value = option.get("value", "")
-            
-            if not option_value or not option_text:
-                continue
-            
-            # Validate format: "Semester / Faculty / Major"
-            # Looking for text with at least 2 forward slashes
-            if option_text.count(" / ") < 2:
-                continue
-            
-            parts = [self.normalize_text(p) for p in option_text.split("/")]
-            if len(parts) < 3:
-                continue
-            
-            # Extract category ID from URL
-            category_id = self.extract_id_from_url(option_value, "categoryid")
-            if not category_id:
-                self.logger.warning(f"Could not extract category ID from: {option_value}")
-                continue
-            
-            semester_info = {
-                "category_id": category_id,
-                "url": option_value,
-                "semester": parts[0],
-                "faculty": parts[1],
-                "major": parts[2],
-                "full_text": option_text
-            }
-
-            semesters.append(semester_info)
-            self.logger.info(f"Discovered semester: {option_text} (ID: {category_id})")
+        semesters = []
+        for raw_text, option_value in options:
+            semester_info = self.build_semester_info(raw_text, option_value)
+            if semester_info:
+                semesters.append(semester_info)
         
         self.logger.info(f"Discovered {len(semesters)} semesters")
         return semesters
     
+    def build_semester_info(self, raw_text: str, option_value: str) -> Optional[Dict[str, str]]:
+        """
+        Build the semester information of a category from its full path.
+        
+        Args:
+            raw_text: Category path, e.g. "Semester / Faculty / Major"
+            option_value: URL of the category listing
+            
+        Returns:
+            Semester dictionary, or None if the category is not a major of a semester
+        """
+        option_text = self.normalize_text(raw_text)
+        
+        if not option_value or not option_text:
+            return None
+        
+        # Validate format: "Semester / Faculty / Major"
+        # Looking for text with at least 2 forward slashes
+        if option_text.count(" / ") < 2:
+            return None
+        
+        parts = [self.normalize_text(p) for p in option_text.split("/")]
+        if len(parts) < 3:
+            return None
+        
+        # Extract category ID from URL
+        category_id = self.extract_id_from_url(option_value, "categoryid")
+        if not category_id:
+            self.logger.warning(f"Could not extract category ID from: {option_value}")
+            return None
+        
+        semester_info = {
+            "category_id": category_id,
+            "url": option_value,
+            "semester": parts[0],
+            "faculty": parts[1],
+            "major": parts[2],
+            "full_text": option_text
+        }
+        self.logger.info(f"Discovered semester: {option_text} (ID: {category_id})")
+        return semester_info
+    
     def crawl_semester(self, semester_info: Dict[str, str]) -> Optional[str]:
         """
         Crawl a single semester page and save it.
@@ -104,13 +130,18 @@ class SemesterCrawler(LmsCrawler):
         Returns:
             Path to saved file, or None if failed
         """
-        category_id = semester_info["category_id"]
-        
-        # Check if file already exists (idempotency)
-        if self.html_saver.file_exists("semesters", category_id):
-            self.logger.info(f"Semester {category_id} already exists, skipping")
-            return self.html_saver.get_file_path("semesters", category_id)
+        if self.crawl_semester_courses(semester_info) is None:
+            return None
+        return self.html_saver.get_file_path("semesters", semester_info["category_id"])
+    
+    def _load_semester(self, semester_info: Dict[str, str]):
+        """
+        Load a semester listing (perpage=all), reusing the saved page unless it
+        is missing or due for revalidation.
         
+        Returns:
+            (url, HTML content or None, FetchResult if the page was downloaded)
+        """
         # Build URL with perpage=all to bypass pagination
         url = semester_info["url"]
         if "?" in url:
@@ -121,17 +152,57 @@ class SemesterCrawler(LmsCrawler):
         # Ensure full URL
         url = self.build_url(url)
         
-        # Fetch the page
-        html_content = self.fetch_page(url)
+        html_content, result = self.load_page("semesters", semester_info["category_id"], url)
+        return url, html_content, result
+    
+    def crawl_semester_courses(self, semester_info: Dict[str, str]) -> Optional[List[str]]:
+        """
+        Crawl a semester page, saving it if downloaded, and extract its course links.
+        
+        Args:
+            semester_info: Dictionary containing semester information
+            
+        Returns:
+            List of course URLs, or None if failed
+        """
+        category_id = semester_info["category_id"]
+        url, html_content, result = self._load_semester(semester_info)
         if not html_content:
             self.logger.error(f"Failed to fetch semester {category_id}")
             return None
         
-        # Save the HTML
-        file_path = self.html_saver.save_html("semesters", category_id, html_content)
-        self.logger.info(f"Saved semester {category_id} to {file_path}")
+        course_links = self.extract_course_links(html_content)
+        
+        # Save the HTML if it was downloaded
+        if result:
+            self.save_page("semesters", category_id, url, result, course_links)
         
-        return file_path
+        return course_links
+    
+    def crawl_semester_listing(self, semester_info: Dict[str, str]) -> Optional[List[Tuple[str, Optional[dict]]]]:
+        """
+        Crawl a semester page, saving it if downloaded, and extract its courses
+        with the fields shown in the listing (listing-first mode).
+        
+        Args:
+            semester_info: Dictionary containing semester information
+            
+        Returns:
+            List of (course URL, course info or None if the course page is needed), or None if failed
+        """
+        category_id = semester_info["category_id"]
+        url, html_content, result = self._load_semester(semester_info)
+        if not html_content:
+            self.logger.error(f"Failed to fetch semester {category_id}")
+            return None
+        
+        listed = self.extract_listed_courses(html_content)
+        
+        # Save the HTML if it was downloaded
+        if result:
+            self.save_page("semesters", category_id, url, result, listed)
+        
+        return listed
     
     def extract_course_links(self, semester_html: str) -> List[str]:
         """
@@ -143,20 +214,51 @@ class SemesterCrawler(LmsCrawler):
         Returns:
             List of course URLs
         """
-        soup = self.parse_html(semester_html)
-        if not soup:
+        hrefs = self.parse_fields(self.parser.extract_course_links, semester_html)
+        if hrefs is None:
             return []
         
         course_links = []
         # Find all links with class "aalink"
-        aalinks = soup.find_all("a", class_="aalink")
-        
-        for link in aalinks:
-            href = link.get("href", "")
+        for href in hrefs:
             if href and "/course/view.php" in href:
                 full_url = self.build_url(href)
                 course_links.append(full_url)
         
         self.logger.info(f"Extracted {len(course_links)} course links")
         return course_links
-
+    
+    def extract_listed_courses(self, semester_html: str) -> List[Tuple[str, Optional[dict]]]:
+        """
+        Extract the courses of a semester listing with their name and teachers.
+        
+        A course box without a name or without a teacher list (Moodle omits it
+        for courses without course contacts, and some themes load it lazily)
+        gets no info, so its course page is fetched instead.
+        
+        Args:
+            semester_html: HTML content of semester page
+            
+        Returns:
+            List of (course URL, course info or None)
+        """
+        boxes = self.parse_fields(self.parser.extract_course_boxes, semester_html)
+        if not boxes:
+            # Not a coursebox listing: every course page is needed
+            return [(url, None) for url in self.extract_course_links(semester_html)]
+        
+        listed = []
+        for box in boxes:
+            href = box["href"]
+            if not href or "/course/view.php" not in href:
+                continue
+            course_url = self.build_url(href)
+            course_id = self.extract_id_from_url(course_url, "id")
+            course_info = None
+            if course_id and self.normalize_text(box["course_name"] or "") and box["teachers"] is not None:
+                course_info = self.build_course_info(course_id, box["course_name"], box["teachers"])
+            listed.append((course_url, course_info))
+        
+        complete = sum(1 for _, course_info in listed if course_info)
+        self.logger.info(f"Extracted {len(listed)} listed courses, {complete} with name and teachers")
+        return listed
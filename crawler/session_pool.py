@@ -0,0 +1,241 @@
+"""
+Session pool module for HCMUT LMS Crawler.
+Spreads requests round-robin over several logged-in LMS sessions and detects
+sessions that expired mid-run: Moodle then answers with HTTP 200 and a login
+or guest page, which must never be saved as a course or user page.
+"""
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from utils.config import read_cookies_file
+from utils.metrics import METRICS
+
+
+# Text found on Moodle login pages and on pages served to guests (English and Vietnamese UI)
+LOGIN_PAGE_MARKERS = (
+    'id="page-login-index"',
+    "You are not logged in",
+    "Bạn chưa đăng nhập",
+    "You are currently using guest access",
+    "Bạn đang truy cập với tư cách khách",
+)
+
+# Seconds between reloads of the cookies file while all sessions are expired
+RELOAD_INTERVAL = 10
+
+SESSION_EVENTS = METRICS.counter("lms_session_events_total", "Session pool events", ("event",))
+LIVE_SESSIONS = METRICS.gauge("lms_live_sessions", "Sessions not known to be expired")
+
+
+def is_login_page(url: str, text: str) -> bool:
+    """
+    Check whether a response is a login or guest page instead of the requested page.
+
+    Args:
+        url: Final URL of the response (after redirects)
+        text: Response body
+
+    Returns:
+        True if the session that fetched it is not logged in
+    """
+    if urlparse(url).path.startswith("/login/"):
+        return True
+    return any(marker in text for marker in LOGIN_PAGE_MARKERS)
+
+
+class SessionsExhausted(RuntimeError):
+    """Raised when every session has expired and none was added in time."""
+
+
+class LmsSession:
+    """One logged-in session (a Cookie header value)."""
+
+    __slots__ = ("name", "cookie", "expired_at", "requests")
+
+    def __init__(self, name: str, cookie: str):
+        self.name = name
+        self.cookie = cookie
+        self.expired_at: Optional[float] = None
+        self.requests = 0
+
+    @property
+    def expired(self) -> bool:
+        return self.expired_at is not None
+
+
+class SessionPool:
+    """
+    Round-robin pool of LMS sessions with expiry detection and failover.
+
+    Fetchers take a session for every request with acquire() and report each
+    successful response to check_response(). A login or guest page marks its
+    session expired, is quarantined instead of being returned, and the
+    request is retried with the next session. Once every session has expired
+    the pool pauses the crawl for up to `wait` seconds, reloading the cookies
+    file so fresh cookies can be added without restarting, and then gives up.
+    """
+
+    def __init__(
+        self,
+        cookies: List[str],
+        cookies_file: Optional[str] = None,
+        quarantine_dir: Optional[str] = None,
+        wait: float = 0
+    ):
+        """
+        Initialize session pool.
+
+        Args:
+            cookies: Cookie header values, one per session
+            cookies_file: File of cookies reloaded while all sessions are expired
+            quarantine_dir: Directory login and guest pages are written to for inspection
+            wait: Seconds to pause while all sessions are expired (0 = give up immediately)
+        """
+        self.cookies_file = cookies_file
+        self.quarantine_dir = Path(quarantine_dir) if quarantine_dir else None
+        self.wait = wait
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._sessions: List[LmsSession] = []
+        self._next = 0
+        self._exhausted_since: Optional[float] = None
+        self._reloaded_at = 0.0
+        self.add(cookies)
+
+    def add(self, cookies: List[str]) -> int:
+        """
+        Add sessions, skipping cookies already in the pool.
+
+        Args:
+            cookies: Cookie header values
+
+        Returns:
+            Number of sessions added
+        """
+        with self._lock:
+            known = {session.cookie for session in self._sessions}
+            added = 0
+            for cookie in cookies:
+                if cookie and cookie not in known:
+                    known.add(cookie)
+                    self._sessions.append(LmsSession(f"session-{len(self._sessions) + 1}", cookie))
+                    added += 1
+            if added:
+                self._exhausted_since = None
+            LIVE_SESSIONS.set(sum(not session.expired for session in self._sessions))
+            return added
+
+    def try_acquire(self) -> Optional[LmsSession]:
+        """
+        Take the next live session without blocking.
+
+        Returns:
+            Session, or None if every session has expired
+
+        Raises:
+            SessionsExhausted: If every session has been expired for longer than `wait`
+        """
+        with self._lock:
+            for offset in range(len(self._sessions)):
+                session = self._sessions[(self._next + offset) % len(self._sessions)]
+                if not session.expired:
+                    self._next = (self._next + offset + 1) % len(self._sessions)
+                    session.requests += 1
+                    return session
+
+            now = time.time()
+            if self._exhausted_since is None:
+                self._exhausted_since = now
+                SESSION_EVENTS.inc(event="paused")
+                self.logger.error(
+                    f"All {len(self._sessions)} sessions have expired. "
+                    + (f"Pausing up to {self.wait:.0f}s: add fresh cookies to {self.cookies_file}"
+                       if self.wait and self.cookies_file else "Update COOKIE and run the crawler again")
+                )
+            if now - self._exhausted_since >= self.wait:
+                raise SessionsExhausted("All LMS sessions have expired")
+            reload = self.cookies_file and now - self._reloaded_at >= RELOAD_INTERVAL
+            if reload:
+                self._reloaded_at = now
+
+        if reload and self.add(read_cookies_file(self.cookies_file)):
+            self.logger.info(f"Loaded fresh cookies from {self.cookies_file}, resuming")
+            return self.try_acquire()
+        return None
+
+    def acquire(self) -> LmsSession:
+        """
+        Take the next live session, pausing while every session is expired.
+
+        Returns:
+            Session
+
+        Raises:
+            SessionsExhausted: If no live session became available within `wait` seconds
+        """
+        while True:
+            session = self.try_acquire()
+            if session is not None:
+                return session
+            time.sleep(1)
+
+    def check_response(self, session: LmsSession, requested_url: str, final_url: str, text: str) -> bool:
+        """
+        Check a successful response for a login or guest page.
+
+        A login page marks the session expired and is quarantined.
+
+        Args:
+            session: Session that sent the request
+            requested_url: Requested URL
+            final_url: URL of the response after redirects
+            text: Response body
+
+        Returns:
+            True if the response must be discarded and the request retried with another session
+        """
+        if not is_login_page(final_url, text):
+            return False
+
+        with self._lock:
+            newly_expired = not session.expired
+            if newly_expired:
+                session.expired_at = time.time()
+            live = sum(not s.expired for s in self._sessions)
+        LIVE_SESSIONS.set(live)
+        if newly_expired:
+            SESSION_EVENTS.inc(event="expired")
+            self.logger.warning(
+                f"{session.name} expired after {session.requests} requests (got a login page for {requested_url}), "
+                f"{live} sessions left"
+            )
+        self.quarantine(requested_url, text)
+        return True
+
+    def quarantine(self, url: str, text: str):
+        """Write a rejected page to the quarantine directory instead of the HTML store."""
+        SESSION_EVENTS.inc(event="quarantined")
+        if self.quarantine_dir is None:
+            return
+        self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        with open(self.quarantine_dir / f"{name}.html", "w", encoding="utf-8") as f:
+            f.write(f"<!-- {url} -->\n{text}")
+
+    def stats(self) -> List[dict]:
+        """
+        Summarize every session.
+
+        Returns:
+            List of {"name", "requests", "expired"} dictionaries
+        """
+        with self._lock:
+            return [
+                {"name": session.name, "requests": session.requests, "expired": session.expired}
+                for session in self._sessions
+            ]
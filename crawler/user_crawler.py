@@ -2,15 +2,25 @@
 User Crawler module for HCMUT LMS Crawler.
 Handles parsing and crawling of user profile pages.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from crawler.lms_crawler import LmsCrawler
 from utils.html_saver import HtmlSaver
+from utils.negative_cache import NegativeCache, REASON_ALERT, REASON_NOT_FOUND
 
 
 class UserCrawler(LmsCrawler):
     """Crawler for user profile pages."""
     
-    def __init__(self, base_url: str, headers: dict, html_saver: HtmlSaver):
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        html_saver: HtmlSaver,
+        fetcher=None,
+        parser=None,
+        page_metadata=None,
+        negative_cache: Optional[NegativeCache] = None
+    ):
         """
         Initialize user crawler.
         
@@ -18,9 +28,33 @@ class UserCrawler(LmsCrawler):
             base_url: Base URL of the LMS
             headers: HTTP headers including authentication
             html_saver: HtmlSaver instance for file operations
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
+            negative_cache: Known-dead user IDs, skipped without a request
         """
-        super().__init__(base_url, headers)
+        super().__init__(base_url, headers, fetcher, parser, page_metadata)
         self.html_saver = html_saver
+        self.negative_cache = negative_cache
+    
+    @staticmethod
+    def profile_url(user_url: str) -> str:
+        """Get the URL of a profile page listing all of the user's courses."""
+        if "showallcourses" in user_url:
+            return user_url
+        separator = "&" if "?" in user_url else "?"
+        return f"{user_url}{separator}showallcourses=1"
+    
+    def prefetch_user(self, user_url: str):
+        """
+        Start downloading the page crawl_user will need (see LmsCrawler.prefetch_page).
+        
+        Args:
+            user_url: URL of the user profile page
+        """
+        user_id = self.extract_id_from_url(user_url, "id")
+        if user_id and not (self.negative_cache and self.negative_cache.is_dead("users", user_id, count_hit=False)):
+            self.prefetch_page("users", user_id, self.profile_url(user_url))
     
     def crawl_user(self, user_url: str) -> Optional[Dict[str, any]]:
         """
@@ -39,35 +73,35 @@ class UserCrawler(LmsCrawler):
             return None
         
         # Ensure showallcourses=1 parameter is included
-        if "showallcourses" not in user_url:
-            separator = "&" if "?" in user_url else "?"
-            user_url = f"{user_url}{separator}showallcourses=1"
-        
-        # Check if file already exists (idempotency)
-        if self.html_saver.file_exists("users", user_id):
-            self.logger.info(f"User {user_id} already exists, skipping download")
-            # Still need to extract course links for processing
-            file_path = self.html_saver.get_file_path("users", user_id)
-            with open(file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-        else:
-            # Fetch the page
-            html_content = self.fetch_page(user_url)
-            if not html_content:
-                self.logger.error(f"Failed to fetch user {user_id}")
+        user_url = self.profile_url(user_url)
+        
+        # Skip IDs that showed an error alert or did not exist before
+        if self.negative_cache and self.negative_cache.is_dead("users", user_id):
+            self.logger.debug(f"User {user_id} is in the negative cache, skipping")
+            return None
+        
+        # Reuse the saved page unless it is missing or due for revalidation
+        html_content, result = self.load_page("users", user_id, user_url)
+        if not html_content:
+            if result and result.not_found:
+                self.logger.warning(f"User {user_id} not found, skipping")
+                if self.negative_cache:
+                    self.negative_cache.record("users", user_id, REASON_NOT_FOUND)
                 return None
+            self.logger.error(f"Failed to fetch user {user_id}")
+            return None
 
-            alert = self.parse_html(html_content).find("div", class_="alert")
-            if alert:
-                self.logger.warning(f"Error alert found for user {user_id}, skipping")
-                return None
-            
-            # Save the HTML
-            file_path = self.html_saver.save_html("users", user_id, html_content)
-            self.logger.info(f"Saved user {user_id} to {file_path}")
+        # Parse once: error alert pages are not saved but remembered as dead
+        fields = self.parse_fields(self.parser.extract_user, html_content)
+        if fields and fields["has_alert"] and self.negative_cache:
+            self.negative_cache.record("users", user_id, REASON_ALERT)
+        user_info = self.build_user_info(fields, user_id)
+        if not user_info:
+            return None
         
-        # Extract user information
-        user_info = self.extract_user_info(html_content, user_id)
+        # Save the HTML if it was downloaded
+        if result:
+            self.save_page("users", user_id, user_url, result, user_info)
         return user_info
     
     def extract_user_info(self, html_content: str, user_id: str) -> Optional[Dict[str, any]]:
@@ -81,68 +115,45 @@ class UserCrawler(LmsCrawler):
         Returns:
             Dictionary with user information
         """
-        soup = self.parse_html(html_content)
-        if not soup:
+        return self.build_user_info(self.parse_fields(self.parser.extract_user, html_content), user_id)
+
+    def build_user_info(self, fields: Optional[Dict[str, any]], user_id: str) -> Optional[Dict[str, any]]:
+        """
+        Build user information from the fields extracted by the parser backend.
+        
+        Args:
+            fields: Result of the backend's extract_user (None if parsing failed)
+            user_id: ID of the user
+            
+        Returns:
+            Dictionary with user information, or None for error alert pages
+        """
+        if not fields:
             return None
 
         # Check for error alert
-        alert = soup.find("div", class_="alert")
-        if alert:
+        if fields["has_alert"]:
             self.logger.warning(f"Error alert found for user {user_id}, skipping")
             return None
         
         # Extract teacher name from page-header-headings
-        teacher_name = ""
-        header = soup.find(class_="page-header-headings")
-        if header:
-            teacher_name = self.normalize_text(header.get_text())
+        teacher_name = self.normalize_text(fields["header"] or "")
         
         # Extract role from .userprofile .description
-        role = ""
-        userprofile = soup.find(class_="userprofile")
-        if userprofile:
-            description = userprofile.find(class_="description")
-            if description:
-                role = self.normalize_text(description.get_text())
+        role = self.normalize_text(fields["role"] or "")
         
         # Extract profile details from div.profile_tree (Section 0 - dt/dd pairs)
         profile_details = {}
-        profile_tree = soup.find("div", class_="profile_tree")
-        if profile_tree:
-            sections = profile_tree.find_all("section", recursive=False)
-            if sections:
-                # Section 0 contains profile details (dt/dd pairs)
-                first_section = sections[0]
-                dts = first_section.find_all("dt")
-                dds = first_section.find_all("dd")
-                
-                for dt, dd in zip(dts, dds):
-                    key = self.normalize_description_title(dt.get_text())
-                    value = self.normalize_text(dd.get_text())
-                    if key:
-                        profile_details[key] = value
+        for dt_text, dd_text in fields["details"]:
+            key = self.normalize_description_title(dt_text)
+            value = self.normalize_text(dd_text)
+            if key:
+                profile_details[key] = value
         
         # Extract course links from div.profile_tree (Section 1 - a tags)
-        course_links = []
-        if profile_tree:
-            sections = profile_tree.find_all("section", recursive=False)
-            if len(sections) > 1:
-
-                valid_str_contained = []
-                invalid_str_contained = ["_video"]
-                # Section 1 contains course profiles
-                course_section = sections[1]
-                course_anchors = [a for a in course_section.find_all("a") if not any(invalid_str in a.get_text().lower() for invalid_str in invalid_str_contained)]
-
-                # get top 10 only
-                course_anchors = course_anchors[:10]
-                
-                for anchor in course_anchors:
-                    href = anchor.get("href", "")
-                    teaching_course_id = self.extract_id_from_url(href, "course")
-                    full_url = self.build_url(f"enrol/index.php?id={teaching_course_id}")
-                    course_links.append(full_url)
-                        
+        course_links = self.build_course_links(
+            [(text, self.extract_id_from_url(href, "course")) for text, href in fields["courses"]]
+        )
         
         user_info = {
             "user_id": user_id,
@@ -155,6 +166,52 @@ class UserCrawler(LmsCrawler):
         self.logger.info(f"User {user_id}: {teacher_name}, {len(course_links)} courses")
         return user_info
 
+    def build_course_links(self, courses: List[Tuple[str, Optional[str]]]) -> List[str]:
+        """
+        Build the course links of a user from the courses listed on the profile.
+        
+        Args:
+            courses: (course name, course ID) pairs in profile order
+            
+        Returns:
+            Enrolment URLs of the first 10 courses, skipping video courses
+        """
+        invalid_str_contained = ["_video"]
+        courses = [
+            (name, course_id) for name, course_id in courses
+            if not any(invalid_str in name.lower() for invalid_str in invalid_str_contained)
+        ]
+
+        # get top 10 only
+        return [self.build_url(f"enrol/index.php?id={course_id}") for _, course_id in courses[:10]]
+
+    def has_profile(self, user_id: str) -> bool:
+        """
+        Check whether a user ID has a valid profile (used to measure ID density).
+        
+        Args:
+            user_id: ID of the user
+            
+        Returns:
+            True if the profile page was saved
+        """
+        return self.html_saver.file_exists("users", user_id)
+
+    def build_user_courses(self, user_info: Dict[str, any]) -> List[Dict[str, any]]:
+        """
+        Build the user-course link records of a user.
+        
+        Args:
+            user_info: Dictionary returned by extract_user_info
+            
+        Returns:
+            List of {"user_id", "course_id"} dictionaries
+        """
+        return [
+            {"user_id": user_info["user_id"], "course_id": self.extract_id_from_url(course_url, "id")}
+            for course_url in user_info.get("course_links", [])
+        ]
+
     def normalize_description_title(self, dt: str) -> str:
         if ("email" in dt.lower()):
             return "email"
@@ -180,11 +237,8 @@ class UserCrawler(LmsCrawler):
         if not self.html_saver.file_exists("users", user_id):
             return []
         
-        file_path = self.html_saver.get_file_path("users", user_id)
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-            
+            html_content = self.html_saver.read_html("users", user_id)
             user_info = self.extract_user_info(html_content, user_id)
             return user_info.get("course_links", [])
         except Exception as e:
@@ -0,0 +1,188 @@
+"""
+Web-service client module for HCMUT LMS Crawler.
+Calls Moodle's REST web-service (webservice/rest/server.php) with a token
+through the shared HTTP engine, and coalesces the lookups of concurrent
+workers into calls that take many IDs at once.
+"""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics import ERRORS, METRICS
+
+
+WS_CALLS = METRICS.counter("lms_ws_calls_total", "Web-service calls by function and outcome", ("function", "outcome"))
+WS_BATCH_SIZE = METRICS.histogram(
+    "lms_ws_batch_size", "IDs sent per batched web-service call", ("function",), (1, 2, 5, 10, 20, 50, 100, 200)
+)
+
+REST_PATH = "/webservice/rest/server.php"
+
+
+def encode_params(params: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """
+    Flatten call arguments into Moodle's form encoding.
+
+    Lists and dictionaries become indexed fields, e.g.
+    {"values": [1, 2]} -> {"values[0]": "1", "values[1]": "2"}.
+
+    Args:
+        params: Arguments of the web-service function
+        prefix: Field name the arguments are nested under
+
+    Returns:
+        Form fields
+    """
+    fields = {}
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, dict):
+            fields.update(encode_params(value, name))
+        elif isinstance(value, (list, tuple)):
+            fields.update(encode_params(dict(enumerate(value)), name))
+        elif isinstance(value, bool):
+            fields[name] = "1" if value else "0"
+        else:
+            fields[name] = str(value)
+    return fields
+
+
+class MoodleWsClient:
+    """Moodle REST web-service client (JSON responses)."""
+
+    def __init__(self, base_url: str, token: str, fetcher):
+        """
+        Initialize web-service client.
+
+        Args:
+            base_url: Base URL of the LMS
+            token: Web-service token (sent in the POST body, so it never shows up in logged URLs)
+            fetcher: Shared HTTP engine (RequestsFetcher or AsyncFetcher)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.fetcher = fetcher
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def call(self, function: str, **params) -> Optional[Any]:
+        """
+        Call a web-service function.
+
+        Args:
+            function: Function name (e.g. "core_user_get_users_by_field")
+            **params: Arguments of the function
+
+        Returns:
+            Decoded JSON response, or None if the request failed or Moodle
+            answered with an exception (e.g. an invalid token)
+        """
+        url = f"{self.base_url}{REST_PATH}?wsfunction={function}&moodlewsrestformat=json"
+        result = self.fetcher.fetch_response(url, data={"wstoken": self.token, **encode_params(params)})
+        if result is None:
+            WS_CALLS.inc(function=function, outcome="failed")
+            return None
+
+        try:
+            response = json.loads(result.text)
+        except ValueError as e:
+            self.logger.error(f"{function} returned invalid JSON: {e}")
+            WS_CALLS.inc(function=function, outcome="failed")
+            ERRORS.inc(type="ws_invalid_json")
+            return None
+
+        # Moodle reports errors as a JSON object with HTTP 200
+        if isinstance(response, dict) and "exception" in response:
+            self.logger.error(f"{function} failed: {response.get('errorcode')}: {response.get('message')}")
+            WS_CALLS.inc(function=function, outcome="exception")
+            ERRORS.inc(type=f"ws_{response.get('errorcode') or 'exception'}")
+            return None
+
+        WS_CALLS.inc(function=function, outcome="ok")
+        return response
+
+
+class _Lookup:
+    """One key waiting in a WsBatcher."""
+
+    __slots__ = ("key", "result", "done", "lead")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.result = None
+        self.done = False
+        self.lead = False
+
+
+class WsBatcher:
+    """
+    Coalesces lookups by ID from concurrent worker threads into batched calls.
+
+    At most one call is in flight. Keys requested while it runs are queued
+    and sent together (up to max_batch per call) as soon as it returns, so a
+    single worker pays no extra latency and many workers share one request.
+    The first queued worker sends the next call.
+    """
+
+    def __init__(self, function: str, fetch_many: Callable[[List[str]], Optional[Dict[str, Any]]], max_batch: int = 100):
+        """
+        Initialize batcher.
+
+        Args:
+            function: Web-service function name, used as a metrics label
+            fetch_many: Sends one call for a list of keys and returns the
+                found items by key, or None if the call failed
+            max_batch: Maximum number of keys per call
+        """
+        self.function = function
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._cond = threading.Condition()
+        self._pending: List[_Lookup] = []
+        self._busy = False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a key, blocking until the call it was sent in returns.
+
+        Args:
+            key: ID to look up
+
+        Returns:
+            Items found by the call the key was sent in (key -> item; the key
+            is missing if it does not exist), or None if the call failed
+        """
+        lookup = _Lookup(key)
+        with self._cond:
+            self._pending.append(lookup)
+            if not self._busy:
+                self._busy = True
+                lookup.lead = True
+            while not (lookup.done or lookup.lead):
+                self._cond.wait()
+            if lookup.done:
+                return lookup.result
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+
+        keys = list(dict.fromkeys(item.key for item in batch))
+        results = None
+        try:
+            WS_BATCH_SIZE.observe(len(keys), function=self.function)
+            results = self.fetch_many(keys)
+        except Exception as e:
+            self.logger.error(f"{self.function} failed for {len(keys)} IDs: {e}")
+            ERRORS.inc(type=type(e).__name__)
+        finally:
+            with self._cond:
+                for item in batch:
+                    item.result = results
+                    item.done = True
+                # Hand the next call over to the first queued worker
+                if self._pending:
+                    self._pending[0].lead = True
+                else:
+                    self._busy = False
+                self._cond.notify_all()
+        return lookup.result
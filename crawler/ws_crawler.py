@@ -0,0 +1,366 @@
+"""
+Web-service crawler module for HCMUT LMS Crawler.
+Semester, course and user crawlers that read Moodle's REST web-service
+instead of scraping HTML pages, behind the same interfaces and producing
+the same records. Used when WS_TOKEN is set.
+
+Functions used:
+    core_course_get_categories          all categories in one call
+    core_course_get_courses_by_field    the courses of a category with their contacts (teachers),
+                                        or many courses by ID in one call
+    core_user_get_users_by_field        many user profiles by ID in one call
+    core_enrol_get_users_courses        the courses of one user
+    core_enrol_get_enrolled_users       the participants of a course (PARTICIPANTS mode)
+
+Nothing is written to the HTML store: the web-service responses are not
+pages, so "python main.py reparse" cannot rebuild these records.
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.parsers import Anchor
+from crawler.semester_crawler import SemesterCrawler
+from crawler.course_crawler import CourseCrawler
+from crawler.user_crawler import UserCrawler
+from crawler.ws_client import MoodleWsClient, WsBatcher
+from utils.negative_cache import REASON_NOT_FOUND
+
+
+# Teacher link of a course contact, as on the course boxes of the HTML pages
+TEACHER_LINK = "/user/profile.php?id={user_id}&course={course_id}"
+
+# Country names shown on profile pages for the country codes returned by the web-service
+COUNTRY_NAMES = {"VN": "Vietnam"}
+
+# Profile pages show the server timezone for users on the default timezone ("99")
+SERVER_TIMEZONE = "Asia/Ho_Chi_Minh"
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def ws_text(value: Optional[str]) -> str:
+    """Plain text of a formatted web-service string (tags stripped, entities decoded)."""
+    return html.unescape(TAG_PATTERN.sub(" ", value or ""))
+
+
+def ws_course_fields(course: Dict[str, Any]) -> Tuple[str, str, List[Anchor]]:
+    """
+    Get the fields of a course box from a web-service course.
+
+    Args:
+        course: Course returned by core_course_get_courses_by_field
+
+    Returns:
+        (course ID, course name, (teacher name, teacher link) pairs) for LmsCrawler.build_course_info
+    """
+    course_id = str(course["id"])
+    teachers = [
+        (ws_text(contact.get("fullname")), TEACHER_LINK.format(user_id=contact["id"], course_id=course_id))
+        for contact in course.get("contacts") or []
+    ]
+    return course_id, ws_text(course.get("fullname")), teachers
+
+
+def _by_id(items: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Index the items of a web-service response by ID (None if the call failed)."""
+    if items is None:
+        return None
+    return {str(item["id"]): item for item in items}
+
+
+class WsSemesterCrawler(SemesterCrawler):
+    """Semester crawler backed by the web-service."""
+
+    def __init__(self, base_url: str, headers: dict, html_saver, fetcher=None, parser=None, page_metadata=None,
+                 ws_client: Optional[MoodleWsClient] = None):
+        """
+        Initialize web-service semester crawler.
+
+        Args:
+            base_url: Base URL of the LMS
+            headers: HTTP headers
+            html_saver: HtmlSaver instance (unused, kept for the SemesterCrawler interface)
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
+            ws_client: Web-service client
+        """
+        super().__init__(base_url, headers, html_saver, fetcher, parser, page_metadata)
+        self.ws_client = ws_client
+
+    def discover_semesters(self) -> List[Dict[str, str]]:
+        """
+        Discover all semesters from the category tree.
+
+        Returns:
+            List of semester dictionaries with url, category_id, and metadata
+        """
+        categories = self.ws_client.call("core_course_get_categories")
+        if categories is None:
+            self.logger.error("Could not get the course categories")
+            return []
+
+        # The course list page shows every category as its path of names
+        names = {str(category["id"]): ws_text(category.get("name")) for category in categories}
+        semesters = []
+        for category in sorted(categories, key=lambda category: category.get("sortorder", 0)):
+            path = [names.get(part, "") for part in (category.get("path") or "").split("/") if part]
+            category_url = self.build_url(f"/course/index.php?categoryid={category['id']}")
+            semester_info = self.build_semester_info(" / ".join(path), category_url)
+            if semester_info:
+                semesters.append(semester_info)
+
+        self.logger.info(f"Discovered {len(semesters)} semesters")
+        return semesters
+
+    def crawl_semester(self, semester_info: Dict[str, str]) -> Optional[str]:
+        """
+        Crawl a single semester. Nothing is saved in web-service mode.
+
+        Returns:
+            Category ID, or None if failed
+        """
+        if self.crawl_semester_courses(semester_info) is None:
+            return None
+        return semester_info["category_id"]
+
+    def crawl_semester_courses(self, semester_info: Dict[str, str]) -> Optional[List[str]]:
+        """
+        Get the course links of a semester.
+
+        Args:
+            semester_info: Dictionary containing semester information
+
+        Returns:
+            List of course URLs, or None if failed
+        """
+        listed = self.crawl_semester_listing(semester_info)
+        if listed is None:
+            return None
+        return [course_url for course_url, _ in listed]
+
+    def crawl_semester_listing(self, semester_info: Dict[str, str]) -> Optional[List[Tuple[str, Optional[dict]]]]:
+        """
+        Get the courses of a semester with their name and teachers in one call.
+
+        Args:
+            semester_info: Dictionary containing semester information
+
+        Returns:
+            List of (course URL, course info), or None if failed
+        """
+        category_id = semester_info["category_id"]
+        response = self.ws_client.call("core_course_get_courses_by_field", field="category", value=category_id)
+        if response is None:
+            self.logger.error(f"Failed to fetch semester {category_id}")
+            return None
+
+        listed = []
+        for course in response.get("courses", []):
+            course_info = self.build_course_info(*ws_course_fields(course))
+            listed.append((self.build_url(f"/course/view.php?id={course_info['course_id']}"), course_info))
+
+        self.logger.info(f"Extracted {len(listed)} courses of semester {category_id}")
+        return listed
+
+
+class WsCourseCrawler(CourseCrawler):
+    """Course crawler backed by the web-service, batching concurrent lookups."""
+
+    def __init__(self, base_url: str, headers: dict, html_saver, fetcher=None, parser=None, page_metadata=None,
+                 ws_client: Optional[MoodleWsClient] = None, batch_size: int = 100):
+        """
+        Initialize web-service course crawler.
+
+        Args:
+            base_url: Base URL of the LMS
+            headers: HTTP headers
+            html_saver: HtmlSaver instance (unused, kept for the CourseCrawler interface)
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
+            ws_client: Web-service client
+            batch_size: Maximum number of course IDs per call
+        """
+        super().__init__(base_url, headers, html_saver, fetcher, parser, page_metadata)
+        self.ws_client = ws_client
+        self.courses = WsBatcher("core_course_get_courses_by_field", self._fetch_courses, batch_size)
+
+    def _fetch_courses(self, course_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        response = self.ws_client.call("core_course_get_courses_by_field", field="ids", value=",".join(course_ids))
+        return _by_id(response.get("courses", []) if response is not None else None)
+
+    def crawl_course(self, course_url: str) -> Optional[Dict[str, any]]:
+        """
+        Crawl a single course.
+
+        Args:
+            course_url: URL of the course page
+
+        Returns:
+            Dictionary with course info and teacher links, or None if failed
+        """
+        course_id = self.extract_id_from_url(course_url, "id")
+        if not course_id:
+            self.logger.warning(f"Could not extract course ID from: {course_url}")
+            return None
+
+        courses = self.courses.get(course_id)
+        if courses is None:
+            self.logger.error(f"Failed to fetch course {course_id}")
+            return None
+        if course_id not in courses:
+            self.logger.warning(f"Course {course_id} not found")
+            return None
+
+        course_info = self.build_course_info(*ws_course_fields(courses[course_id]))
+        self.logger.info(
+            f"Course {course_id}: {course_info['course_name']}, {len(course_info['teacher_links'])} teachers"
+        )
+        return course_info
+
+
+    def crawl_participants(self, course_id: str, per_page: int = 5000) -> Optional[List[str]]:
+        """
+        Get the participant IDs of a course, per_page users per call.
+
+        Args:
+            course_id: ID of the course
+            per_page: Maximum number of participants per call
+
+        Returns:
+            IDs of the participants, or None if a call failed
+        """
+        user_ids = []
+        while True:
+            users = self.ws_client.call("core_enrol_get_enrolled_users", courseid=course_id, options=[
+                {"name": "userfields", "value": "id"},
+                {"name": "limitfrom", "value": len(user_ids)},
+                {"name": "limitnumber", "value": per_page},
+            ])
+            if users is None:
+                self.logger.error(f"Failed to fetch the participants of course {course_id}")
+                return None
+            user_ids.extend(str(user["id"]) for user in users)
+            if len(users) < per_page:
+                break
+
+        self.logger.info(f"Course {course_id}: {len(user_ids)} participants")
+        return user_ids
+
+
+class WsUserCrawler(UserCrawler):
+    """User crawler backed by the web-service, batching concurrent profile lookups."""
+
+    def __init__(self, base_url: str, headers: dict, html_saver, fetcher=None, parser=None, page_metadata=None,
+                 negative_cache=None, ws_client: Optional[MoodleWsClient] = None, batch_size: int = 100):
+        """
+        Initialize web-service user crawler.
+
+        Args:
+            base_url: Base URL of the LMS
+            headers: HTTP headers
+            html_saver: HtmlSaver instance (unused, kept for the UserCrawler interface)
+            fetcher: Shared HTTP engine (see LmsCrawler)
+            parser: Parser backend (see LmsCrawler)
+            page_metadata: Page validators and TTLs (see LmsCrawler)
+            negative_cache: Known-dead user IDs, skipped without a request
+            ws_client: Web-service client
+            batch_size: Maximum number of user IDs per call
+        """
+        super().__init__(base_url, headers, html_saver, fetcher, parser, page_metadata, negative_cache)
+        self.ws_client = ws_client
+        self.users = WsBatcher("core_user_get_users_by_field", self._fetch_users, batch_size)
+
+    def _fetch_users(self, user_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        return _by_id(self.ws_client.call("core_user_get_users_by_field", field="id", values=user_ids))
+
+    def crawl_user(self, user_url: str) -> Optional[Dict[str, any]]:
+        """
+        Crawl a single user: the profile (batched) and the list of courses.
+
+        Args:
+            user_url: URL of the user profile page
+
+        Returns:
+            Dictionary with user info and course links, or None if failed
+        """
+        user_id = self.extract_id_from_url(user_url, "id")
+        if not user_id:
+            self.logger.warning(f"Could not extract user ID from: {user_url}")
+            return None
+
+        # Skip IDs that did not exist before
+        if self.negative_cache and self.negative_cache.is_dead("users", user_id):
+            self.logger.debug(f"User {user_id} is in the negative cache, skipping")
+            return None
+
+        users = self.users.get(user_id)
+        if users is None:
+            self.logger.error(f"Failed to fetch user {user_id}")
+            return None
+        if user_id not in users:
+            self.logger.warning(f"User {user_id} not found, skipping")
+            if self.negative_cache:
+                self.negative_cache.record("users", user_id, REASON_NOT_FOUND)
+            return None
+
+        courses = self.ws_client.call("core_enrol_get_users_courses", userid=user_id)
+        if courses is None:
+            self.logger.error(f"Failed to fetch the courses of user {user_id}")
+            return None
+        return self.build_ws_user_info(users[user_id], courses)
+
+    def build_ws_user_info(self, user: Dict[str, Any], courses: List[Dict[str, Any]]) -> Dict[str, any]:
+        """
+        Build user information from web-service data.
+
+        Args:
+            user: User returned by core_user_get_users_by_field
+            courses: Courses returned by core_enrol_get_users_courses
+
+        Returns:
+            Dictionary with user information, as extract_user_info returns it
+        """
+        user_id = str(user["id"])
+        teacher_name = self.normalize_text(ws_text(user.get("fullname")))
+        role = self.normalize_text(ws_text(user.get("description")))
+
+        # Only the fields a profile page shows (hidden and empty fields are left out)
+        values = {
+            "email": user.get("email"),
+            "country": COUNTRY_NAMES.get(user.get("country"), user.get("country")),
+            "city": user.get("city"),
+            "timezone": SERVER_TIMEZONE if user.get("timezone") == "99" else user.get("timezone"),
+        }
+        profile_details = {
+            key: self.normalize_text(ws_text(value)) for key, value in values.items() if value
+        }
+
+        course_links = self.build_course_links(
+            [(ws_text(course.get("fullname")), str(course["id"])) for course in courses]
+        )
+
+        user_info = {
+            "user_id": user_id,
+            "teacher_name": teacher_name,
+            "role": role,
+            "profile_details": profile_details,
+            "course_links": course_links
+        }
+
+        self.logger.info(f"User {user_id}: {teacher_name}, {len(course_links)} courses")
+        return user_info
+
+    def has_profile(self, user_id: str) -> bool:
+        """
+        Check whether a user ID has a valid profile (used to measure ID density).
+
+        Args:
+            user_id: ID of the user
+
+        Returns:
+            True unless the web-service did not find the user
+        """
+        return not (self.negative_cache and self.negative_cache.is_dead("users", user_id))
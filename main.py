@@ -2,15 +2,43 @@
 Main orchestration script for HCMUT LMS Crawler.
 Coordinates all crawling operations with multi-threading support.
 """
-import json
+import argparse
+import copy
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Set, List, Callable, Any, Optional
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import List, Callable, Any, Iterable, Iterator, Optional, Tuple
 from utils.config import Config
-from utils.html_saver import HtmlSaver
+from utils.html_saver import HtmlSaver, create_html_store
+from utils.archive_store import ArchiveStore
+from utils.data_sink import JsonlDataSink
+from utils.columnar_export import export_columnar
+from utils.dataset_builder import DatasetBuilder
+from utils.search_index import build_search_index
+from utils.frontier import FrontierScheduler, SpillingFrontier, IN_FLIGHT, ITEMS, QUEUE_DEPTH
+from utils.crawl_state import CrawlStateStore, MAX_ITEM_ATTEMPTS
+from utils.page_metadata import PageMetadataStore
+from utils.negative_cache import NegativeCache
+from utils.shard_coordinator import ShardCoordinator, ShardFrontier, shard_dir, shard_id_range, shard_of, worker_name
+from utils.metrics import ERRORS, METRICS, MetricsServer, MetricsSnapshotWriter, enable_sampled_logging
+from utils.id_sweep import AdaptiveIdProber, iter_user_ids, merge_unique, read_id_file
+from utils.normalize import semester_priority
+from utils.rate_limiter import AdaptiveRateLimiter
+from crawler.lms_crawler import LmsCrawler
+from crawler.fetcher import RequestsFetcher, AsyncFetcher, REQUESTS
+from crawler.session_pool import SessionPool
+from crawler.parsers import create_parser
+from crawler.parser_parity import check_parser_parity
+from crawler.reparser import reparse
 from crawler.semester_crawler import SemesterCrawler
 from crawler.course_crawler import CourseCrawler
 from crawler.user_crawler import UserCrawler
+from crawler.ws_client import MoodleWsClient
+from crawler.ws_crawler import WsSemesterCrawler, WsCourseCrawler, WsUserCrawler
 
 
 # Configure logging
@@ -21,136 +49,219 @@ logging.basicConfig(
 
 logger = logging.getLogger("MainCrawler")
 
+# Seconds between checks of an idle shard worker for new work
+SHARD_POLL_SECONDS = 2
+
+SAVE_SECONDS = METRICS.histogram("lms_save_seconds", "Time to append a checkpoint to the JSON Lines files")
+LISTED_COURSES = METRICS.counter(
+    "lms_listed_courses_total", "Courses recorded from a semester listing without requesting their page"
+)
+LISTING_CHANGES = METRICS.counter(
+    "lms_listing_changes_total", "Courses added to or removed from semester listings since the last crawl", ("change",)
+)
+PARTICIPANT_LINKS = METRICS.counter(
+    "lms_participant_links_total", "User-course links taken from course participant lists"
+)
+EXPORT_SECONDS = METRICS.histogram("lms_export_seconds", "Time to export the JSON Lines files")
+
 
 class MainCrawler:
     """Main crawler orchestrator."""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, migrate_legacy: bool = True):
         """
         Initialize main crawler with configuration.
         
         Args:
             config: Configuration object
+            migrate_legacy: Import the JSON arrays of older versions into
+                OUTPUT_DIR (False for shard workers, whose OUTPUT_DIR is a shard directory)
         """
         self.config = config
-        self.html_saver = HtmlSaver(config.output_dir)
+        self.html_saver = create_html_store(
+            config.storage_backend,
+            config.output_dir,
+            config.archive_compression_level
+        )
+        self.data_sink = JsonlDataSink(config.output_dir, migrate_legacy=migrate_legacy)
         
-        # Initialize crawlers
+        # Initialize crawlers sharing one HTTP engine and parser backend
         headers = config.get_headers()
-        self.semester_crawler = SemesterCrawler(config.base_url, headers, self.html_saver)
-        self.course_crawler = CourseCrawler(config.base_url, headers, self.html_saver)
-        self.user_crawler = UserCrawler(config.base_url, headers, self.html_saver)
+        self.session_pool = SessionPool(
+            config.get_cookies(),
+            config.cookies_file,
+            quarantine_dir=str(self.html_saver.output_dir / "quarantine"),
+            wait=config.session_wait
+        )
+        self.fetcher = self._create_fetcher(headers)
+        self.parser = create_parser(config.parser_backend)
+        self.page_metadata = PageMetadataStore(
+            str(self.html_saver.output_dir / "page_metadata.sqlite3"),
+            config.get_refresh_ttls()
+        )
+        self.negative_cache = NegativeCache(
+            str(self.html_saver.output_dir / "negative_cache.sqlite3"),
+            config.negative_cache_ttl * 3600
+        )
+        crawler_args = (config.base_url, headers, self.html_saver, self.fetcher, self.parser, self.page_metadata)
+        if config.ws_token:
+            # Web-service backend: JSON calls batching many IDs instead of HTML pages
+            logger.info(f"Using the web-service backend (up to {config.ws_batch_size} IDs per call)")
+            ws_client = MoodleWsClient(config.base_url, config.ws_token, self.fetcher)
+            self.semester_crawler = WsSemesterCrawler(*crawler_args, ws_client=ws_client)
+            self.course_crawler = WsCourseCrawler(*crawler_args, ws_client=ws_client, batch_size=config.ws_batch_size)
+            self.user_crawler = WsUserCrawler(
+                *crawler_args, negative_cache=self.negative_cache, ws_client=ws_client, batch_size=config.ws_batch_size
+            )
+        else:
+            self.semester_crawler = SemesterCrawler(*crawler_args)
+            self.course_crawler = CourseCrawler(*crawler_args)
+            self.user_crawler = UserCrawler(*crawler_args, negative_cache=self.negative_cache)
         
-        # Track processed items
-        self.processed_courses: Set[str] = set()
-        self.processed_users: Set[str] = set()
+        # Persistent visited set and frontier (survives restarts)
+        self.crawl_state = CrawlStateStore(
+            str(self.html_saver.output_dir / "crawl_state.sqlite3"),
+            key_func=self._frontier_key,
+            priority_func=self._frontier_priority
+        )
 
+        # Records collected since the last save (guarded by _records_lock)
+        self._records_lock = threading.Lock()
+        self.started_at = time.time()
+        self._done_keys: List[tuple] = []
         self.all_courses: List[object] = []
         self.all_users: List[object] = []
         self.users_courses: List[object] = []
     
-    def execute_parallel_flatten(
-        self, 
-        func: Callable, 
-        items: List[Any], 
-        error_message_template: str = "Error processing {item}: {error}"
-    ) -> List[Any]:
+    def _create_fetcher(self, headers: dict):
         """
-        Execute a function in parallel and flatten the results (for functions returning lists).
+        Create the HTTP engine selected by FETCH_ENGINE.
         
         Args:
-            func: Function to execute for each item (should return a list)
-            items: List of items to process
-            error_message_template: Error message template with {item} and {error} placeholders
+            headers: HTTP headers including authentication
             
         Returns:
-            Flattened list of results from all function calls
+            RequestsFetcher or AsyncFetcher instance
         """
-        all_results = []
+        is_async = self.config.fetch_engine == "async"
+        # Web-service calls are authenticated by the token, not by session cookies
+        session_pool = None if self.config.ws_token else self.session_pool
+        rate_limiter = AdaptiveRateLimiter(
+            rate=self.config.rate_limit,
+            burst=self.config.rate_burst,
+            max_concurrency=self.config.max_concurrent_requests if is_async else self.config.number_of_workers,
+            target_latency=self.config.target_latency,
+            max_backoff=self.config.max_backoff
+        )
         
-        with ThreadPoolExecutor(max_workers=self.config.number_of_workers) as executor:
-            futures = {
-                executor.submit(func, item): item
-                for item in items
-            }
-            
-            for future in as_completed(futures):
-                item = futures[future]
-                try:
-                    result = future.result()
-                    if result:
-                        all_results.extend(result)
-                except Exception as e:
-                    logger.error(error_message_template.format(item=item, error=e))
-        
-        return all_results
+        if is_async:
+            logger.info(
+                f"Using async fetch engine (max {self.config.max_concurrent_requests} requests in flight, "
+                f"HTTP/2: {self.config.http2})"
+            )
+            return AsyncFetcher(
+                headers,
+                max_concurrency=self.config.max_concurrent_requests,
+                http2=self.config.http2,
+                rate_limiter=rate_limiter,
+                max_backoff=self.config.max_backoff,
+                session_pool=session_pool
+            )
+        return RequestsFetcher(
+            headers,
+            pool_size=self.config.number_of_workers,
+            rate_limiter=rate_limiter,
+            max_backoff=self.config.max_backoff,
+            session_pool=session_pool
+        )
     
     def execute_parallel_flatten_batched(
         self, 
         func: Callable, 
-        items: List[Any], 
+        items: Iterable[Any], 
         error_message_template: str = "Error processing {item}: {error}",
-        batch_size: Optional[int] = None
-    ) -> List[Any]:
+        batch_size: Optional[int] = None,
+        item_kind: str = "user",
+        result_kind: str = "course"
+    ) -> SpillingFrontier:
         """
-        Execute a function in parallel in batches and flatten the results.
-        Saves data after each batch to prevent data loss.
+        Execute a function in parallel over a stream of items and collect the flattened results.
+        
+        One thread pool serves the whole stream. Items are pulled lazily and
+        at most twice the number of workers are in flight, so a slow item
+        never holds up the others and memory does not grow with the input.
+        Data is saved every batch_size completed items. Results are
+        deduplicated and spilled to disk past 10000 entries.
         
         Args:
             func: Function to execute for each item (should return a list)
-            items: List of items to process
+            items: Items to process (any iterable, e.g. a generator)
             error_message_template: Error message template with {item} and {error} placeholders
-            batch_size: Size of each batch (defaults to config.batch_size)
+            batch_size: Number of completed items between saves (defaults to config.batch_size)
+            item_kind: Entity kind of the items, used as a metrics label
+            result_kind: Entity kind of the results, used to deduplicate them
             
         Returns:
-            Flattened list of results from all function calls
+            SpillingFrontier holding the results; read them with drain() and close() it afterwards
         """
         if batch_size is None:
             batch_size = self.config.batch_size
         
-        all_results = []
-        total_items = len(items)
+        results = SpillingFrontier(
+            self._frontier_key,
+            str(self.html_saver.output_dir / f"discovered_{result_kind}s.jsonl")
+        )
+        item_iterator = iter(items)
+        max_in_flight = self.config.number_of_workers * 2
+        in_flight = {}
+        exhausted = False
+        completed = failed = 0
         
-        logger.info(f"Processing {total_items} items in batches of {batch_size}")
+        logger.info(f"Processing items with {self.config.number_of_workers} workers, saving every {batch_size} items")
         
-        for batch_num, i in enumerate(range(0, total_items, batch_size), start=1):
-            batch = items[i:i + batch_size]
-            batch_end = min(i + batch_size, total_items)
-            
-            logger.info(f"Processing batch {batch_num}: items {i+1} to {batch_end} of {total_items}")
-            
-            batch_results = []
-            with ThreadPoolExecutor(max_workers=self.config.number_of_workers) as executor:
-                futures = {
-                    executor.submit(func, item): item
-                    for item in batch
-                }
+        with ThreadPoolExecutor(max_workers=self.config.number_of_workers) as executor:
+            while True:
+                # Top up the window of in-flight items (backpressure on the input)
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        item = next(item_iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(func, item)] = item
+                
+                IN_FLIGHT.set(len(in_flight))
+                if not in_flight:
+                    break
                 
-                for future in as_completed(futures):
-                    item = futures[future]
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
                     try:
-                        result = future.result()
-                        if result:
-                            batch_results.extend(result)
+                        for result in future.result() or []:
+                            results.push(result_kind, result)
+                        ITEMS.inc(kind=item_kind, outcome="done")
                     except Exception as e:
+                        failed += 1
+                        ITEMS.inc(kind=item_kind, outcome="failed")
+                        ERRORS.inc(type=type(e).__name__)
                         logger.error(error_message_template.format(item=item, error=e))
-            
-            all_results.extend(batch_results)
-            
-            logger.info(f"Batch {batch_num} completed: {len(batch_results)} results")
-            
-            # Save data after each batch
-            logger.info(f"Saving data after batch {batch_num}...")
+                    
+                    completed += 1
+                    QUEUE_DEPTH.set(len(results), kind=result_kind)
+                    if completed % batch_size == 0:
+                        logger.info(
+                            f"Processed {completed} items ({failed} failed), "
+                            f"{len(results)} {result_kind} results queued"
+                        )
+                        self.save_all_data()
+        
+        if completed % batch_size:
             self.save_all_data()
-            
-            # Clear the current batch data to free memory
-            self.all_courses.clear()
-            self.all_users.clear()
-            self.users_courses.clear()
         
-        logger.info(f"All batches completed: {total_items} items processed, {len(all_results)} total results")
+        logger.info(f"All items completed: {completed} items processed ({failed} failed), {len(results)} total results")
         
-        return all_results
+        return results
     
     def run(self):
         """Execute the full crawling workflow."""
@@ -174,52 +285,197 @@ class MainCrawler:
         
         logger.info(f"Found {len(semesters)} semesters")
         
-        # Step 2: Crawl semester pages
-        logger.info("Step 2: Crawling semester pages...")
-        all_course_urls = self.execute_parallel_flatten(
-            self.crawl_semester_and_extract,
-            semesters,
-            "Error processing semester {item}: {error}"
-        )
-        logger.info(f"Discovered {len(all_course_urls)} course URLs from semesters")
-        
-        # Step 3: Crawl courses and discover users
-        logger.info("Step 3: Crawling courses and discovering users...")
-        all_user_urls = self.execute_parallel_flatten(
-            self.crawl_course_and_extract,
-            all_course_urls,
-            "Error processing course {item}: {error}"
-        )
-        logger.info(f"Discovered {len(all_user_urls)} user URLs from courses")
-        
-        # Step 4: Crawl users and discover additional courses
-        logger.info("Step 4: Crawling users and discovering additional courses...")
-        additional_course_urls = self.execute_parallel_flatten(
-            self.crawl_user_and_extract,
-            all_user_urls,
-            "Error processing user {item}: {error}"
-        )
-        logger.info(f"Discovered {len(additional_course_urls)} additional course URLs from users")
-        
-        # Step 5: Crawl additional courses discovered from users
-        if additional_course_urls:
-            logger.info("Step 5: Crawling additional courses from user profiles...")
-            self.execute_parallel_flatten(
-                self.crawl_course_and_extract,
-                additional_course_urls,
-                "Error processing additional course {item}: {error}"
-            )
+        # Steps 2-5: Crawl semesters, courses and users as one pipelined frontier
+        logger.info("Steps 2-5: Crawling semesters, courses and users...")
+        self.run_frontier([("semester", semester) for semester in semesters])
 
-        # Step 6: Save all data to JSON file
+        # Step 6: Save remaining data and export it
         logger.info("Step 6: Saving all data to JSON file...")
         self.save_all_data()
+        self.export_data()
 
         logger.info("=" * 60)
         logger.info("Crawling completed!")
-        logger.info(f"Total courses processed: {len(self.processed_courses)}")
-        logger.info(f"Total users processed: {len(self.processed_users)}")
+        logger.info(f"Total courses processed: {self.crawl_state.count_done('course')}")
+        logger.info(f"Total users processed: {self.crawl_state.count_done('user')}")
+        self.log_sessions()
+        self.log_changes()
         logger.info("=" * 60)
     
+    def run_frontier(self, seeds: List[tuple]) -> dict:
+        """
+        Crawl everything reachable from the seeds with one worker pool.
+        
+        Courses found on user profiles are followed again and again until the
+        graph is exhausted, instead of stopping after a fixed number of hops.
+        The most recent semesters are crawled first, and the courses and users
+        found from them before those of older semesters. Data is saved every
+        BATCH_SIZE completed items. The frontier lives in the crawl state
+        database, so an interrupted crawl picks up its queued items on the
+        next run. Items that could not be crawled (e.g. a fetch gave up after
+        its retries) are queued again, and those that still failed after
+        MAX_ITEM_ATTEMPTS tries are kept for the next run.
+        
+        With MAX_PAGES, no new items are started once that many requests have
+        been sent; the rest of the frontier is kept for the next run.
+        
+        Args:
+            seeds: Initial (kind, item) pairs, kind being "semester", "course" or "user"
+            
+        Returns:
+            Mapping of kind to number of completed items
+        """
+        budget_exhausted = None
+        if self.config.max_pages:
+            first_request = REQUESTS.total()
+            budget_exhausted = lambda: REQUESTS.total() - first_request >= self.config.max_pages
+        
+        scheduler = FrontierScheduler(
+            handlers=self._frontier_handlers(),
+            frontier=self.crawl_state,
+            max_workers=self.config.number_of_workers,
+            checkpoint_interval=self.config.batch_size,
+            on_checkpoint=self.save_all_data,
+            budget_exhausted=budget_exhausted,
+            on_item_failed=self.crawl_state.retry,
+            **self._prefetch_options()
+        )
+        completed = scheduler.run(seeds)
+        
+        if scheduler.stopped_early:
+            logger.info(
+                f"Stopped after {self.config.max_pages} pages (MAX_PAGES); "
+                f"{len(self.crawl_state)} queued items are kept for the next run"
+            )
+            return completed
+        
+        # The frontier is only kept to resume an interrupted crawl and to retry given-up items
+        self.crawl_state.clear_frontier()
+        given_up = self.crawl_state.count_failed()
+        if given_up:
+            logger.warning(f"{given_up} items failed {MAX_ITEM_ATTEMPTS} times and are kept for the next run")
+        return completed
+    
+    def _frontier_handlers(self, follow_teachers: bool = True) -> dict:
+        """
+        Get the frontier handlers of each entity kind.
+        
+        Args:
+            follow_teachers: Whether teachers found on course pages are crawled
+                (brute force mode only crawls the courses of swept users);
+                participant lists (PARTICIPANTS mode) are crawled either way
+            
+        Returns:
+            Mapping of kind to handler returning the discovered (kind, item)
+            pairs, or None if the item could not be crawled
+        """
+        def tag(kind: str, urls: Optional[List[str]]) -> Optional[List[tuple]]:
+            return None if urls is None else [(kind, url) for url in urls]
+        
+        # The web-service lists every course of a semester with its teachers
+        if self.config.listing_first or self.config.ws_token:
+            semester_handler = lambda item: self.crawl_semester_listing(item, follow_teachers)
+        else:
+            semester_handler = lambda item: tag("course", self.crawl_semester_and_extract(item))
+        def course_handler(item):
+            teacher_urls = self.crawl_course_and_extract(item)
+            if teacher_urls is None:
+                return None
+            discovered = tag("user", teacher_urls) if follow_teachers else []
+            if self.config.participants:
+                discovered.append(("participants", item))
+            return discovered
+        
+        return {
+            "semester": semester_handler,
+            "course": course_handler,
+            "user": lambda item: tag("course", self.crawl_user_and_extract(item)),
+            "participants": self.crawl_participants_and_extract,
+        }
+    
+    def _prefetch_options(self) -> dict:
+        """
+        Get the FrontierScheduler options that overlap downloads with the workers.
+        
+        With the async engine, up to MAX_CONCURRENT_REQUESTS items are
+        submitted at once and the pages of courses and users start downloading
+        on the fetcher's event loop as soon as they are submitted, so
+        NUMBER_OF_WORKERS threads keep that many requests in flight. The
+        requests engine and web-service crawls (whose lookups are batched
+        instead) get no options.
+        
+        Returns:
+            Keyword arguments for FrontierScheduler
+        """
+        if not isinstance(self.fetcher, AsyncFetcher) or self.config.ws_token:
+            return {}
+        return {
+            "max_in_flight": max(self.config.max_concurrent_requests, 2 * self.config.number_of_workers),
+            "on_item_submitted": self._prefetch_item,
+        }
+    
+    def _prefetch_item(self, kind: str, item: Any):
+        """
+        Start downloading the page of a submitted course or user, unless it is already done.
+        
+        Args:
+            kind: Frontier item kind
+            item: Entity URL
+        """
+        if kind == "course":
+            course_id = LmsCrawler.extract_id_from_url(item, "id")
+            if course_id and not self.crawl_state.is_done("course", course_id, self._refresh_age("course")):
+                self.course_crawler.prefetch_course(item)
+        elif kind == "user":
+            user_id = LmsCrawler.extract_id_from_url(item, "id")
+            if user_id and not self.crawl_state.is_done("user", user_id, self._refresh_age("user")):
+                self.user_crawler.prefetch_user(item)
+    
+    @staticmethod
+    def _frontier_key(kind: str, item: Any) -> Optional[str]:
+        """
+        Get the deduplication key of a frontier item.
+        
+        Args:
+            kind: "semester", "course", "user" or "participants"
+            item: Semester info dictionary or entity URL (the course URL for participants)
+            
+        Returns:
+            Entity ID used to skip duplicates
+        """
+        if kind == "semester":
+            return item["category_id"]
+        return LmsCrawler.extract_id_from_url(item, "id")
+    
+    @staticmethod
+    def _frontier_priority(kind: str, item: Any) -> Optional[int]:
+        """
+        Get the priority of a frontier item (higher is crawled first).
+        
+        Args:
+            kind: "semester", "course", "user" or "participants"
+            item: Semester info dictionary or entity URL
+            
+        Returns:
+            Recency of the semester for semesters (see semester_priority), None
+            for entities, which inherit the priority of the item they were found on
+        """
+        if kind == "semester":
+            return semester_priority(item.get("semester"))
+        return None
+    
+    def _refresh_age(self, kind: str) -> float:
+        """
+        Get the age in seconds after which a crawled entity is crawled again.
+        
+        Args:
+            kind: "course", "user" or "participants"
+            
+        Returns:
+            REFRESH_TTL_* of the entity's page category in seconds (0 = never)
+        """
+        return self.page_metadata.ttl(kind if kind == "participants" else f"{kind}s")
+    
     def crawl_semester_and_extract(self, semester_info: dict) -> list:
         """
         Crawl a semester and extract course URLs.
@@ -228,17 +484,95 @@ class MainCrawler:
             semester_info: Semester information dictionary
             
         Returns:
-            List of course URLs
+            List of course URLs (see _diff_listing), or None if the semester could not be crawled
         """
-        file_path = self.semester_crawler.crawl_semester(semester_info)
-        if not file_path:
+        course_urls = self.semester_crawler.crawl_semester_courses(semester_info)
+        if course_urls is None:
+            return None
+        if not course_urls:
             return []
+        return self._diff_listing(semester_info, course_urls)
+    
+    def _diff_listing(self, semester_info: dict, course_urls: List[str]) -> List[str]:
+        """
+        Compare a semester listing with the last one and pick the courses to crawl.
+        
+        Added and removed courses are logged in the page metadata. Only a
+        semester listed for the first time or whose courses changed sends
+        all of its courses downstream (crawled again once REFRESH_TTL_COURSES
+        expires); an unchanged one only sends the courses not crawled yet.
+        
+        Args:
+            semester_info: Semester information dictionary
+            course_urls: Course URLs of the listing
+            
+        Returns:
+            Course URLs to crawl
+        """
+        category_id = semester_info["category_id"]
+        course_ids = [LmsCrawler.extract_id_from_url(url, "id") for url in course_urls]
+        diff = self.page_metadata.diff_listing(category_id, [course_id for course_id in course_ids if course_id])
+        if diff is None:
+            return course_urls
         
-        # Read the saved file and extract course links
-        with open(file_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
+        added, removed = diff
+        if added or removed:
+            LISTING_CHANGES.inc(len(added), change="added")
+            LISTING_CHANGES.inc(len(removed), change="removed")
+            logger.info(f"Semester {category_id} gained {len(added)} and lost {len(removed)} courses")
+            return course_urls
         
-        return self.semester_crawler.extract_course_links(html_content)
+        pending = [
+            url for url, course_id in zip(course_urls, course_ids)
+            if not course_id or not self.crawl_state.is_done("course", course_id)
+        ]
+        if len(pending) < len(course_urls):
+            logger.info(f"Semester {category_id} unchanged, skipping {len(course_urls) - len(pending)} crawled courses")
+        return pending
+    
+    def crawl_semester_listing(self, semester_info: dict, follow_teachers: bool = True) -> list:
+        """
+        Crawl a semester and take the courses complete in its listing as they are.
+        
+        Courses whose box shows a name and teachers are recorded without
+        requesting their course page; only the others are crawled. Courses of
+        an unchanged listing that were crawled before are skipped (see
+        _diff_listing).
+        
+        Args:
+            semester_info: Semester information dictionary
+            follow_teachers: Whether teachers of listed courses are crawled
+            
+        Returns:
+            Discovered (kind, item) pairs: courses to crawl and teachers of listed
+            courses, or None if the semester could not be crawled
+        """
+        listed = self.semester_crawler.crawl_semester_listing(semester_info)
+        if listed is None:
+            return None
+        pending = set(self._diff_listing(semester_info, [course_url for course_url, _ in listed])) if listed else set()
+        
+        discovered = []
+        for course_url, course_info in listed:
+            if course_url not in pending:
+                continue
+            if course_info is None:
+                discovered.append(("course", course_url))
+                continue
+            
+            # Claim the course so a course page found elsewhere is not requested
+            course_id = course_info["course_id"]
+            if not self.crawl_state.claim("course", course_id, self._refresh_age("course")):
+                continue
+            LISTED_COURSES.inc()
+            with self._records_lock:
+                self.all_courses.append(course_info)
+                self._done_keys.append(("course", course_id))
+            if follow_teachers:
+                discovered.extend(("user", url) for url in course_info["teacher_links"])
+            if self.config.participants:
+                discovered.append(("participants", course_url))
+        return discovered
     
     def crawl_course_and_extract(self, course_url: str) -> list:
         """
@@ -248,21 +582,52 @@ class MainCrawler:
             course_url: Course URL
             
         Returns:
-            List of user URLs
+            List of user URLs, or None if the course could not be crawled
         """
-        # Extract course ID to check if already processed
+        # Extract course ID and claim it so no other worker crawls it
         course_id = self.course_crawler.extract_id_from_url(course_url, "id")
-        if course_id in self.processed_courses:
+        if not course_id or not self.crawl_state.claim("course", course_id, self._refresh_age("course")):
             return []
         
         course_info = self.course_crawler.crawl_course(course_url)
         if not course_info:
-            return []
+            self.crawl_state.release("course", course_id)
+            return None
         
-        self.processed_courses.add(course_id)
-        self.all_courses.append(course_info)
+        with self._records_lock:
+            self.all_courses.append(course_info)
+            self._done_keys.append(("course", course_id))
         return course_info.get("teacher_links", [])
     
+    def crawl_participants_and_extract(self, course_url: str) -> list:
+        """
+        Crawl the participant list of a course and record a user-course link per participant.
+        
+        The participants' profiles are not requested.
+        
+        Args:
+            course_url: Course URL
+            
+        Returns:
+            Empty list (participants are not followed), or None if the list could not be crawled
+        """
+        # Claim the list so no other worker crawls it
+        course_id = self.course_crawler.extract_id_from_url(course_url, "id")
+        if not course_id or not self.crawl_state.claim("participants", course_id, self._refresh_age("participants")):
+            return []
+        
+        user_ids = self.course_crawler.crawl_participants(course_id, self.config.participants_per_page)
+        if user_ids is None:
+            self.crawl_state.release("participants", course_id)
+            return None
+        
+        links = self.course_crawler.build_participant_courses(course_id, user_ids)
+        PARTICIPANT_LINKS.inc(len(links))
+        with self._records_lock:
+            self.users_courses.extend(links)
+            self._done_keys.append(("participants", course_id))
+        return []
+    
     def crawl_user_and_extract(self, user_url: str) -> list:
         """
         Crawl a user and extract course URLs.
@@ -271,45 +636,95 @@ class MainCrawler:
             user_url: User URL
             
         Returns:
-            List of course URLs (only new courses not yet processed)
+            List of course URLs (only new courses not yet processed), or None
+            if the profile could not be crawled (and the user is not known dead)
         """
-        # Extract user ID to check if already processed
+        # Extract user ID and claim it so no other worker crawls it
         user_id = self.user_crawler.extract_id_from_url(user_url, "id")
-        if user_id in self.processed_users:
+        if not user_id or not self.crawl_state.claim("user", user_id, self._refresh_age("user")):
             return []
         
         user_info = self.user_crawler.crawl_user(user_url)
         if not user_info:
-            return []
-        
-        self.processed_users.add(user_id)
-        self.all_users.append(user_info)
+            self.crawl_state.release("user", user_id)
+            return [] if self.negative_cache.is_dead("users", user_id) else None
         
         # Filter out courses that have already been processed
-        course_links = user_info.get("course_links", [])
-        new_course_urls = []
-        
-        for course_url in course_links:
-            course_id = self.course_crawler.extract_id_from_url(course_url, "id")
-            if course_id and course_id not in self.processed_courses:
-                new_course_urls.append(course_url)
-            self.users_courses.append({
-                "user_id": user_id,
-                "course_id": course_id
-            })
+        user_courses = self.user_crawler.build_user_courses(user_info)
+        new_course_urls = [
+            course_url
+            for course_url, link in zip(user_info.get("course_links", []), user_courses)
+            if link["course_id"]
+            and not self.crawl_state.is_done("course", link["course_id"], self._refresh_age("course"))
+        ]
+        
+        with self._records_lock:
+            self.all_users.append(user_info)
+            self.users_courses.extend(user_courses)
+            self._done_keys.append(("user", user_id))
         
         return new_course_urls
 
-    def get_user_range(self, min_user_id: int, max_user_id: int) -> List[int]:
-        """Get user range from userId.txt file."""
-        with open("userId.txt", "r", encoding="utf-8") as f:
-            user_ids = [int(line.strip()) for line in f.readlines()]
+    def get_user_range(self, min_user_id: int, max_user_id: int) -> Iterator[int]:
+        """Stream the IDs from userId.txt and the ID range, sorted and deduplicated."""
+        return iter_user_ids(min_user_id, max_user_id, "userId.txt")
+    
+    def _brute_force_user_ids(self, shard: int = 0, shards: int = 1) -> Tuple[Iterator[int], Optional[AdaptiveIdProber]]:
+        """
+        Generate the user IDs of a brute force crawl lazily, in ascending order or adaptively.
         
-        user_ids.extend(range(min_user_id, max_user_id + 1))
-
-        user_ids.sort()
-
-        return user_ids
+        In a sharded crawl every shard sweeps its own contiguous part of the ID
+        range (and the known IDs outside the range that hash to it), so the
+        adaptive sampling and PROBE_BUDGET are spent on the shard's IDs only.
+        
+        Args:
+            shard: Shard sweeping the IDs
+            shards: Number of shards (1 = not sharded)
+        
+        Returns:
+            (user IDs, prober) pair; the prober is None for the sequential strategy
+        """
+        min_user_id, max_user_id = self.config.min_user_id, self.config.max_user_id
+        known_ids = read_id_file("userId.txt")
+        if shards > 1:
+            first, last = shard_id_range(min_user_id, max_user_id, shard, shards)
+            known_ids = [
+                user_id for user_id in known_ids
+                if first <= user_id <= last
+                or not min_user_id <= user_id <= max_user_id and shard_of(str(user_id), shards) == shard
+            ]
+            min_user_id, max_user_id = first, last
+        
+        if self.config.brute_force_strategy != "adaptive":
+            return merge_unique(known_ids, range(min_user_id, max_user_id + 1)), None
+        
+        prober = AdaptiveIdProber(
+            min_user_id,
+            max_user_id,
+            known_ids=known_ids,
+            block_size=self.config.probe_block_size,
+            samples_per_block=self.config.probe_samples,
+            min_density=self.config.probe_min_density,
+            budget=-(-self.config.probe_budget // shards)
+        )
+        return iter(prober), prober
+    
+    def crawl_user_id(self, user_id: int, prober: Optional[AdaptiveIdProber] = None) -> list:
+        """
+        Crawl a user by ID and extract course URLs.
+        
+        Args:
+            user_id: User ID
+            prober: Adaptive prober to report the outcome to
+            
+        Returns:
+            List of course URLs (only new courses not yet processed)
+        """
+        user_url = self.user_crawler.build_url(f"/user/profile.php?id={user_id}&showallcourses=1")
+        course_urls = self.crawl_user_and_extract(user_url)
+        if prober:
+            prober.record(user_id, self.user_crawler.has_profile(str(user_id)))
+        return course_urls or []
     
     def run_brute_force_users(self):
         """Execute brute force user ID crawling from MIN_USER_ID to MAX_USER_ID."""
@@ -318,93 +733,490 @@ class MainCrawler:
         logger.info(f"Crawling user IDs from {self.config.min_user_id} to {self.config.max_user_id}")
         logger.info("=" * 60)
         
-        # Generate all user URLs
-        user_urls = []
-        
-        for user_id in self.get_user_range(self.config.min_user_id, self.config.max_user_id):
-            user_url = self.user_crawler.build_url(f"/user/profile.php?id={user_id}&showallcourses=1")
-            user_urls.append(user_url)
+        user_ids, prober = self._brute_force_user_ids()
         
-        logger.info(f"Generated {len(user_urls)} user URLs to crawl")
-        
-        # Crawl all users in batches
-        logger.info("Crawling users in batches...")
+        # Crawl users; the prober sees results while later IDs are being pulled
+        logger.info("Crawling users...")
         additional_course_urls = self.execute_parallel_flatten_batched(
-            self.crawl_user_and_extract,
-            user_urls,
-            "Error processing user {item}: {error}"
+            lambda user_id: self.crawl_user_id(user_id, prober),
+            user_ids,
+            "Error processing user {item}: {error}",
+            item_kind="user",
+            result_kind="course"
         )
-
+        if prober:
+            logger.info(f"Probe stats: {prober.stats()}")
         
         logger.info(f"Discovered {len(additional_course_urls)} course URLs from users")
         
-        # Crawl discovered courses in batches
-        if additional_course_urls:
-            logger.info("Crawling courses discovered from users in batches...")
-            self.execute_parallel_flatten_batched(
+        # Crawl discovered courses, streaming them back from disk
+        if len(additional_course_urls):
+            logger.info("Crawling courses discovered from users...")
+            teacher_urls = self.execute_parallel_flatten_batched(
                 self.crawl_course_and_extract,
-                additional_course_urls,
-                "Error processing course {item}: {error}"
+                additional_course_urls.drain(),
+                "Error processing course {item}: {error}",
+                item_kind="course",
+                result_kind="user"
             )
+            teacher_urls.close()
+        additional_course_urls.close()
         
         # Final save (in case there's any remaining data)
         if self.all_courses or self.all_users or self.users_courses:
             self.save_all_data()
+        self.export_data()
         
         logger.info("=" * 60)
         logger.info("Brute Force Crawling completed!")
-        logger.info(f"Total courses processed: {len(self.processed_courses)}")
-        logger.info(f"Total users processed: {len(self.processed_users)}")
+        logger.info(f"Total courses processed: {self.crawl_state.count_done('course')}")
+        logger.info(f"Total users processed: {self.crawl_state.count_done('user')}")
+        logger.info(
+            f"Skipped {self.negative_cache.hits} known-dead user IDs "
+            f"({self.negative_cache.count('users')} in the negative cache)"
+        )
+        self.log_sessions()
+        self.log_changes()
         logger.info("=" * 60)
+
+    def run_shard(self, coordinator: ShardCoordinator, shard: int, owner: str):
+        """
+        Crawl a leased shard until the sharded crawl is complete, or until a
+        shard without a live owner has pending work and this one has none.
+        
+        The shard's seed step runs first: shard 0 discovers the semesters in
+        normal mode, and in brute force mode every shard sweeps its share of
+        the user ID range. Then the items routed to this shard are crawled in
+        rounds of BATCH_SIZE; each round is saved before it is marked done.
+        
+        Args:
+            coordinator: Shared shard coordinator
+            shard: Leased shard number
+            owner: Name of this worker
+        """
+        shard_logger = logging.getLogger(f"Shard{shard}")
+        brute_force = self.config.max_user_id > 0
+        shards = coordinator.shard_count
         
+        if not coordinator.is_seeded(shard):
+            if brute_force:
+                shard_logger.info(f"Sweeping the user IDs of shard {shard}/{shards}...")
+                user_ids, prober = self._brute_force_user_ids(shard, shards)
+                
+                def crawl_user_id(user_id: int) -> list:
+                    # Route discovered courses before the user is saved, so a crash cannot lose them
+                    coordinator.push_many(("course", url) for url in self.crawl_user_id(user_id, prober))
+                    return []
+                
+                self.execute_parallel_flatten_batched(
+                    crawl_user_id,
+                    user_ids,
+                    "Error processing user {item}: {error}",
+                    item_kind="user",
+                    result_kind="course"
+                ).close()
+            else:
+                shard_logger.info("Discovering semesters...")
+                semesters = self.semester_crawler.discover_semesters()
+                if not semesters:
+                    shard_logger.error("No semesters found")
+                coordinator.push_many(("semester", semester) for semester in semesters)
+            coordinator.mark_seeded(shard)
+        
+        # Courses found while sweeping are crawled, but (as in brute force mode) not their teachers
+        frontier = ShardFrontier(coordinator, shard, owner, round_size=self.config.batch_size)
+        scheduler = FrontierScheduler(
+            handlers=self._frontier_handlers(follow_teachers=not brute_force),
+            frontier=frontier,
+            max_workers=self.config.number_of_workers,
+            on_item_done=frontier.ack,
+            **self._prefetch_options()
+        )
+        while True:
+            if frontier.pending_by_kind():
+                scheduler.run([])
+                self.save_all_data()
+                coordinator.complete(shard, owner, frontier.new_round())
+                continue
+            if coordinator.is_idle() or coordinator.has_orphaned_work():
+                break
+            coordinator.renew(shard, owner)
+            time.sleep(SHARD_POLL_SECONDS)
+        
+        self.save_all_data()
+        shard_logger.info(
+            f"Shard {shard}: {self.crawl_state.count_done('course')} courses and "
+            f"{self.crawl_state.count_done('user')} users crawled so far"
+        )
+    
+    def save_all_data(self):
+        """
+        Append the records collected since the last save to the JSON Lines sink,
+        then mark their entities as done in the crawl state.
+        """
+        logger.info("Saving all data to JSON Lines files...")
 
+        # Swap the buffers out so workers can keep appending while we write
+        with self._records_lock:
+            batch = {
+                "all_courses": self.all_courses,
+                "all_users": self.all_users,
+                "users_courses": self.users_courses,
+            }
+            done_keys = self._done_keys
+            self.all_courses, self.all_users, self.users_courses = [], [], []
+            self._done_keys = []
 
-    def save_all_data(self):
-        """Save all data to JSON files."""
-        logger.info("Saving all data to JSON files...")
+        started = time.perf_counter()
+        written = self.data_sink.write_batch(batch)
+        self.crawl_state.mark_done(done_keys)
+        SAVE_SECONDS.observe(time.perf_counter() - started)
+        logger.info(
+            f"Appended {written['all_courses']} courses, {written['all_users']} users, "
+            f"{written['users_courses']} user-course links"
+        )
 
-        # Load existing data if files exist, otherwise start with empty lists
-        try:
-            with open("all_courses.json", "r", encoding="utf-8") as f:
-                existing_courses = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            existing_courses = []
+    def log_sessions(self):
+        """Log the requests sent with each session and the sessions that expired."""
+        for session in self.session_pool.stats():
+            state = "expired" if session["expired"] else "live"
+            logger.info(f"{session['name']}: {session['requests']} requests, {state}")
+    
+    def log_changes(self):
+        """Log how many pages were new or changed, and which semesters gained or lost courses, during this run."""
+        changes = self.page_metadata.count_changes(self.started_at)
+        for (category, change), count in sorted(changes.items()):
+            logger.info(f"{change.capitalize()} {category}: {count}")
+        if not changes:
+            logger.info("No page changed during this run")
         
-        try:
-            with open("all_users.json", "r", encoding="utf-8") as f:
-                existing_users = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            existing_users = []
+        listing_changes = self.page_metadata.count_listing_changes(self.started_at)
+        for category_id in sorted({category_id for category_id, _ in listing_changes}):
+            logger.info(
+                f"Semester {category_id}: {listing_changes[(category_id, 'added')]} courses added, "
+                f"{listing_changes[(category_id, 'removed')]} removed"
+            )
+
+    def export_data(self):
+        """Export the JSON Lines files in every format of EXPORT_FORMATS."""
+        export_datasets(self.data_sink, self.config.export_formats)
+
+
+def export_datasets(data_sink: JsonlDataSink, formats: List[str]):
+    """
+    Export the JSON Lines files of a sink.
+
+    Args:
+        data_sink: Sink holding the .jsonl files
+        formats: "json" (the arrays read by eda.ipynb), "parquet" and/or "arrow"
+    """
+    started = time.perf_counter()
+    for fmt in formats:
+        logger.info(f"Exporting JSON Lines files to {fmt}...")
+        if fmt == "json":
+            data_sink.export_all()
+        else:
+            export_columnar(data_sink, fmt)
+    EXPORT_SECONDS.observe(time.perf_counter() - started)
+
+
+def open_coordinator(config: Config) -> ShardCoordinator:
+    """Open the shard coordinator at COORDINATOR_DB (default: OUTPUT_DIR/coordinator.sqlite3)."""
+    return ShardCoordinator(
+        config.coordinator_db or str(Path(config.output_dir) / "coordinator.sqlite3"),
+        key_func=MainCrawler._frontier_key,
+        lease_seconds=config.shard_lease_seconds,
+        priority_func=MainCrawler._frontier_priority
+    )
+
+
+def run_shard_worker(config: Config):
+    """
+    Join a sharded crawl as one worker process.
+    
+    Leases shards from the coordinator and crawls them, with one MainCrawler
+    per shard writing to OUTPUT_DIR/shards/NNN, until the crawl is complete.
+    Workers on other machines can join as long as they share OUTPUT_DIR.
+    
+    Args:
+        config: Configuration object
+    """
+    coordinator = open_coordinator(config)
+    if not coordinator.shard_count:
+        raise ValueError(f"No sharded crawl in {coordinator.db_path}, start one with: python main.py shard")
+    
+    owner = worker_name()
+    while True:
+        shard = coordinator.acquire(owner)
+        if shard is None:
+            if coordinator.is_idle():
+                break
+            time.sleep(SHARD_POLL_SECONDS)
+            continue
         
+        logger.info(f"Worker {owner} leased shard {shard}")
+        shard_config = copy.copy(config)
+        shard_config.output_dir = str(shard_dir(config.output_dir, shard))
+        heartbeat = coordinator.start_heartbeat(shard, owner)
+        crawler = MainCrawler(shard_config, migrate_legacy=False)
         try:
-            with open("users_courses.json", "r", encoding="utf-8") as f:
-                existing_users_courses = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            existing_users_courses = []
+            crawler.run_shard(coordinator, shard, owner)
+        finally:
+            heartbeat.set()
+            crawler.fetcher.close()
+            coordinator.release(shard, owner)
         
-        # Append new data to existing data
-        existing_courses.extend(self.all_courses)
-        existing_users.extend(self.all_users)
-        existing_users_courses.extend(self.users_courses)
-        
-        # Write combined data back to files
-        with open("all_courses.json", "w", encoding="utf-8") as f:
-            json.dump(existing_courses, f, ensure_ascii=False, indent=4)
-        with open("all_users.json", "w", encoding="utf-8") as f:
-            json.dump(existing_users, f, ensure_ascii=False, indent=4)
-        with open("users_courses.json", "w", encoding="utf-8") as f:
-            json.dump(existing_users_courses, f, ensure_ascii=False, indent=4)
+        if coordinator.is_idle():
+            break
+    
+    logger.info(f"Worker {owner} finished: the sharded crawl is complete")
+
+
+def run_sharded(config: Config, shards: int, processes: int, max_restarts: int = 3):
+    """
+    Run a sharded crawl with local worker processes, then merge their output.
+    
+    Workers that exit abnormally have their leases expired, so their shards
+    are taken over immediately, and are restarted up to max_restarts times.
+    
+    Args:
+        config: Configuration object
+        shards: Number of shards
+        processes: Number of local worker processes
+        max_restarts: Maximum number of worker restarts
+    """
+    coordinator = open_coordinator(config)
+    # Brute force mode seeds every shard with its share of the ID range; otherwise shard 0 discovers the semesters
+    coordinator.initialize(shards, seed_shards=None if config.max_user_id > 0 else [0])
+    
+    command = [sys.executable, str(Path(__file__).resolve()), "shard-worker"]
+    logger.info(f"Starting {processes} worker processes for {shards} shards")
+    workers = [subprocess.Popen(command) for _ in range(processes)]
+    restarts = 0
+    
+    while workers:
+        time.sleep(1)
+        for worker in list(workers):
+            returncode = worker.poll()
+            if returncode is None:
+                continue
+            workers.remove(worker)
+            if returncode == 0:
+                continue
+            
+            coordinator.expire(worker_name(worker.pid))
+            if restarts < max_restarts:
+                restarts += 1
+                logger.warning(f"Worker {worker.pid} exited with code {returncode}, restarting it")
+                workers.append(subprocess.Popen(command))
+            else:
+                logger.error(f"Worker {worker.pid} exited with code {returncode}, restart limit reached")
+    
+    log_shard_status(coordinator)
+    if not coordinator.is_idle():
+        logger.warning("Sharded crawl is incomplete; run 'python main.py shard-worker' to finish it")
+    export_datasets(coordinator.merge_outputs(config.output_dir), config.export_formats)
+
+
+def log_shard_status(coordinator: ShardCoordinator):
+    """Log the work items and takeovers of every shard."""
+    for shard, owner, queued, taken, done, takeovers in coordinator.status():
+        logger.info(
+            f"Shard {shard}: {done} done, {taken} in progress, {queued} queued, "
+            f"{takeovers} takeovers, owner: {owner or '-'}"
+        )
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="HCMUT LMS Crawler")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="crawl",
+        choices=[
+            "crawl", "export", "archive-import", "parser-parity", "reparse", "changes", "dead-ids",
+            "shard", "shard-worker", "shard-merge", "dataset", "search-index"
+        ],
+        help=(
+            "crawl: run the crawler (default); "
+            "export: rebuild the EXPORT_FORMATS outputs from the .jsonl files; "
+            "archive-import: copy the HTML folders into the compressed archive; "
+            "parser-parity: compare parser backends on the saved HTML; "
+            "reparse: rebuild the JSON datasets from the saved HTML on all cores; "
+            "changes: list the pages that changed and the courses added to or removed from semester listings in recent crawls; "
+            "dead-ids: report the share of dead user IDs per ID range; "
+            "shard: crawl with several worker processes over hashed shards, then merge their output; "
+            "shard-worker: join a running sharded crawl (e.g. from another machine); "
+            "shard-merge: merge the shard outputs into OUTPUT_DIR and export; "
+            "dataset: update the per-semester CSV files under DATASET_DIR with the records added since the last build; "
+            "search-index: rebuild the search index of the per-semester CSV files under DATASET_DIR"
+        )
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="parser-parity: maximum number of pages per category"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="reparse: number of worker processes (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        help="reparse: number of pages per work unit"
+    )
+    parser.add_argument(
+        "--hours",
+        type=float,
+        default=24,
+        help="changes: how far back to look"
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=10000,
+        help="dead-ids: number of user IDs per range"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=4,
+        help="shard: number of shards the ID spaces are hashed into"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="shard: number of local worker processes (default: one per shard)"
+    )
+    parser.add_argument(
+        "--semester",
+        nargs="+",
+        default=None,
+        help=(
+            "dataset / search-index: only write these semesters, e.g. hk252 "
+            "(default: every changed semester / every semester directory)"
+        )
+    )
+    parser.add_argument(
+        "--slots",
+        default=None,
+        help="dataset: course_time.json timetable written as slot_<semester>.csv of the first (or latest) semester"
+    )
+    return parser.parse_args()
 
 
 def main():
     """Main entry point."""
+    args = parse_args()
     try:
         # Load configuration
-        config = Config()
-        
+        config = Config(require_cookie=args.command in ("crawl", "shard", "shard-worker"))
+        if config.log_mode == "sampled":
+            enable_sampled_logging(config.log_sample_rate)
+
+        if args.command == "export":
+            export_datasets(JsonlDataSink(config.output_dir, migrate_legacy=True), config.export_formats)
+            return
+
+        if args.command == "archive-import":
+            archive = ArchiveStore(config.output_dir, config.archive_compression_level)
+            imported = archive.import_from(HtmlSaver(config.output_dir))
+            logger.info(f"Imported {imported} pages into the archive: {archive.stats()}")
+            return
+
+        if args.command == "parser-parity":
+            html_saver = create_html_store(config.storage_backend, config.output_dir, config.archive_compression_level)
+            report = check_parser_parity(config.base_url, html_saver, ["lxml", "selectolax"], args.limit)
+            if any(stats["mismatches"] for stats in report.values()):
+                raise SystemExit(1)
+            return
+
+        if args.command == "reparse":
+            reparse(config, args.workers, args.chunk_size)
+            return
+
+        if args.command == "changes":
+            page_metadata = PageMetadataStore(str(Path(config.output_dir) / "page_metadata.sqlite3"))
+            since = time.time() - args.hours * 3600
+            for category, file_id, change, changed_at in page_metadata.changes_since(since):
+                changed = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(changed_at))
+                logger.info(f"{changed} {change} {category}/{file_id}")
+            for category_id, course_id, change, changed_at in page_metadata.listing_changes_since(since):
+                changed = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(changed_at))
+                logger.info(f"{changed} course {course_id} {change} in semester {category_id}")
+            return
+
+        if args.command == "dead-ids":
+            negative_cache = NegativeCache(
+                str(Path(config.output_dir) / "negative_cache.sqlite3"),
+                config.negative_cache_ttl * 3600
+            )
+            for start, end, dead, share in negative_cache.density_by_range("users", args.block_size):
+                logger.info(f"Users {start}-{end}: {dead} dead ({share:.1%})")
+            logger.info(f"Total dead user IDs: {negative_cache.count('users')}")
+            return
+
+        if args.command == "dataset":
+            builder = DatasetBuilder(
+                str(Path(config.output_dir) / "dataset.sqlite3"),
+                JsonlDataSink(config.output_dir, migrate_legacy=True),
+                config.dataset_dir or config.output_dir
+            )
+            builder.build(args.semester, args.slots)
+            return
+
+        if args.command == "search-index":
+            dataset_dir = Path(config.dataset_dir or config.output_dir)
+            semesters = args.semester or [
+                path.name for path in dataset_dir.iterdir() if (path / "dataset_info.csv").exists()
+            ]
+            for semester in semesters:
+                build_search_index(str(dataset_dir / semester.lower()), semester.lower())
+            return
+
+        if args.command == "shard":
+            if args.shards < 1:
+                raise ValueError("--shards must be at least 1")
+            run_sharded(config, args.shards, args.processes or args.shards)
+            return
+
+        if args.command == "shard-worker":
+            try:
+                run_shard_worker(config)
+            except Exception as e:
+                # Exit abnormally so the launching process restarts the worker
+                logger.error(f"Shard worker failed: {e}", exc_info=True)
+                raise SystemExit(1)
+            return
+
+        if args.command == "shard-merge":
+            coordinator = open_coordinator(config)
+            log_shard_status(coordinator)
+            export_datasets(coordinator.merge_outputs(config.output_dir), config.export_formats)
+            return
+
         # Create and run crawler
         crawler = MainCrawler(config)
-        crawler.run()
+        reporters = []
+        if config.metrics_port:
+            reporters.append(MetricsServer(config.metrics_port))
+        if config.metrics_snapshot:
+            reporters.append(MetricsSnapshotWriter(config.metrics_snapshot, config.metrics_snapshot_interval))
+        for reporter in reporters:
+            reporter.start()
+        try:
+            crawler.run()
+        finally:
+            crawler.fetcher.close()
+            for reporter in reporters:
+                reporter.stop()
         
     except ValueError as e:
         logger.error(f"Configuration error: {e}")
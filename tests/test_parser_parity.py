@@ -0,0 +1,111 @@
+"""
+Parser parity tests for HCMUT LMS Crawler.
+Run every extract method of the lxml and selectolax backends over small
+fixture pages and compare the result with the BeautifulSoup reference.
+"""
+import pytest
+
+from crawler.parser_parity import check_parser_parity
+from crawler.parsers import create_parser
+from utils.html_saver import HtmlSaver
+
+
+BASE_URL = "https://lms.hcmut.edu.vn"
+
+COURSE_PAGE = """<!DOCTYPE html>
+<html lang="vi"><head><meta charset="utf-8"><title>Course</title></head><body>
+<div id="page"><div class="box py-3 coursebox clearfix" data-courseid="4217">
+  <div class="info">
+    <h3 class="coursename"><a class="aalink" href="https://lms.hcmut.edu.vn/course/view.php?id=4217">Giải tích 1 (MT1003)_Nguyễn Văn A (CQ_HK251)</a></h3>
+  </div>
+  <div class="content"><ul class="teachers">
+    <li>Teacher: <a href="https://lms.hcmut.edu.vn/user/profile.php?id=101&amp;course=4217">Nguyễn Văn A</a></li>
+    <li>Teacher: <a href="https://lms.hcmut.edu.vn/user/profile.php?id=102&amp;course=4217">Trần Thị  B</a></li>
+  </ul></div>
+</div></div>
+</body></html>"""
+
+USER_PAGE = """<!DOCTYPE html>
+<html lang="vi"><head><meta charset="utf-8"><title>User</title></head><body>
+<div class="page-header-headings"><h1>Lê Minh C</h1></div>
+<div class="userprofile">
+  <div class="description"><p>Giảng viên</p></div>
+  <div class="profile_tree">
+    <section class="node_category"><h3>User details</h3><dl>
+      <dt>Email address</dt><dd><a href="mailto:c.le@hcmut.edu.vn">c.le@hcmut.edu.vn</a></dd>
+      <dt>Department</dt><dd>Khoa Khoa học &amp; Kỹ thuật Máy tính</dd>
+    </dl></section>
+    <section class="node_category"><h3>Course details</h3><ul>
+      <li><a href="https://lms.hcmut.edu.vn/user/view.php?id=103&amp;course=4217">Giải tích 1 (MT1003)_Nguyễn Văn A (CQ_HK251)</a></li>
+      <li><a href="https://lms.hcmut.edu.vn/user/view.php?id=103&amp;course=4300">Vật lý 1 (PH1003)_Lê Minh C (CQ_HK251)</a></li>
+    </ul></section>
+  </div>
+</div>
+</body></html>"""
+
+ALERT_PAGE = """<!DOCTYPE html>
+<html><head><title>Error</title></head><body>
+<div class="page-header-headings"><h1>Error</h1></div>
+<div class="alert alert-danger" role="alert">Invalid user</div>
+</body></html>"""
+
+LISTING_PAGE = """<!DOCTYPE html>
+<html lang="vi"><head><meta charset="utf-8"><title>Courses</title></head><body>
+<div class="singleselect"><select class="custom-select urlselect" name="jump">
+  <option value="/course/index.php?categoryid=1">Học kỳ (Semester) 1/2025-2026</option>
+  <option value="/course/index.php?categoryid=2" selected>Học kỳ (Semester) 2/2025-2026</option>
+</select></div>
+<div class="courses category-browse">
+  <div class="coursebox clearfix odd first" data-courseid="4217">
+    <h3 class="coursename"><a class="aalink" href="https://lms.hcmut.edu.vn/course/view.php?id=4217">Giải tích 1 (MT1003)_Nguyễn Văn A (CQ_HK251)</a></h3>
+    <ul class="teachers"><li>Teacher: <a href="https://lms.hcmut.edu.vn/user/profile.php?id=101&amp;course=4217">Nguyễn Văn A</a></li></ul>
+  </div>
+  <div class="coursebox clearfix even last" data-courseid="4300">
+    <h3 class="coursename"><a class="aalink" href="https://lms.hcmut.edu.vn/course/view.php?id=4300">Vật lý 1 (PH1003)</a></h3>
+  </div>
+</div>
+<table id="participants" class="generaltable"><tbody>
+  <tr><td><a href="https://lms.hcmut.edu.vn/user/view.php?id=103&amp;course=4217">Lê Minh C</a></td></tr>
+  <tr><td><a href="https://lms.hcmut.edu.vn/user/view.php?id=104&amp;course=4217">Phạm D</a></td></tr>
+</tbody></table>
+</body></html>"""
+
+PAGES = {"course": COURSE_PAGE, "user": USER_PAGE, "alert": ALERT_PAGE, "listing": LISTING_PAGE}
+
+METHODS = [
+    "extract_course",
+    "extract_user",
+    "extract_course_links",
+    "extract_course_boxes",
+    "extract_participants",
+    "extract_semester_options",
+]
+
+
+@pytest.fixture(params=["lxml", "selectolax"])
+def backend(request):
+    try:
+        return create_parser(request.param)
+    except ImportError as e:
+        pytest.skip(str(e))
+
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+@pytest.mark.parametrize("method", METHODS)
+def test_backend_matches_bs4(backend, page, method):
+    reference = getattr(create_parser("bs4"), method)(PAGES[page])
+    assert getattr(backend, method)(PAGES[page]) == reference
+
+
+def test_check_parser_parity_reports_no_mismatches(backend, tmp_path):
+    html_saver = HtmlSaver(str(tmp_path))
+    html_saver.save_html("courses", "4217", COURSE_PAGE)
+    html_saver.save_html("users", "103", USER_PAGE)
+    html_saver.save_html("users", "999", ALERT_PAGE)
+    html_saver.save_html("semesters", "2", LISTING_PAGE)
+    html_saver.save_html("participants", "4217", LISTING_PAGE)
+
+    report = check_parser_parity(BASE_URL, html_saver, [backend.name])
+
+    assert report[backend.name]["pages"] == report["bs4"]["pages"] == 5
+    assert report[backend.name]["mismatches"] == 0
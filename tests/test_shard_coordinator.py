@@ -0,0 +1,135 @@
+"""
+Shard coordinator tests for HCMUT LMS Crawler.
+Cover lease expiry and takeover, requeueing of taken items and the
+MAX_ITEM_ATTEMPTS limit with two workers sharing a temporary database.
+"""
+import time
+
+import pytest
+
+from utils.crawl_state import MAX_ITEM_ATTEMPTS
+from utils.shard_coordinator import ShardCoordinator, ShardFrontier, ShardLeaseLost, shard_id_range, shard_of
+
+
+LEASE_SECONDS = 0.2
+SHARDS = 2
+
+
+def _key(kind, item):
+    return item
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    coordinator = ShardCoordinator(str(tmp_path / "coordinator.sqlite3"), _key, lease_seconds=LEASE_SECONDS)
+    coordinator.initialize(SHARDS, seed_shards=[])
+    return coordinator
+
+
+def _ids_of_shard(shard, count):
+    """Get course IDs routed to a shard."""
+    ids = (str(entity_id) for entity_id in range(1, 1000))
+    return [entity_id for entity_id in ids if shard_of(entity_id, SHARDS) == shard][:count]
+
+
+def _states(coordinator):
+    return dict(coordinator.query("SELECT entity_id, state FROM items"))
+
+
+def test_each_shard_is_leased_to_one_worker(coordinator):
+    first = coordinator.acquire("worker-a")
+    second = coordinator.acquire("worker-b")
+
+    assert {first, second} == set(range(SHARDS))
+    assert coordinator.acquire("worker-c") is None
+
+
+def test_expired_lease_is_taken_over_and_taken_items_requeued(coordinator):
+    ids = _ids_of_shard(0, 3)
+    coordinator.push_many(("course", entity_id) for entity_id in ids)
+    coordinator.acquire("worker-a")
+    coordinator.acquire("worker-b")
+    assert [item for _, item, _ in coordinator.take(0, "worker-a", 10)] == ids
+
+    # worker-a stops renewing; its shard is free once the lease expires
+    time.sleep(LEASE_SECONDS * 1.5)
+    coordinator.renew(1, "worker-b")
+    assert coordinator.has_orphaned_work()
+    assert coordinator.acquire("worker-b") == 0
+    assert set(_states(coordinator).values()) == {"queued"}
+
+    # The old owner can no longer renew or complete, so nothing is done twice
+    with pytest.raises(ShardLeaseLost):
+        coordinator.complete(0, "worker-a", [("course", entity_id) for entity_id in ids])
+    assert [item for _, item, _ in coordinator.take(0, "worker-b", 10)] == ids
+    assert coordinator.complete(0, "worker-b", [("course", entity_id) for entity_id in ids]) == len(ids)
+
+    assert set(_states(coordinator).values()) == {"done"}
+    assert coordinator.status()[0][5] == 1
+    assert coordinator.is_idle()
+
+
+def test_done_items_are_not_queued_again(coordinator):
+    entity_id = _ids_of_shard(0, 1)[0]
+    coordinator.push_many([("course", entity_id)])
+    coordinator.acquire("worker-a")
+    coordinator.take(0, "worker-a", 10)
+    coordinator.complete(0, "worker-a", [("course", entity_id)])
+
+    assert sum(coordinator.push_many([("course", entity_id)]).values()) == 0
+    assert coordinator.take(0, "worker-a", 10) == []
+
+
+def test_failed_items_are_requeued_until_max_attempts(coordinator):
+    succeeded, failed = _ids_of_shard(0, 2)
+    coordinator.push_many(("course", entity_id) for entity_id in (succeeded, failed))
+    coordinator.acquire("worker-a")
+
+    coordinator.take(0, "worker-a", 10)
+    assert coordinator.complete(0, "worker-a", [("course", succeeded)]) == 1
+    assert _states(coordinator) == {succeeded: "done", failed: "queued"}
+
+    for _ in range(MAX_ITEM_ATTEMPTS - 1):
+        assert [item for _, item, _ in coordinator.take(0, "worker-a", 10)] == [failed]
+        coordinator.complete(0, "worker-a", [])
+
+    assert _states(coordinator)[failed] == "failed"
+    assert coordinator.query("SELECT attempts FROM items WHERE entity_id = ?", (failed,))[0][0] == MAX_ITEM_ATTEMPTS
+    assert coordinator.take(0, "worker-a", 10) == []
+    assert coordinator.is_idle()
+
+
+def test_takeover_does_not_count_as_a_failed_attempt(coordinator):
+    entity_id = _ids_of_shard(0, 1)[0]
+    coordinator.push_many([("course", entity_id)])
+
+    for owner in ("worker-a", "worker-b", "worker-a", "worker-b"):
+        assert coordinator.acquire(owner) == 0
+        coordinator.take(0, owner, 10)
+        time.sleep(LEASE_SECONDS * 1.5)
+
+    assert _states(coordinator)[entity_id] == "taken"
+    assert coordinator.query("SELECT attempts FROM items WHERE entity_id = ?", (entity_id,))[0][0] == 0
+
+
+def test_shard_frontier_acks_only_handled_items(coordinator):
+    ids = _ids_of_shard(0, 3)
+    coordinator.push_many(("course", entity_id) for entity_id in ids)
+    coordinator.acquire("worker-a")
+    frontier = ShardFrontier(coordinator, 0, "worker-a", round_size=10)
+
+    popped = [frontier.pop() for _ in ids]
+    assert frontier.pop() is None
+    for kind, item, _ in popped[:2]:
+        frontier.ack(kind, item)
+    coordinator.complete(0, "worker-a", frontier.new_round())
+
+    assert _states(coordinator) == {ids[0]: "done", ids[1]: "done", ids[2]: "queued"}
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7, 400])
+def test_shard_id_ranges_partition_the_range(shards):
+    ranges = [shard_id_range(1, 300, shard, shards) for shard in range(shards)]
+
+    covered = [user_id for first, last in ranges for user_id in range(first, last + 1)]
+    assert covered == list(range(1, 301))
@@ -0,0 +1,329 @@
+"""
+Archive store module for HCMUT LMS Crawler.
+Stores HTML pages compressed in append-only pack files with an SQLite
+index, as an alternative to one HTML file per page.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from utils.html_saver import HtmlSaver
+from utils.sqlite_store import SqliteStore
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CATEGORIES = ["semesters", "courses", "users", "participants"]
+
+
+class _ArchiveIndex(SqliteStore):
+    """Index of pages, content-addressed blobs and compression dictionaries."""
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                category TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                PRIMARY KEY (category, file_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                pack TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_length INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                dict_id INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dictionaries (
+                dict_id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                path TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+
+class ArchiveStore(HtmlSaver):
+    """
+    HTML store keeping pages in compressed pack files.
+
+    Pages are indexed by (category, id) and stored once per distinct
+    content (SHA-256), zstd-compressed when the zstandard package is
+    installed and zlib-compressed otherwise. A zstd dictionary trained on
+    saved Moodle pages can be used per category, so the page chrome repeated
+    in every page costs almost nothing. Exposes the same API as HtmlSaver.
+    """
+
+    def __init__(self, output_dir: str = "./", compression_level: int = 3, max_pack_size: int = 512 * 1024 * 1024):
+        """
+        Initialize archive store.
+
+        Args:
+            output_dir: Base directory; pack files go to {output_dir}/archive
+            compression_level: zstd (1-22) or zlib (1-9) compression level
+            max_pack_size: Size in bytes after which a new pack file is started
+        """
+        self.compression_level = compression_level
+        self.max_pack_size = max_pack_size
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._dicts: Dict[int, object] = {}
+        self._category_dicts: Dict[str, int] = {}
+        self._packs: Dict[str, Path] = {}
+        super().__init__(output_dir)
+
+        self.archive_dir = self.output_dir / "archive"
+        self._index = _ArchiveIndex(str(self.archive_dir / "index.sqlite3"))
+        self._load_dictionaries()
+
+    def _ensure_directories(self):
+        """Create the archive directory instead of per-category folders."""
+        (self.output_dir / "archive" / "dicts").mkdir(parents=True, exist_ok=True)
+
+    def _load_dictionaries(self):
+        """Load trained dictionaries; the newest one of each category is used for writes."""
+        rows = self._index.query("SELECT dict_id, category, path FROM dictionaries ORDER BY created_at")
+        if rows and zstandard is None:
+            self.logger.warning("Archive has zstd dictionaries but zstandard is not installed")
+            return
+        for dict_id, category, path in rows:
+            with open(path, "rb") as f:
+                self._dicts[dict_id] = zstandard.ZstdCompressionDict(f.read())
+            self._category_dicts[category] = dict_id
+
+    def _pack_path(self, category: str) -> Path:
+        """Get the pack file new pages of a category are appended to."""
+        pack = self._packs.get(category)
+        if pack is None:
+            existing = sorted(self.archive_dir.glob(f"{category}-*.pack"))
+            pack = existing[-1] if existing else self.archive_dir / f"{category}-00000.pack"
+        if pack.exists() and pack.stat().st_size >= self.max_pack_size:
+            number = int(pack.stem.rsplit("-", 1)[1]) + 1
+            pack = self.archive_dir / f"{category}-{number:05d}.pack"
+        self._packs[category] = pack
+        return pack
+
+    def _compress(self, data: bytes, category: str):
+        """Compress data with the best available codec."""
+        if zstandard is None:
+            return zlib.compress(data, min(self.compression_level, 9)), "zlib", 0
+        dict_id = self._category_dicts.get(category, 0)
+        compressor = zstandard.ZstdCompressor(level=self.compression_level, dict_data=self._dicts.get(dict_id))
+        return compressor.compress(data), "zstd", dict_id
+
+    def _decompress(self, data: bytes, codec: str, dict_id: int) -> bytes:
+        """Decompress a blob."""
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if zstandard is None:
+            raise RuntimeError("zstandard package is required to read zstd-compressed archive pages")
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        if dict_id not in decompressors:
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts.get(dict_id))
+        return decompressors[dict_id].decompress(data)
+
+    def file_exists(self, category: str, file_id: str) -> bool:
+        """
+        Check if a page is archived.
+
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+
+        Returns:
+            True if the page exists, False otherwise
+        """
+        rows = self._index.query("SELECT 1 FROM pages WHERE category = ? AND file_id = ?", (category, file_id))
+        return bool(rows)
+
+    def save_html(self, category: str, file_id: str, content: str) -> str:
+        """
+        Archive HTML content, replacing any previous version of the page.
+
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+            content: HTML content to save
+
+        Returns:
+            Locator of the saved page
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._write_lock:
+            known = self._index.query("SELECT 1 FROM blobs WHERE digest = ?", (digest,))
+            blob = None
+            if not known:
+                compressed, codec, dict_id = self._compress(data, category)
+                pack = self._pack_path(category)
+                with open(pack, "ab") as f:
+                    offset = f.tell()
+                    f.write(compressed)
+                blob = (digest, str(pack), offset, len(compressed), len(data), codec, dict_id)
+
+            with self._index.transaction() as conn:
+                if blob:
+                    conn.execute("INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)", blob)
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (category, file_id, digest, saved_at) VALUES (?, ?, ?, ?)",
+                    (category, file_id, digest, time.time())
+                )
+
+        return self.get_file_path(category, file_id)
+
+    def get_file_path(self, category: str, file_id: str) -> str:
+        """
+        Get a locator for a page (pages have no file of their own).
+
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+
+        Returns:
+            Locator string of the form archive:{category}/{file_id}
+        """
+        return f"archive:{category}/{file_id}"
+
+    def read_html(self, category: str, file_id: str) -> Optional[str]:
+        """
+        Read an archived page.
+
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+
+        Returns:
+            HTML content, or None if the page does not exist
+        """
+        rows = self._index.query("""
+            SELECT b.pack, b.offset, b.length, b.codec, b.dict_id
+            FROM pages p JOIN blobs b ON b.digest = p.digest
+            WHERE p.category = ? AND p.file_id = ?
+        """, (category, file_id))
+        if not rows:
+            return None
+
+        pack, offset, length, codec, dict_id = rows[0]
+        with open(pack, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return self._decompress(data, codec, dict_id).decode("utf-8")
+
+    def list_ids(self, category: str) -> Iterator[str]:
+        """
+        List the IDs of all archived pages in a category.
+
+        Args:
+            category: Category of the pages
+
+        Yields:
+            Page IDs
+        """
+        for (file_id,) in self._index.query("SELECT file_id FROM pages WHERE category = ?", (category,)):
+            yield file_id
+
+    def train_dictionary(self, category: str, source: Optional[HtmlSaver] = None,
+                         max_samples: int = 2000, dict_size: int = 112640) -> Optional[int]:
+        """
+        Train a zstd dictionary on saved pages and use it for new pages of the category.
+
+        Args:
+            category: Category to train for
+            source: Store to sample pages from (defaults to this archive)
+            max_samples: Maximum number of sample pages
+            dict_size: Target dictionary size in bytes
+
+        Returns:
+            ID of the new dictionary, or None if it could not be trained
+        """
+        if zstandard is None:
+            self.logger.warning("zstandard is not installed, skipping dictionary training")
+            return None
+
+        source = source or self
+        samples = []
+        for file_id in source.list_ids(category):
+            content = source.read_html(category, file_id)
+            if content:
+                samples.append(content.encode("utf-8"))
+            if len(samples) >= max_samples:
+                break
+
+        if len(samples) < 10:
+            self.logger.warning(f"Not enough {category} pages to train a dictionary ({len(samples)})")
+            return None
+
+        dictionary = zstandard.train_dictionary(dict_size, samples)
+        dict_id = dictionary.dict_id()
+        path = self.archive_dir / "dicts" / f"{category}-{dict_id}.dict"
+        with open(path, "wb") as f:
+            f.write(dictionary.as_bytes())
+
+        with self._write_lock:
+            with self._index.transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dictionaries (dict_id, category, path, created_at) VALUES (?, ?, ?, ?)",
+                    (dict_id, category, str(path), time.time())
+                )
+            self._dicts[dict_id] = dictionary
+            self._category_dicts[category] = dict_id
+
+        self.logger.info(f"Trained {category} dictionary {dict_id} on {len(samples)} pages")
+        return dict_id
+
+    def import_from(self, source: HtmlSaver, train: bool = True) -> int:
+        """
+        Copy every page of another store (e.g. the HTML folders) into this archive.
+
+        Args:
+            source: Store to import from
+            train: Train a dictionary per category from the source first
+
+        Returns:
+            Number of imported pages
+        """
+        imported = 0
+        for category in CATEGORIES:
+            if train:
+                self.train_dictionary(category, source)
+            for file_id in source.list_ids(category):
+                if self.file_exists(category, file_id):
+                    continue
+                content = source.read_html(category, file_id)
+                if content is not None:
+                    self.save_html(category, file_id, content)
+                    imported += 1
+            self.logger.info(f"Imported {category}: {imported} pages so far")
+        return imported
+
+    def stats(self) -> dict:
+        """
+        Get archive size statistics.
+
+        Returns:
+            Dictionary with page count, unique blob count, raw and stored bytes
+        """
+        pages = self._index.query("SELECT COUNT(*) FROM pages")[0][0]
+        blobs, raw, stored = self._index.query(
+            "SELECT COUNT(*), COALESCE(SUM(raw_length), 0), COALESCE(SUM(length), 0) FROM blobs"
+        )[0]
+        return {"pages": pages, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored}
@@ -0,0 +1,188 @@
+"""
+Columnar export module for HCMUT LMS Crawler.
+Writes the crawled graph as typed Parquet or Arrow tables (one directory per
+dataset, courses and user-course links partitioned by semester) so analysis
+can load only the columns and semesters it needs instead of parsing the
+JSON arrays.
+"""
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+from utils.data_sink import JsonlDataSink
+from utils.normalize import TEACHER_ROLE, course_name_fields, flatten_profile, to_int
+
+
+COLUMNAR_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+# Rows per record batch (bounds memory while streaming the .jsonl files)
+BATCH_ROWS = 50_000
+
+logger = logging.getLogger("ColumnarExport")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export requires pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.dataset
+
+
+def _schemas(pa) -> Dict[str, "pa.Schema"]:
+    """Typed schema of every exported table."""
+    return {
+        "courses": pa.schema([
+            ("course_id", pa.int64()),
+            ("course_name", pa.string()),
+            ("teachers_text", pa.string()),
+            ("teacher_links", pa.list_(pa.string())),
+            ("course_code", pa.string()),
+            ("program_code", pa.string()),
+            ("program", pa.string()),
+            ("semester", pa.string()),
+        ]),
+        "users": pa.schema([
+            ("user_id", pa.int64()),
+            ("user_name", pa.string()),
+            ("role", pa.string()),
+            ("is_teacher", pa.bool_()),
+            ("email", pa.string()),
+            ("country", pa.string()),
+            ("city", pa.string()),
+            ("timezone", pa.string()),
+            ("course_links", pa.list_(pa.string())),
+        ]),
+        "users_courses": pa.schema([
+            ("user_id", pa.int64()),
+            ("course_id", pa.int64()),
+            ("semester", pa.string()),
+        ]),
+    }
+
+
+def _course_rows(records: Iterable[dict], semesters: Dict[int, str]) -> Iterator[dict]:
+    """Course rows; fills the parsed name fields of records crawled before they were extracted."""
+    for record in records:
+        course_name = record.get("course_name") or ""
+        parsed = course_name_fields(record)
+        course_id = to_int(record.get("course_id"))
+        semester = parsed["semester"] or None
+        semesters[course_id] = semester
+        yield {
+            "course_id": course_id,
+            "course_name": course_name,
+            "teachers_text": record.get("teachers_text") or "",
+            "teacher_links": record.get("teacher_links") or [],
+            "course_code": parsed["course_code"],
+            "program_code": parsed["program_code"],
+            "program": parsed["program"],
+            "semester": semester,
+        }
+
+
+def _user_rows(records: Iterable[dict]) -> Iterator[dict]:
+    for record in records:
+        role = record.get("role") or ""
+        yield {
+            "user_id": to_int(record.get("user_id")),
+            "user_name": record.get("teacher_name") or "",
+            "role": role,
+            "is_teacher": role == TEACHER_ROLE,
+            **flatten_profile(record),
+            "course_links": record.get("course_links") or [],
+        }
+
+
+def _edge_rows(records: Iterable[dict], semesters: Dict[int, str]) -> Iterator[dict]:
+    for record in records:
+        course_id = to_int(record.get("course_id"))
+        yield {
+            "user_id": to_int(record.get("user_id")),
+            "course_id": course_id,
+            "semester": semesters.get(course_id),
+        }
+
+
+def _batches(pa, schema, rows: Iterator[dict]) -> Iterator["pa.RecordBatch"]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_ROWS:
+            yield pa.RecordBatch.from_pylist(batch, schema=schema)
+            batch = []
+    if batch:
+        yield pa.RecordBatch.from_pylist(batch, schema=schema)
+
+
+def export_columnar(data_sink: JsonlDataSink, fmt: str = "parquet") -> Dict[str, int]:
+    """
+    Export the latest records of every dataset as Parquet or Arrow tables.
+
+    Writes OUTPUT_DIR/<fmt>/{courses,users,users_courses}/; courses and
+    users_courses are partitioned by semester (semester=HK252/...). Each
+    table is written to a temporary directory and then swapped into place.
+
+    Args:
+        data_sink: Sink holding the .jsonl files
+        fmt: "parquet" or "arrow" (Arrow IPC files)
+
+    Returns:
+        Mapping of table name to number of rows written
+
+    Raises:
+        ValueError: If fmt is not a columnar format
+        ImportError: If pyarrow is not installed
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format {fmt!r} (expected one of {', '.join(COLUMNAR_FORMATS)})")
+    pa, ds = _import_pyarrow()
+    schemas = _schemas(pa)
+    semesters: Dict[int, str] = {}
+
+    # Courses first: the links take their semester from the course
+    tables = {
+        "courses": lambda: _course_rows(data_sink.iter_latest("all_courses"), semesters),
+        "users": lambda: _user_rows(data_sink.iter_latest("all_users")),
+        "users_courses": lambda: _edge_rows(data_sink.iter_latest("users_courses"), semesters),
+    }
+
+    root = Path(data_sink.output_dir) / fmt
+    counts = {}
+    for table, rows in tables.items():
+        schema = schemas[table]
+        partitioned = "semester" in schema.names
+        target = root / table
+        tmp_dir = root / f"{table}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        count = 0
+
+        def counted(batches):
+            nonlocal count
+            for batch in batches:
+                count += batch.num_rows
+                yield batch
+
+        ds.write_dataset(
+            counted(_batches(pa, schema, rows())),
+            tmp_dir,
+            schema=schema,
+            format=COLUMNAR_FORMATS[fmt],
+            basename_template=f"part-{{i}}.{fmt}",
+            partitioning=ds.partitioning(pa.schema([("semester", pa.string())]), flavor="hive")
+            if partitioned else None,
+        )
+
+        old_dir = root / f"{table}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if target.exists():
+            target.rename(old_dir)
+        tmp_dir.rename(target)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        counts[table] = count
+        logger.info(f"Exported {count} rows to {target}")
+    return counts
@@ -3,24 +3,48 @@ Configuration module for HCMUT LMS Crawler.
 Handles environment variable loading and validation.
 """
 import os
+from pathlib import Path
+from typing import List
+
 from dotenv import load_dotenv
 
 
+def read_cookies_file(path: str) -> List[str]:
+    """
+    Read a file of session cookies, one per line (blank lines and # comments are skipped).
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Cookie header values (empty if the file does not exist)
+    """
+    cookies_file = Path(path)
+    if not cookies_file.exists():
+        return []
+    with open(cookies_file, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
 class Config:
     """Configuration class that loads and validates environment variables."""
     
-    def __init__(self, env_file: str = ".env"):
+    def __init__(self, env_file: str = ".env", require_cookie: bool = True):
         """
         Initialize configuration from environment file.
         
         Args:
             env_file: Path to the .env file (default: ".env")
+            require_cookie: Whether COOKIE (or WS_TOKEN) must be set (False for offline commands)
         """
         load_dotenv(env_file)
+        self.require_cookie = require_cookie
         
         # Load required variables
         self.base_url = os.getenv("BASE_URL", "https://lms.hcmut.edu.vn")
         self.cookie = os.getenv("COOKIE", "")
+        self.cookies_file = os.getenv("COOKIES_FILE", "")
+        self.session_wait = float(os.getenv("SESSION_WAIT", "0"))
         
         # Load optional variables with defaults
         self.number_of_workers = int(os.getenv("NUMBER_OF_WORKERS", "1"))
@@ -28,17 +52,131 @@ class Config:
         self.min_user_id = int(os.getenv("MIN_USER_ID", "0"))
         self.max_user_id = int(os.getenv("MAX_USER_ID", "0"))
         self.batch_size = int(os.getenv("BATCH_SIZE", "1000"))
+        self.fetch_engine = os.getenv("FETCH_ENGINE", "requests").lower()
+        self.max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS", "100"))
+        self.http2 = os.getenv("HTTP2", "true").lower() == "true"
+        self.rate_limit = float(os.getenv("RATE_LIMIT", "0"))
+        self.rate_burst = float(os.getenv("RATE_BURST", "5"))
+        self.target_latency = float(os.getenv("TARGET_LATENCY", "2.0"))
+        self.max_backoff = float(os.getenv("MAX_BACKOFF", "60"))
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "files").lower()
+        self.archive_compression_level = int(os.getenv("ARCHIVE_COMPRESSION_LEVEL", "3"))
+        self.parser_backend = os.getenv("PARSER_BACKEND", "bs4").lower()
+        self.brute_force_strategy = os.getenv("BRUTE_FORCE_STRATEGY", "sequential").lower()
+        self.probe_block_size = int(os.getenv("PROBE_BLOCK_SIZE", "1000"))
+        self.probe_samples = int(os.getenv("PROBE_SAMPLES", "20"))
+        self.probe_min_density = float(os.getenv("PROBE_MIN_DENSITY", "0"))
+        self.probe_budget = int(os.getenv("PROBE_BUDGET", "0"))
+        self.metrics_port = int(os.getenv("METRICS_PORT", "0"))
+        self.metrics_snapshot = os.getenv("METRICS_SNAPSHOT", "")
+        self.metrics_snapshot_interval = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "30"))
+        self.log_mode = os.getenv("LOG_MODE", "verbose").lower()
+        self.log_sample_rate = int(os.getenv("LOG_SAMPLE_RATE", "100"))
+        self.negative_cache_ttl = float(os.getenv("NEGATIVE_CACHE_TTL", "0"))
+        self.refresh_ttl_semesters = float(os.getenv("REFRESH_TTL_SEMESTERS", "0"))
+        self.refresh_ttl_courses = float(os.getenv("REFRESH_TTL_COURSES", "0"))
+        self.refresh_ttl_users = float(os.getenv("REFRESH_TTL_USERS", "0"))
+        self.coordinator_db = os.getenv("COORDINATOR_DB", "")
+        self.shard_lease_seconds = float(os.getenv("SHARD_LEASE_SECONDS", "120"))
+        self.listing_first = os.getenv("LISTING_FIRST", "false").lower() == "true"
+        self.participants = os.getenv("PARTICIPANTS", "false").lower() == "true"
+        self.participants_per_page = int(os.getenv("PARTICIPANTS_PER_PAGE", "5000"))
+        self.ws_token = os.getenv("WS_TOKEN", "")
+        self.ws_batch_size = int(os.getenv("WS_BATCH_SIZE", "100"))
+        self.max_pages = int(os.getenv("MAX_PAGES", "0"))
+        self.dataset_dir = os.getenv("DATASET_DIR", "")
+        self.export_formats = [
+            fmt.strip() for fmt in os.getenv("EXPORT_FORMATS", "json").lower().split(",") if fmt.strip()
+        ]
         
         # Validate configuration
         self._validate()
     
     def _validate(self):
         """Validate that required configuration is present."""
-        if not self.cookie:
-            raise ValueError("COOKIE environment variable is required")
+        if self.require_cookie and not self.ws_token and not self.get_cookies():
+            raise ValueError("COOKIE environment variable (or a COOKIES_FILE, or a WS_TOKEN) is required")
+        
+        if self.session_wait < 0:
+            raise ValueError("SESSION_WAIT must not be negative")
         
         if self.number_of_workers < 1:
             raise ValueError("NUMBER_OF_WORKERS must be at least 1")
+        
+        if self.fetch_engine not in ("requests", "async"):
+            raise ValueError("FETCH_ENGINE must be 'requests' or 'async'")
+        
+        if self.max_concurrent_requests < 1:
+            raise ValueError("MAX_CONCURRENT_REQUESTS must be at least 1")
+        
+        if self.rate_limit < 0:
+            raise ValueError("RATE_LIMIT must not be negative")
+        
+        if self.storage_backend not in ("files", "archive"):
+            raise ValueError("STORAGE_BACKEND must be 'files' or 'archive'")
+        
+        if self.parser_backend not in ("bs4", "lxml", "selectolax"):
+            raise ValueError("PARSER_BACKEND must be 'bs4', 'lxml' or 'selectolax'")
+        
+        if self.brute_force_strategy not in ("sequential", "adaptive"):
+            raise ValueError("BRUTE_FORCE_STRATEGY must be 'sequential' or 'adaptive'")
+        
+        if self.probe_block_size < 1 or self.probe_samples < 1:
+            raise ValueError("PROBE_BLOCK_SIZE and PROBE_SAMPLES must be at least 1")
+        
+        if self.log_mode not in ("verbose", "sampled"):
+            raise ValueError("LOG_MODE must be 'verbose' or 'sampled'")
+        
+        if self.log_sample_rate < 1:
+            raise ValueError("LOG_SAMPLE_RATE must be at least 1")
+        
+        if self.negative_cache_ttl < 0:
+            raise ValueError("NEGATIVE_CACHE_TTL must not be negative")
+        
+        if min(self.refresh_ttl_semesters, self.refresh_ttl_courses, self.refresh_ttl_users) < 0:
+            raise ValueError("REFRESH_TTL_* must not be negative")
+        
+        if self.shard_lease_seconds <= 0:
+            raise ValueError("SHARD_LEASE_SECONDS must be positive")
+        
+        if self.participants_per_page < 1:
+            raise ValueError("PARTICIPANTS_PER_PAGE must be at least 1")
+        
+        if self.ws_batch_size < 1:
+            raise ValueError("WS_BATCH_SIZE must be at least 1")
+        
+        if self.max_pages < 0:
+            raise ValueError("MAX_PAGES must not be negative")
+        
+        if not set(self.export_formats) <= {"json", "parquet", "arrow"}:
+            raise ValueError("EXPORT_FORMATS must be a comma-separated list of 'json', 'parquet' and 'arrow'")
+    
+    def get_refresh_ttls(self) -> dict:
+        """
+        Get the revalidation TTL of each page category.
+        
+        Returns:
+            Dictionary of category to TTL in seconds (0 = never refresh)
+        """
+        return {
+            "semesters": self.refresh_ttl_semesters * 3600,
+            "courses": self.refresh_ttl_courses * 3600,
+            "users": self.refresh_ttl_users * 3600,
+            # Participant lists are refreshed along with their course
+            "participants": self.refresh_ttl_courses * 3600,
+        }
+    
+    def get_cookies(self) -> list:
+        """
+        Get the session cookies: COOKIE followed by the lines of COOKIES_FILE.
+        
+        Returns:
+            List of Cookie header values, without duplicates
+        """
+        cookies = [self.cookie] if self.cookie else []
+        if self.cookies_file:
+            cookies += read_cookies_file(self.cookies_file)
+        return list(dict.fromkeys(cookies))
     
     def get_headers(self) -> dict:
         """
@@ -61,7 +199,7 @@ class Config:
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
             "host": "lms.hcmut.edu.vn",
             "referer": "https://lms.hcmut.edu.vn/",
-            "cookie": self.cookie,
+            "cookie": self.cookie or next(iter(self.get_cookies()), ""),
             "upgrade-insecure-requests": "1",
         }
 
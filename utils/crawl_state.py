@@ -0,0 +1,326 @@
+"""
+Crawl state module for HCMUT LMS Crawler.
+Persists the visited set and the frontier in SQLite so deduplication is
+atomic across threads and a restarted crawl resumes where it stopped.
+"""
+import json
+import logging
+import sqlite3
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from utils.sqlite_store import SqliteStore
+
+
+# Times an item may fail before it is given up (state "failed") until the next run
+MAX_ITEM_ATTEMPTS = 3
+
+
+class CrawlStateStore(SqliteStore):
+    """
+    Visited set and frontier of a crawl.
+
+    Visited entities go through two states: "in_progress" once a worker has
+    claimed them and "done" once their records are saved. Claims are atomic,
+    so two threads can never crawl the same entity. Entities left
+    "in_progress" by a crash are released on startup and crawled again.
+
+    The frontier table doubles as a priority queue with the same interface
+    as SpillingFrontier: the highest priority is taken first, then the oldest
+    item. It only keeps a small read-ahead buffer of items of one priority in
+    memory, which is put back whenever an item of a higher priority is queued.
+
+    Items whose handler failed are queued again (see retry()) until they
+    failed MAX_ITEM_ATTEMPTS times. Given-up items are kept when the
+    frontier is cleared and queued again when the next run starts.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        key_func: Optional[Callable[[str, Any], Optional[str]]] = None,
+        read_ahead: int = 256,
+        priority_func: Optional[Callable[[str, Any], Optional[int]]] = None
+    ):
+        """
+        Open the crawl state database and recover from an interrupted run.
+
+        Args:
+            db_path: Path to the SQLite file
+            key_func: Returns the dedup key of a frontier item (required for frontier use)
+            read_ahead: Number of frontier items fetched per query
+            priority_func: Returns the priority of a frontier item, or None
+                to queue it with the priority passed to push_many()
+        """
+        self.key_func = key_func
+        self.priority_func = priority_func
+        self.read_ahead = read_ahead
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._buffer = deque()
+        super().__init__(db_path)
+        self._recover()
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS visited (
+                kind TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, entity_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                item TEXT NOT NULL,
+                state TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (kind, entity_id)
+            )
+        """)
+        # Crawl state databases created before priorities and retries existed
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(frontier)")]
+        if "priority" not in columns:
+            conn.execute("ALTER TABLE frontier ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE frontier ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        conn.execute("DROP INDEX IF EXISTS frontier_state")
+        conn.execute("CREATE INDEX IF NOT EXISTS frontier_priority ON frontier (state, priority DESC, seq)")
+
+    def _recover(self):
+        """Release claims and requeue frontier items left over by an interrupted run or given up by the last run."""
+        with self.transaction() as conn:
+            released = conn.execute("DELETE FROM visited WHERE status = 'in_progress'").rowcount
+            requeued = conn.execute("""
+                UPDATE frontier SET state = 'queued'
+                WHERE state = 'taken' AND NOT EXISTS (
+                    SELECT 1 FROM visited v
+                    WHERE v.kind = frontier.kind AND v.entity_id = frontier.entity_id AND v.status = 'done'
+                )
+            """).rowcount
+            retried = conn.execute("UPDATE frontier SET state = 'queued', attempts = 0 WHERE state = 'failed'").rowcount
+        if released or requeued:
+            self.logger.info(f"Resuming: released {released} unfinished claims, requeued {requeued} frontier items")
+        if retried:
+            self.logger.info(f"Retrying {retried} frontier items that failed in the last run")
+
+    # Visited set
+
+    def claim(self, kind: str, entity_id: str, max_age: float = 0) -> bool:
+        """
+        Atomically claim an entity for crawling.
+
+        Args:
+            kind: Entity type ("course" or "user")
+            entity_id: Entity ID
+            max_age: Seconds after which a done entity may be claimed again
+                for a refresh (0 = done entities are never crawled again)
+
+        Returns:
+            True if the caller now owns the entity, False if it is done or claimed by another worker
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            if max_age > 0:
+                cursor = conn.execute("""
+                    INSERT INTO visited (kind, entity_id, status, updated_at) VALUES (?, ?, 'in_progress', ?)
+                    ON CONFLICT (kind, entity_id) DO UPDATE SET status = 'in_progress', updated_at = excluded.updated_at
+                    WHERE visited.status = 'done' AND visited.updated_at < ?
+                """, (kind, entity_id, now, now - max_age))
+            else:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO visited (kind, entity_id, status, updated_at) VALUES (?, ?, 'in_progress', ?)",
+                    (kind, entity_id, now)
+                )
+            return cursor.rowcount == 1
+
+    def release(self, kind: str, entity_id: str):
+        """
+        Give up a claim (e.g. after a failed fetch) so the entity can be crawled again.
+
+        Args:
+            kind: Entity type
+            entity_id: Entity ID
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM visited WHERE kind = ? AND entity_id = ? AND status = 'in_progress'",
+                (kind, entity_id)
+            )
+
+    def mark_done(self, keys: Iterable[Tuple[str, str]]):
+        """
+        Mark claimed entities as done. Call after their records are saved.
+
+        Args:
+            keys: (kind, entity_id) pairs
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO visited (kind, entity_id, status, updated_at) VALUES (?, ?, 'done', ?)",
+                [(kind, entity_id, now) for kind, entity_id in keys]
+            )
+
+    def is_done(self, kind: str, entity_id: str, max_age: float = 0) -> bool:
+        """
+        Check whether an entity has been crawled and saved.
+
+        Args:
+            kind: Entity type
+            entity_id: Entity ID
+            max_age: Seconds after which a done entity counts as due for a refresh (0 = never)
+
+        Returns:
+            True if the entity is done (and not due for a refresh)
+        """
+        since = time.time() - max_age if max_age > 0 else 0
+        rows = self.query(
+            "SELECT 1 FROM visited WHERE kind = ? AND entity_id = ? AND status = 'done' AND updated_at >= ?",
+            (kind, entity_id, since)
+        )
+        return bool(rows)
+
+    def count_done(self, kind: str) -> int:
+        """Count crawled and saved entities of a kind."""
+        return self.query("SELECT COUNT(*) FROM visited WHERE kind = ? AND status = 'done'", (kind,))[0][0]
+
+    # Frontier
+
+    def push(self, kind: str, item: Any, priority: int = 0) -> bool:
+        """
+        Queue an item unless it was already queued in this crawl.
+
+        Args:
+            kind: Entity type
+            item: JSON-serializable work item
+            priority: Priority of the item (see push_many)
+
+        Returns:
+            True if the item was queued, False if it was a duplicate
+        """
+        return sum(self.push_many([(kind, item)], priority).values()) == 1
+
+    def push_many(self, items: Iterable[Tuple[str, Any]], priority: int = 0) -> Dict[str, int]:
+        """
+        Queue several items in one transaction.
+
+        Duplicates still waiting in the queue are raised to the new priority
+        if it is higher.
+
+        Args:
+            items: (kind, item) pairs
+            priority: Priority of items priority_func does not rank (higher is taken first)
+
+        Returns:
+            Mapping of kind to number of newly queued items
+        """
+        queued = Counter()
+        rows = []
+        for kind, item in items:
+            key = self.key_func(kind, item)
+            if key is not None:
+                item_priority = self.priority_func(kind, item) if self.priority_func else None
+                rows.append((
+                    kind, key, json.dumps(item, ensure_ascii=False), priority if item_priority is None else item_priority
+                ))
+
+        if not rows:
+            return queued
+
+        with self.transaction() as conn:
+            for kind, key, item_json, item_priority in rows:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO frontier (kind, entity_id, item, state, priority) VALUES (?, ?, ?, 'queued', ?)",
+                    (kind, key, item_json, item_priority)
+                )
+                if not cursor.rowcount:
+                    conn.execute(
+                        "UPDATE frontier SET priority = ? WHERE kind = ? AND entity_id = ? AND state = 'queued' AND priority < ?",
+                        (item_priority, kind, key, item_priority)
+                    )
+                queued[kind] += cursor.rowcount
+
+            # Put the read-ahead back if it would hold up a more urgent item
+            if self._buffer and max(row[3] for row in rows) > self._buffer[0][3]:
+                conn.executemany("UPDATE frontier SET state = 'queued' WHERE seq = ?", [(entry[0],) for entry in self._buffer])
+                self._buffer.clear()
+        return queued
+
+    def pop(self) -> Optional[Tuple[str, Any, int]]:
+        """
+        Take the queued item with the highest priority.
+
+        Returns:
+            (kind, item, priority) tuple, or None if the frontier is empty
+        """
+        with self._lock:
+            if not self._buffer:
+                with self.transaction() as conn:
+                    rows = conn.execute("""
+                        SELECT seq, kind, item, priority FROM frontier
+                        WHERE state = 'queued' AND priority = (SELECT MAX(priority) FROM frontier WHERE state = 'queued')
+                        ORDER BY seq LIMIT ?
+                    """, (self.read_ahead,)).fetchall()
+                    conn.executemany("UPDATE frontier SET state = 'taken' WHERE seq = ?", [(row[0],) for row in rows])
+                self._buffer.extend((seq, kind, json.loads(item), priority) for seq, kind, item, priority in rows)
+            if not self._buffer:
+                return None
+            _, kind, item, priority = self._buffer.popleft()
+            return kind, item, priority
+
+    def retry(self, kind: str, item: Any) -> bool:
+        """
+        Queue a taken item again after its handler failed.
+
+        Once the item failed MAX_ITEM_ATTEMPTS times it is given up for this
+        run (state "failed") and queued again when the next run starts.
+
+        Args:
+            kind: Entity type
+            item: Work item returned by pop()
+
+        Returns:
+            True if the item was queued again, False if it was given up
+        """
+        key = self.key_func(kind, item)
+        with self.transaction() as conn:
+            conn.execute("""
+                UPDATE frontier SET attempts = attempts + 1,
+                    state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END
+                WHERE kind = ? AND entity_id = ? AND state = 'taken'
+            """, (MAX_ITEM_ATTEMPTS, kind, key))
+            rows = conn.execute(
+                "SELECT state FROM frontier WHERE kind = ? AND entity_id = ?", (kind, key)
+            ).fetchall()
+        if rows and rows[0][0] == "failed":
+            self.logger.warning(f"Giving up {kind} {key} after {MAX_ITEM_ATTEMPTS} attempts, retrying it next run")
+            return False
+        return True
+
+    def count_failed(self) -> int:
+        """Count frontier items given up in this run."""
+        return self.query("SELECT COUNT(*) FROM frontier WHERE state = 'failed'")[0][0]
+
+    def pending_by_kind(self) -> Dict[str, int]:
+        """Count queued items per kind."""
+        with self._lock:
+            counts = Counter(entry[1] for entry in self._buffer)
+            for kind, count in self.query("SELECT kind, COUNT(*) FROM frontier WHERE state = 'queued' GROUP BY kind"):
+                counts[kind] += count
+            return dict(counts)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buffer) + self.query("SELECT COUNT(*) FROM frontier WHERE state = 'queued'")[0][0]
+
+    def clear_frontier(self):
+        """Forget the frontier after a crawl finished, keeping the visited set and the given-up items."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM frontier WHERE state != 'failed'")
+        self._buffer.clear()
@@ -0,0 +1,210 @@
+"""
+Data sink module for HCMUT LMS Crawler.
+Handles append-only JSON Lines output and export to JSON arrays.
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+
+DATASETS = ["all_courses", "all_users", "users_courses"]
+
+# Fields identifying a record; a refreshed entity is appended again and
+# only its latest record is exported
+DATASET_KEYS = {
+    "all_courses": ("course_id",),
+    "all_users": ("user_id",),
+    "users_courses": ("user_id", "course_id"),
+}
+
+
+class JsonlDataSink:
+    """Append-only JSON Lines sink for crawled records."""
+
+    def __init__(self, output_dir: str = "./", datasets: List[str] = None, migrate_legacy: bool = False):
+        """
+        Initialize data sink with output directory.
+
+        Args:
+            output_dir: Directory holding the .jsonl and exported .json files
+            datasets: Dataset names to manage (defaults to DATASETS)
+            migrate_legacy: Import the JSON arrays of older versions into missing
+                .jsonl files (only for the sink of OUTPUT_DIR, never for
+                staging or shard sinks)
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.datasets = datasets or DATASETS
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        if migrate_legacy:
+            self._migrate_legacy_json()
+
+    def get_jsonl_path(self, dataset: str) -> Path:
+        """Get the path of the append-only .jsonl file for a dataset."""
+        return self.output_dir / f"{dataset}.jsonl"
+
+    def get_json_path(self, dataset: str) -> Path:
+        """Get the path of the exported .json array file for a dataset."""
+        return self.output_dir / f"{dataset}.json"
+
+    def _migrate_legacy_json(self):
+        """
+        Seed .jsonl files from JSON arrays written by older versions.
+
+        Only runs for datasets that have a .json file but no .jsonl file yet,
+        so previously crawled data is not lost by the next export. Older
+        versions wrote the arrays to the working directory rather than
+        OUTPUT_DIR, so both are checked (OUTPUT_DIR first).
+        """
+        for dataset in self.datasets:
+            jsonl_path = self.get_jsonl_path(dataset)
+            if jsonl_path.exists():
+                continue
+            json_path = next((path for path in self._legacy_json_paths(dataset) if path.exists()), None)
+            if json_path is None:
+                continue
+
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning(f"Could not migrate {json_path}: {e}")
+                continue
+
+            self.append(dataset, records)
+            self.logger.info(f"Migrated {len(records)} records from {json_path} to {jsonl_path}")
+
+    def _legacy_json_paths(self, dataset: str) -> List[Path]:
+        """Get the paths a JSON array of a dataset may have been written to by older versions."""
+        paths = [self.get_json_path(dataset)]
+        cwd_path = Path.cwd() / f"{dataset}.json"
+        if cwd_path.resolve() != paths[0].resolve():
+            paths.append(cwd_path)
+        return paths
+
+    def append(self, dataset: str, records: Iterable[dict]) -> int:
+        """
+        Append records to a dataset. Cost is proportional to the new records only.
+
+        Args:
+            dataset: Dataset name (e.g. "all_courses")
+            records: Records to append
+
+        Returns:
+            Number of records written
+        """
+        lines = [json.dumps(record, ensure_ascii=False) + "\n" for record in records]
+        if not lines:
+            return 0
+
+        with self._lock:
+            with open(self.get_jsonl_path(dataset), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+        return len(lines)
+
+    def write_batch(self, batch: Dict[str, Iterable[dict]]) -> Dict[str, int]:
+        """
+        Append one batch of records to several datasets.
+
+        Args:
+            batch: Mapping of dataset name to new records
+
+        Returns:
+            Mapping of dataset name to number of records written
+        """
+        return {dataset: self.append(dataset, records) for dataset, records in batch.items()}
+
+    def iter_records(self, dataset: str) -> Iterator[dict]:
+        """
+        Stream records of a dataset from its .jsonl file.
+
+        Args:
+            dataset: Dataset name
+
+        Yields:
+            Record dictionaries, skipping truncated lines from an interrupted write
+        """
+        jsonl_path = self.get_jsonl_path(dataset)
+        if not jsonl_path.exists():
+            return
+
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping malformed line {line_number} in {jsonl_path}")
+
+    def iter_latest(self, dataset: str) -> Iterator[dict]:
+        """
+        Stream the latest record of every key of a dataset.
+
+        Records appended again by a refresh replace the earlier record with
+        the same key. Takes two passes over the .jsonl file; memory holds one
+        position per key, not the records.
+
+        Args:
+            dataset: Dataset name
+
+        Yields:
+            Record dictionaries in order of their latest append
+        """
+        key_fields = DATASET_KEYS.get(dataset)
+        if not key_fields:
+            yield from self.iter_records(dataset)
+            return
+
+        # First pass: position of the latest record of every key
+        latest = {}
+        for position, record in enumerate(self.iter_records(dataset)):
+            latest[tuple(record.get(field) for field in key_fields)] = position
+
+        for position, record in enumerate(self.iter_records(dataset)):
+            if latest.get(tuple(record.get(field) for field in key_fields)) == position:
+                yield record
+
+    def export_json(self, dataset: str) -> int:
+        """
+        Compact a dataset into a JSON array file for downstream consumers (e.g. eda.ipynb).
+
+        The array is streamed to a temporary file and then moved into place,
+        so readers never see a partially written file. Only the latest record
+        of every key is exported (see iter_latest).
+
+        Args:
+            dataset: Dataset name
+
+        Returns:
+            Number of records exported
+        """
+        json_path = self.get_json_path(dataset)
+        tmp_path = json_path.with_suffix(".json.tmp")
+        count = 0
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for record in self.iter_latest(dataset):
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(record, ensure_ascii=False))
+                count += 1
+            f.write("\n]\n" if count else "]\n")
+
+        tmp_path.replace(json_path)
+        self.logger.info(f"Exported {count} records to {json_path}")
+        return count
+
+    def export_all(self) -> Dict[str, int]:
+        """
+        Export every dataset to its JSON array file.
+
+        Returns:
+            Mapping of dataset name to number of records exported
+        """
+        return {dataset: self.export_json(dataset) for dataset in self.datasets}
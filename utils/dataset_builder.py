@@ -0,0 +1,370 @@
+"""
+Dataset builder module for HCMUT LMS Crawler.
+Builds the per-semester CSV files published with the search page
+(courses_<semester>.csv, user_course_<semester>.csv, slot_<semester>.csv and
+dataset_info.csv) that used to be produced by running eda.ipynb by hand.
+The build is incremental: only records appended to the .jsonl files since
+the last build are read, and only the semesters they touch are rewritten.
+"""
+import csv
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.data_sink import JsonlDataSink
+from utils.normalize import TEACHER_ROLE, course_name_fields, flatten_profile, to_int
+from utils.search_index import build_search_index
+from utils.sqlite_store import SqliteStore
+
+
+COURSE_COLUMNS = ["id", "name", "teachers", "course_code", "semester", "program_code", "program"]
+USER_COURSE_COLUMNS = [
+    "course_id", "course_name", "teacher_name", "course_code", "semester", "program_code", "program",
+    "user_id", "user_name", "role", "email", "country", "city", "timezone", "is_teacher",
+]
+SLOT_COLUMNS = [
+    "code", "name", "credit", "program", "size", "language", "teacher", "dayOfWeek", "slot", "room", "branch", "weeks",
+]
+# Slot fields lowercased like the course and user text ("group" is renamed to "program")
+SLOT_LOWERCASE = ("code", "name", "teacher", "program", "language", "dayOfWeek", "room")
+
+# Lines applied per transaction (progress survives an interrupted build)
+CHUNK_LINES = 5000
+
+
+def _lower(value: Optional[str]) -> str:
+    return (value or "").lower()
+
+
+def _csv_value(value) -> str:
+    # Match the pandas output the published files were made with
+    if isinstance(value, bool):
+        return str(value)
+    return "" if value is None else value
+
+
+def _write_csv(path: Path, columns: List[str], rows) -> int:
+    """Write rows to a CSV file through a temporary file. Returns the number of rows."""
+    tmp_path = path.with_suffix(".csv.tmp")
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            count += 1
+    tmp_path.replace(path)
+    return count
+
+
+def read_slots(path: str) -> Iterator[list]:
+    """
+    Flatten a course_time.json file (timetable of the semester) into slot rows.
+
+    Args:
+        path: Path to course_time.json, a list of objects with a subjectDetails list
+
+    Yields:
+        Rows in SLOT_COLUMNS order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        course_times = json.load(f)
+    for course_time in course_times:
+        for detail in course_time.get("subjectDetails") or []:
+            detail = dict(detail, program=detail.get("group"))
+            for field in SLOT_LOWERCASE:
+                if isinstance(detail.get(field), str):
+                    detail[field] = detail[field].lower()
+            yield [detail.get(column) for column in SLOT_COLUMNS]
+
+
+class DatasetBuilder(SqliteStore):
+    """
+    Incremental builder of the per-semester CSV datasets.
+
+    Normalized courses, users and user-course links are kept in SQLite
+    (dataset.sqlite3), with the byte offset up to which each .jsonl file has
+    been read. A build applies the new lines (a refreshed entity replaces
+    its earlier row), marks the semesters whose rows changed and rewrites
+    only their files. A .jsonl file that was replaced (e.g. by reparse) is
+    read again from the start.
+    """
+
+    def __init__(self, db_path: str, data_sink: JsonlDataSink, dataset_dir: str):
+        """
+        Open the dataset database.
+
+        Args:
+            db_path: Path to the SQLite file
+            data_sink: Sink holding the .jsonl files
+            dataset_dir: Directory the <semester>/ output directories are written to
+        """
+        self.data_sink = data_sink
+        self.dataset_dir = Path(dataset_dir)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        super().__init__(db_path)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY,
+                name TEXT, teachers TEXT, course_code TEXT,
+                semester TEXT, program_code TEXT, program TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS courses_semester ON courses (semester)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT, role TEXT, email TEXT, country TEXT,
+                city TEXT, timezone TEXT, is_teacher INTEGER
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users_courses (
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, course_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS users_courses_course ON users_courses (course_id)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                dataset TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS dirty (semester TEXT PRIMARY KEY)")
+
+    # Applying new records
+
+    def _apply_course(self, conn: sqlite3.Connection, record: dict):
+        course_id = to_int(record.get("course_id"))
+        if course_id is None:
+            return
+        fields = course_name_fields(record)
+        row = (
+            course_id,
+            _lower(record.get("course_name")),
+            _lower(record.get("teachers_text")),
+            _lower(fields["course_code"]),
+            _lower(fields["semester"]),
+            _lower(fields["program_code"]),
+            _lower(fields["program"]),
+        )
+        # The course may move between semesters: both are rewritten
+        conn.execute("INSERT OR IGNORE INTO dirty SELECT semester FROM courses WHERE id = ?", (course_id,))
+        conn.execute("INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        conn.execute("INSERT OR IGNORE INTO dirty VALUES (?)", (row[4],))
+
+    def _apply_user(self, conn: sqlite3.Connection, record: dict):
+        user_id = to_int(record.get("user_id"))
+        if not user_id:
+            return
+        role = record.get("role") or ""
+        profile = flatten_profile(record)
+        conn.execute(
+            "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user_id,
+                _lower(record.get("teacher_name")),
+                role.lower() or None,
+                _lower(profile["email"]),
+                _lower(profile["country"]),
+                _lower(profile["city"]),
+                profile["timezone"],
+                role == TEACHER_ROLE,
+            )
+        )
+        conn.execute("""
+            INSERT OR IGNORE INTO dirty
+            SELECT DISTINCT c.semester FROM users_courses e JOIN courses c ON c.id = e.course_id
+            WHERE e.user_id = ?
+        """, (user_id,))
+
+    def _apply_user_course(self, conn: sqlite3.Connection, record: dict):
+        user_id = to_int(record.get("user_id"))
+        course_id = to_int(record.get("course_id"))
+        if not user_id or course_id is None:
+            return
+        cursor = conn.execute("INSERT OR IGNORE INTO users_courses VALUES (?, ?)", (user_id, course_id))
+        if cursor.rowcount:
+            conn.execute("INSERT OR IGNORE INTO dirty SELECT semester FROM courses WHERE id = ?", (course_id,))
+
+    def _new_lines(self, dataset: str) -> Iterator[Tuple[List[bytes], int]]:
+        """
+        Read the lines appended to a .jsonl file since the last build.
+
+        Yields:
+            (chunk of complete lines, offset after the chunk)
+        """
+        path = self.data_sink.get_jsonl_path(dataset)
+        if not path.exists():
+            return
+        stat = os.stat(path)
+        rows = self.query("SELECT inode, offset FROM sources WHERE dataset = ?", (dataset,))
+        inode, offset = rows[0] if rows else (stat.st_ino, 0)
+        if inode != stat.st_ino or stat.st_size < offset:
+            self.logger.info(f"{path} was replaced, reading it from the start")
+            self._reset(dataset)
+            offset = 0
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                chunk.append(line)
+                offset += len(line)
+                if len(chunk) >= CHUNK_LINES:
+                    yield chunk, offset
+                    chunk = []
+            if chunk:
+                yield chunk, offset
+
+    def _reset(self, dataset: str):
+        """Drop the rows read from a replaced .jsonl file; every semester is rewritten."""
+        table = {"all_courses": "courses", "all_users": "users", "users_courses": "users_courses"}[dataset]
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO dirty SELECT DISTINCT semester FROM courses")
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute("DELETE FROM sources WHERE dataset = ?", (dataset,))
+
+    def update(self) -> Dict[str, int]:
+        """
+        Apply the records appended since the last build.
+
+        Courses are applied first so that links and users of a new course
+        mark its semester.
+
+        Returns:
+            Mapping of dataset name to number of records read
+        """
+        appliers = {
+            "all_courses": self._apply_course,
+            "users_courses": self._apply_user_course,
+            "all_users": self._apply_user,
+        }
+        counts = {}
+        for dataset, apply in appliers.items():
+            path = self.data_sink.get_jsonl_path(dataset)
+            count = 0
+            for chunk, offset in self._new_lines(dataset):
+                with self.transaction() as conn:
+                    for line in chunk:
+                        try:
+                            apply(conn, json.loads(line))
+                        except json.JSONDecodeError:
+                            self.logger.warning(f"Skipping malformed line in {path}")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sources (dataset, inode, offset) VALUES (?, ?, ?)",
+                        (dataset, os.stat(path).st_ino, offset)
+                    )
+                count += len(chunk)
+            counts[dataset] = count
+            if count:
+                self.logger.info(f"Read {count} new {dataset} records")
+        return counts
+
+    # Writing outputs
+
+    def semesters(self) -> List[str]:
+        """Get every known semester, most recent first."""
+        rows = self.query("SELECT DISTINCT semester FROM courses WHERE semester != ''")
+        return sorted((row[0] for row in rows), key=lambda semester: int(semester[2:]), reverse=True)
+
+    def _user_course_rows(self, semester: str):
+        return self.query("""
+            SELECT c.id, c.name, c.teachers, c.course_code, c.semester, c.program_code, c.program,
+                   u.id, u.name, u.role, u.email, u.country, u.city, u.timezone, u.is_teacher
+            FROM courses c
+            JOIN users_courses e ON e.course_id = c.id
+            JOIN users u ON u.id = e.user_id
+            WHERE c.semester = ?
+            ORDER BY c.id, u.id
+        """, (semester,))
+
+    def write_semester(self, semester: str, slots_path: Optional[str] = None) -> Dict[str, int]:
+        """
+        Rewrite the CSV files and the search index of one semester.
+
+        Args:
+            semester: Semester code (e.g. "hk252")
+            slots_path: course_time.json with the timetable of this semester
+
+        Returns:
+            Mapping of dataset name (as in dataset_info.csv) to number of rows
+        """
+        out_dir = self.dataset_dir / semester
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        courses = self.query(f"SELECT {', '.join(COURSE_COLUMNS)} FROM courses WHERE semester = ? ORDER BY id", (semester,))
+        counts = {"Course": _write_csv(out_dir / f"courses_{semester}.csv", COURSE_COLUMNS, courses)}
+
+        slot_path = out_dir / f"slot_{semester}.csv"
+        if slots_path:
+            _write_csv(slot_path, SLOT_COLUMNS, read_slots(slots_path))
+        if slot_path.exists():
+            with open(slot_path, "r", encoding="utf-8", newline="") as f:
+                counts["Slot"] = sum(1 for _ in csv.reader(f)) - 1
+
+        user_courses = (row[:-1] + (bool(row[-1]),) for row in self._user_course_rows(semester))
+        counts["User Course"] = _write_csv(
+            out_dir / f"user_course_{semester}.csv", USER_COURSE_COLUMNS, user_courses
+        )
+
+        columns = {"Course": COURSE_COLUMNS, "Slot": SLOT_COLUMNS, "User Course": USER_COURSE_COLUMNS}
+        _write_csv(
+            out_dir / "dataset_info.csv",
+            ["dataset_name", "total_records", "columns"],
+            ((name, count, ", ".join(columns[name])) for name, count in counts.items())
+        )
+
+        build_search_index(str(out_dir), semester)
+
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM dirty WHERE semester = ?", (semester,))
+        self.logger.info(
+            f"Wrote {semester}: " + ", ".join(f"{count} {name.lower()} rows" for name, count in counts.items())
+        )
+        return counts
+
+    def build(self, semesters: Optional[List[str]] = None, slots_path: Optional[str] = None) -> List[str]:
+        """
+        Apply new records and rewrite the semesters they changed.
+
+        Args:
+            semesters: Only write these semesters (default: every changed semester)
+            slots_path: course_time.json of the most recent requested semester
+
+        Returns:
+            Semesters written
+        """
+        self.update()
+        dirty = {row[0] for row in self.query("SELECT semester FROM dirty WHERE semester != ''")}
+        known = self.semesters()
+        wanted = [semester.lower() for semester in semesters] if semesters else known
+
+        for semester in dirty.difference(known):
+            self.logger.warning(f"Semester {semester} has no courses left, its files are kept as they are")
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM dirty WHERE semester = ?", (semester,))
+
+        # The timetable belongs to one semester, which is rewritten with it
+        slot_semester = wanted[0] if slots_path and wanted else None
+        written = []
+        for semester in wanted:
+            if semester not in known:
+                self.logger.warning(f"No courses of semester {semester}")
+                continue
+            if semester in dirty or semester == slot_semester:
+                self.write_semester(semester, slots_path if semester == slot_semester else None)
+                written.append(semester)
+        if not written:
+            self.logger.info("No semester changed since the last build")
+        return written
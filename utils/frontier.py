@@ -0,0 +1,313 @@
+"""
+Frontier module for HCMUT LMS Crawler.
+Provides a deduplicating work queue and a scheduler that feeds discovered
+entities straight back into a single worker pool.
+
+Queued items carry a priority (higher is crawled first): the persistent
+frontiers pop the highest priority first, and items discovered by a handler
+inherit the priority of the item that discovered them.
+"""
+import json
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.metrics import ERRORS, METRICS
+
+
+WorkItem = Tuple[str, Any]
+QueuedItem = Tuple[str, Any, int]
+
+ITEMS = METRICS.counter("lms_items_total", "Work items processed", ("kind", "outcome"))
+QUEUE_DEPTH = METRICS.gauge("lms_queue_depth", "Queued work items", ("kind",))
+IN_FLIGHT = METRICS.gauge("lms_in_flight", "Submitted, unfinished work items")
+
+
+class SpillingFrontier:
+    """
+    FIFO frontier of (kind, item) pairs with deduplication.
+
+    At most max_in_memory items are held in memory; the rest are spilled to
+    a JSON Lines file and read back in chunks once the in-memory queue drains.
+    Priorities are kept with the items but do not reorder them.
+    """
+
+    def __init__(
+        self,
+        key_func: Callable[[str, Any], Optional[str]],
+        spill_path: str,
+        max_in_memory: int = 10000
+    ):
+        """
+        Initialize frontier.
+
+        Args:
+            key_func: Returns the dedup key of an item (None means "never dedupe")
+            spill_path: Path of the overflow file
+            max_in_memory: Maximum number of queued items kept in memory
+        """
+        self.key_func = key_func
+        self.spill_path = Path(spill_path)
+        self.max_in_memory = max_in_memory
+        self._queue = deque()
+        self._seen = set()
+        self._spilled = 0
+        self._spill_offset = 0
+        self._lock = threading.Lock()
+        self.spill_path.unlink(missing_ok=True)
+
+    def push(self, kind: str, item: Any, priority: int = 0) -> bool:
+        """
+        Queue an item unless it was already seen.
+
+        Args:
+            kind: Entity type (e.g. "course")
+            item: Work item passed to the handler of that kind
+            priority: Priority handed back by pop()
+
+        Returns:
+            True if the item was queued, False if it was a duplicate
+        """
+        key = self.key_func(kind, item)
+        with self._lock:
+            if key is not None:
+                if (kind, key) in self._seen:
+                    return False
+                self._seen.add((kind, key))
+
+            if self._spilled or len(self._queue) >= self.max_in_memory:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([kind, item, priority], ensure_ascii=False) + "\n")
+                self._spilled += 1
+            else:
+                self._queue.append((kind, item, priority))
+        return True
+
+    def push_many(self, items: Iterable[WorkItem], priority: int = 0) -> Dict[str, int]:
+        """
+        Queue several items.
+
+        Args:
+            items: (kind, item) pairs
+            priority: Priority of the items
+
+        Returns:
+            Mapping of kind to number of newly queued items
+        """
+        queued = Counter()
+        for kind, item in items:
+            queued[kind] += self.push(kind, item, priority)
+        return queued
+
+    def pop(self) -> Optional[QueuedItem]:
+        """
+        Take the next item.
+
+        Returns:
+            (kind, item, priority) tuple, or None if the frontier is empty
+        """
+        with self._lock:
+            if not self._queue and self._spilled:
+                self._refill()
+            if not self._queue:
+                return None
+            return self._queue.popleft()
+
+    def _refill(self):
+        """Move up to max_in_memory spilled items back into memory."""
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            f.seek(self._spill_offset)
+            while self._spilled and len(self._queue) < self.max_in_memory:
+                line = f.readline()
+                if not line:
+                    break
+                self._queue.append(tuple(json.loads(line)))
+                self._spilled -= 1
+            self._spill_offset = f.tell()
+
+        if not self._spilled:
+            self.spill_path.unlink(missing_ok=True)
+            self._spill_offset = 0
+
+    def drain(self) -> Iterator[Any]:
+        """
+        Take items until the frontier is empty.
+
+        Yields:
+            Work items (without their kind)
+        """
+        while True:
+            entry = self.pop()
+            if entry is None:
+                return
+            yield entry[1]
+
+    def pending_by_kind(self) -> Dict[str, int]:
+        """Count in-memory queued items per kind (spilled items are reported as "spilled")."""
+        with self._lock:
+            counts = Counter(entry[0] for entry in self._queue)
+            if self._spilled:
+                counts["spilled"] = self._spilled
+            return dict(counts)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue) + self._spilled
+
+    def close(self):
+        """Remove the overflow file."""
+        self.spill_path.unlink(missing_ok=True)
+
+
+class FrontierScheduler:
+    """
+    Runs handlers over a frontier with one worker pool until it is exhausted.
+
+    Each handler takes a work item and returns newly discovered (kind, item)
+    pairs, which are pushed back into the frontier with the priority of the
+    item that discovered them, or None if the item could not be processed
+    (e.g. its page could not be fetched). The number of submitted but unfinished items
+    is capped, so memory stays bounded by the frontier's in-memory limit plus
+    max_in_flight.
+
+    With a budget, no more items are submitted once it is exhausted; the
+    rest stay queued in the frontier.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Callable[[Any], List[WorkItem]]],
+        frontier,
+        max_workers: int,
+        max_in_flight: Optional[int] = None,
+        progress_interval: int = 100,
+        checkpoint_interval: int = 0,
+        on_checkpoint: Optional[Callable[[], None]] = None,
+        budget_exhausted: Optional[Callable[[], bool]] = None,
+        on_item_done: Optional[Callable[[str, Any], None]] = None,
+        on_item_failed: Optional[Callable[[str, Any], None]] = None,
+        on_item_submitted: Optional[Callable[[str, Any], None]] = None
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            handlers: Mapping of kind to handler function
+            frontier: SpillingFrontier or CrawlStateStore to pull work from
+            max_workers: Number of worker threads
+            max_in_flight: Maximum number of submitted, unfinished items (defaults to 2 * max_workers)
+            progress_interval: Log progress every N completed items
+            checkpoint_interval: Call on_checkpoint every N completed items (0 disables)
+            on_checkpoint: Callback run on the scheduler thread (e.g. to flush output)
+            budget_exhausted: Returns True once the crawl should stop taking new items
+            on_item_done: Called with (kind, item) for every item processed successfully
+            on_item_failed: Called with (kind, item) for every item whose handler
+                returned None or raised (e.g. to queue it again)
+            on_item_submitted: Called with (kind, item) on the scheduler thread when an
+                item is submitted, before a worker picks it up (e.g. to prefetch its page)
+        """
+        self.handlers = handlers
+        self.frontier = frontier
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or 2 * max_workers
+        self.progress_interval = progress_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.on_checkpoint = on_checkpoint
+        self.budget_exhausted = budget_exhausted
+        self.on_item_done = on_item_done
+        self.on_item_failed = on_item_failed
+        self.on_item_submitted = on_item_submitted
+        self.stopped_early = False
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.completed: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.discovered: Counter = Counter()
+
+    def run(self, seeds: Iterable[WorkItem]) -> Dict[str, int]:
+        """
+        Process seeds and everything reachable from them.
+
+        Args:
+            seeds: Initial (kind, item) pairs, queued with the default priority
+                of the frontier
+
+        Returns:
+            Mapping of kind to number of completed items
+        """
+        self.discovered.update(self.frontier.push_many(seeds))
+
+        total_done = 0
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                while len(in_flight) < self.max_in_flight:
+                    if self.budget_exhausted and self.budget_exhausted():
+                        if not self.stopped_early:
+                            self.stopped_early = True
+                            self.logger.info("Crawl budget exhausted, finishing the items in flight")
+                        break
+                    work = self.frontier.pop()
+                    if work is None:
+                        break
+                    kind, item, _ = work
+                    if self.on_item_submitted:
+                        self.on_item_submitted(kind, item)
+                    in_flight[executor.submit(self.handlers[kind], item)] = work
+
+                IN_FLIGHT.set(len(in_flight))
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, item, priority = in_flight.pop(future)
+                    total_done += 1
+                    try:
+                        discovered = future.result()
+                        if discovered is None:
+                            self.failed[kind] += 1
+                            ITEMS.inc(kind=kind, outcome="failed")
+                            if self.on_item_failed:
+                                self.on_item_failed(kind, item)
+                        else:
+                            self.discovered.update(self.frontier.push_many(discovered, priority))
+                            self.completed[kind] += 1
+                            ITEMS.inc(kind=kind, outcome="done")
+                            if self.on_item_done:
+                                self.on_item_done(kind, item)
+                    except Exception as e:
+                        self.failed[kind] += 1
+                        ITEMS.inc(kind=kind, outcome="failed")
+                        ERRORS.inc(type=type(e).__name__)
+                        self.logger.error(f"Error processing {kind} {item}: {e}")
+                        if self.on_item_failed:
+                            self.on_item_failed(kind, item)
+
+                    if self.progress_interval and total_done % self.progress_interval == 0:
+                        self.log_progress()
+                    if self.checkpoint_interval and total_done % self.checkpoint_interval == 0 and self.on_checkpoint:
+                        self.on_checkpoint()
+
+        self.log_progress()
+        return dict(self.completed)
+
+    def log_progress(self):
+        """Log completed, failed and queued counts per entity type."""
+        pending = self.frontier.pending_by_kind()
+        for kind in set(self.discovered) | set(pending):
+            QUEUE_DEPTH.set(pending.get(kind, 0), kind=kind)
+        spilled = pending.pop("spilled", 0)
+        kinds = sorted(set(self.discovered) | set(self.completed) | set(pending))
+        parts = [
+            f"{kind}: {self.completed[kind]} done, {self.failed[kind]} failed, "
+            f"{pending.get(kind, 0)} queued, {self.discovered[kind]} discovered"
+            for kind in kinds
+        ]
+        if spilled:
+            parts.append(f"{spilled} queued on disk")
+        self.logger.info("Progress - " + "; ".join(parts))
@@ -2,9 +2,8 @@
 HTML Saver module for HCMUT LMS Crawler.
 Handles file system operations.
 """
-import os
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 
 class HtmlSaver:
@@ -22,7 +21,7 @@ class HtmlSaver:
     
     def _ensure_directories(self):
         """Create necessary output directories if they don't exist."""
-        directories = ["semesters", "courses", "users"]
+        directories = ["semesters", "courses", "users", "participants"]
         for dir_name in directories:
             dir_path = self.output_dir / dir_name
             dir_path.mkdir(parents=True, exist_ok=True)
@@ -74,3 +73,56 @@ class HtmlSaver:
         file_path = self.output_dir / category / f"{file_id}.html"
         return str(file_path)
 
+    
+    def read_html(self, category: str, file_id: str) -> Optional[str]:
+        """
+        Read saved HTML content.
+        
+        Args:
+            category: Category of the file (semesters, courses, or users)
+            file_id: ID of the file
+            
+        Returns:
+            HTML content, or None if the file does not exist
+        """
+        file_path = self.output_dir / category / f"{file_id}.html"
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def list_ids(self, category: str) -> Iterator[str]:
+        """
+        List the IDs of all saved files in a category.
+        
+        Args:
+            category: Category of the files (semesters, courses, or users)
+            
+        Yields:
+            File IDs
+        """
+        category_dir = self.output_dir / category
+        if not category_dir.exists():
+            return
+        for entry in category_dir.iterdir():
+            if entry.suffix == ".html":
+                yield entry.stem
+
+
+def create_html_store(backend: str, output_dir: str = "./", compression_level: int = 3) -> HtmlSaver:
+    """
+    Create the HTML store selected by STORAGE_BACKEND.
+    
+    Args:
+        backend: "files" for one HTML file per page, "archive" for compressed pack files
+        output_dir: Base directory for output files
+        compression_level: Compression level of the archive backend
+        
+    Returns:
+        HtmlSaver or ArchiveStore instance
+    """
+    if backend == "archive":
+        from utils.archive_store import ArchiveStore
+        return ArchiveStore(output_dir, compression_level)
+    return HtmlSaver(output_dir)
@@ -0,0 +1,261 @@
+"""
+ID sweep module for HCMUT LMS Crawler.
+Generates the user IDs of a brute-force crawl lazily, either as one sorted,
+deduplicated sweep or adaptively, probing sparse ID ranges by sampling and
+spending the request budget on ranges dense in valid profiles first.
+"""
+import heapq
+import logging
+import random
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def merge_unique(*sources: Iterable[int]) -> Iterator[int]:
+    """
+    Merge sorted ID sources lazily, dropping duplicates.
+
+    Args:
+        sources: Iterables of IDs, each sorted in ascending order
+
+    Yields:
+        IDs in ascending order, each once
+    """
+    previous = None
+    for user_id in heapq.merge(*sources):
+        if user_id != previous:
+            yield user_id
+            previous = user_id
+
+
+def read_id_file(path: str) -> List[int]:
+    """
+    Read a file of known user IDs (one per line).
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Sorted list of IDs (empty if the file does not exist)
+    """
+    id_file = Path(path)
+    if not id_file.exists():
+        logging.getLogger("IdSweep").warning(f"{path} not found, using the configured ID range only")
+        return []
+    with open(id_file, "r", encoding="utf-8") as f:
+        return sorted(int(line) for line in f if line.strip())
+
+
+def iter_user_ids(min_user_id: int, max_user_id: int, id_file: str = "userId.txt") -> Iterator[int]:
+    """
+    Stream the known IDs and the ID range as one sorted, deduplicated sweep.
+
+    Args:
+        min_user_id: First ID of the range
+        max_user_id: Last ID of the range (inclusive)
+        id_file: File of known user IDs
+
+    Yields:
+        User IDs in ascending order
+    """
+    return merge_unique(read_id_file(id_file), range(min_user_id, max_user_id + 1))
+
+
+class _Block:
+    """Sampling state of one ID block."""
+
+    __slots__ = ("start", "end", "cursor", "valid", "invalid", "issued")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.cursor = start
+        self.valid = 0
+        self.invalid = 0
+        self.issued = set()
+
+    @property
+    def density(self) -> float:
+        """Estimated share of valid profiles (Laplace-smoothed)."""
+        return (self.valid + 1) / (self.valid + self.invalid + 2)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.cursor > self.end
+
+
+class AdaptiveIdProber:
+    """
+    Adaptive ID order for brute-force crawls over sparse ID spaces.
+
+    The ID range is split into blocks. Known IDs are crawled first, then a
+    few random IDs of every block are sampled. The remaining IDs are handed
+    out chunk by chunk from the block with the highest estimated density of
+    valid profiles, re-ranking as results come in via record(), so ranges
+    full of error pages are crawled last (or never, with a budget or a
+    minimum density).
+    """
+
+    def __init__(
+        self,
+        min_user_id: int,
+        max_user_id: int,
+        known_ids: Iterable[int] = (),
+        block_size: int = 1000,
+        samples_per_block: int = 20,
+        min_density: float = 0.0,
+        budget: int = 0,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize prober.
+
+        Args:
+            min_user_id: First ID of the range
+            max_user_id: Last ID of the range (inclusive)
+            known_ids: Sorted IDs known to exist (e.g. from userId.txt), crawled first
+            block_size: Number of IDs per block
+            samples_per_block: Number of random IDs probed in every block
+            min_density: Blocks estimated below this share of valid profiles are skipped
+            budget: Maximum number of IDs handed out (0 = unlimited)
+            seed: Random seed for the samples
+        """
+        self.min_user_id = min_user_id
+        self.max_user_id = max_user_id
+        self.known_ids = known_ids
+        self.block_size = block_size
+        self.samples_per_block = samples_per_block
+        self.min_density = min_density
+        self.budget = budget
+        self.chunk_size = max(samples_per_block, block_size // 10)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._blocks: Dict[int, _Block] = {}
+        self.issued = 0
+
+        for start in range(min_user_id, max_user_id + 1, block_size):
+            self._blocks[self._block_index(start)] = _Block(start, min(start + block_size - 1, max_user_id))
+
+    def _block_index(self, user_id: int) -> int:
+        return (user_id - self.min_user_id) // self.block_size
+
+    def record(self, user_id: int, valid: bool):
+        """
+        Record the outcome of crawling an ID. Safe to call from worker threads.
+
+        Args:
+            user_id: Crawled ID
+            valid: True if it was a profile, False if it was an error page
+        """
+        block = self._blocks.get(self._block_index(user_id))
+        if block is None or not block.start <= user_id <= block.end:
+            return
+        with self._lock:
+            if valid:
+                block.valid += 1
+            else:
+                block.invalid += 1
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Hand out IDs in adaptive order until the range or the budget is exhausted.
+
+        Yields:
+            User IDs
+        """
+        for user_id in self._known():
+            if not self._take():
+                return
+            yield user_id
+
+        for user_id in self._samples():
+            if not self._take():
+                return
+            yield user_id
+
+        for user_id in self._dense_first():
+            if not self._take():
+                return
+            yield user_id
+
+    def _take(self) -> bool:
+        """Count one handed-out ID against the budget."""
+        if self.budget and self.issued >= self.budget:
+            self.logger.info(f"Probe budget of {self.budget} IDs exhausted")
+            return False
+        self.issued += 1
+        return True
+
+    def _known(self) -> Iterator[int]:
+        """Phase 1: known IDs, marked as issued so they are not crawled twice."""
+        for user_id in merge_unique(self.known_ids):
+            block = self._blocks.get(self._block_index(user_id))
+            if block is not None and block.start <= user_id <= block.end:
+                block.issued.add(user_id)
+            yield user_id
+
+    def _samples(self) -> Iterator[int]:
+        """Phase 2: a few random IDs of every block."""
+        for block in self._blocks.values():
+            ids = range(block.start, block.end + 1)
+            for user_id in sorted(self._random.sample(ids, min(self.samples_per_block, len(ids)))):
+                if user_id not in block.issued:
+                    block.issued.add(user_id)
+                    yield user_id
+
+    def _dense_first(self) -> Iterator[int]:
+        """
+        Phase 3: remaining IDs, one chunk at a time from the densest block.
+
+        Densities only change through results of the block's own IDs, so a
+        heap with lazily refreshed keys keeps each pick cheap.
+        """
+        heap: List[Tuple[float, int]] = [(-block.density, index) for index, block in self._blocks.items()]
+        heapq.heapify(heap)
+
+        while heap:
+            key, index = heapq.heappop(heap)
+            block = self._blocks[index]
+            with self._lock:
+                density = block.density
+            if -key != density:
+                heapq.heappush(heap, (-density, index))
+                continue
+            if density < self.min_density:
+                self.logger.info(f"Remaining blocks are below the minimum density of {self.min_density:.1%}, stopping")
+                return
+
+            chunk_end = min(block.cursor + self.chunk_size - 1, block.end)
+            for user_id in range(block.cursor, chunk_end + 1):
+                if user_id not in block.issued:
+                    yield user_id
+            block.cursor = chunk_end + 1
+
+            if block.exhausted:
+                block.issued.clear()
+            else:
+                heapq.heappush(heap, (-density, index))
+
+    def stats(self, top: int = 5) -> dict:
+        """
+        Summarize what the prober learned.
+
+        Args:
+            top: Number of densest ranges to report
+
+        Returns:
+            Dictionary with issued, valid and invalid counts and the densest (start, end, density) ranges
+        """
+        with self._lock:
+            blocks = list(self._blocks.values())
+            valid = sum(block.valid for block in blocks)
+            invalid = sum(block.invalid for block in blocks)
+            densest = sorted(blocks, key=lambda block: block.density, reverse=True)[:top]
+            return {
+                "issued": self.issued,
+                "valid": valid,
+                "invalid": invalid,
+                "densest": [(block.start, block.end, round(block.density, 3)) for block in densest],
+            }
@@ -0,0 +1,392 @@
+"""
+Metrics module for HCMUT LMS Crawler.
+Thread-safe counters, gauges and histograms for the hot paths, exported as
+Prometheus text over HTTP or as periodic JSON snapshots, plus a logging
+filter that samples verbose per-page log lines.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    """Base class of a metric with optional labels."""
+
+    type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def items(self) -> list:
+        """Get a consistent copy of (label values, value) pairs."""
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def render(self) -> Iterable[str]:
+        for key, value in self.items():
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. a queue depth)."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+    def render(self) -> Iterable[str]:
+        for key, (counts, total, count) in self.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{self._format_labels(key, ('le', str(bound)))} {cumulative}"
+            yield f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{self._format_labels(key)} {total}"
+            yield f"{self.name}_count{self._format_labels(key)} {count}"
+
+
+class MetricsRegistry:
+    """Set of named metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self.started_at = time.time()
+
+    def _get_or_create(self, cls, name: str, help_text: str, labelnames: Iterable[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Text for a /metrics endpoint
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Get the current value of every metric.
+
+        Returns:
+            Dictionary of metric name to {"type", "values": [{"labels", ...}]}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result = {}
+        for metric in metrics:
+            values = []
+            for key, value in metric.items():
+                entry = {"labels": dict(zip(metric.labelnames, key))}
+                if isinstance(metric, Histogram):
+                    counts, total, count = value
+                    entry.update(count=count, sum=total, buckets=dict(zip(map(str, metric.buckets), counts)))
+                else:
+                    entry["value"] = value
+                values.append(entry)
+            result[metric.name] = {"type": metric.type, "values": values}
+        return result
+
+    def counter_totals(self) -> Dict[str, float]:
+        """Get the sum over all labels of every counter."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.total() for metric in metrics if isinstance(metric, Counter)}
+
+
+# Registry shared by all modules
+METRICS = MetricsRegistry()
+
+ERRORS = METRICS.counter("lms_errors_total", "Errors by type", ("type",))
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json from a background thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = METRICS):
+        """
+        Initialize metrics server.
+
+        Args:
+            port: Port to listen on
+            host: Interface to bind (local only by default)
+            registry: Registry to export
+        """
+        self.registry = registry
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        registry_ref = registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry_ref.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(registry_ref.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+
+    def start(self):
+        """Start serving."""
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        self.logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsSnapshotWriter:
+    """Writes a JSON snapshot of the registry to a file at a fixed interval."""
+
+    def __init__(self, path: str, interval: float = 30, registry: MetricsRegistry = METRICS):
+        """
+        Initialize snapshot writer.
+
+        Args:
+            path: File to (over)write
+            interval: Seconds between snapshots
+            registry: Registry to export
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="MetricsSnapshotWriter", daemon=True)
+        self._last = (time.time(), registry.counter_totals())
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        """
+        Write one snapshot, including the per-second rate of every counter
+        since the previous snapshot (e.g. requests per second).
+        """
+        now = time.time()
+        totals = self.registry.counter_totals()
+        last_time, last_totals = self._last
+        elapsed = max(now - last_time, 1e-9)
+        self._last = (now, totals)
+
+        data = {
+            "timestamp": now,
+            "uptime_seconds": now - self.registry.started_at,
+            "rates_per_second": {
+                name: (total - last_totals.get(name, 0)) / elapsed for name, total in totals.items()
+            },
+            "metrics": self.registry.snapshot(),
+        }
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        tmp_path.replace(self.path)
+
+    def start(self):
+        """Start writing snapshots."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop and write a final snapshot."""
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.write()
+
+
+# Loggers writing one or more lines per page, registered by per_page_logger()
+PER_PAGE_LOGGERS: Set[str] = set()
+
+
+def per_page_logger(name: str) -> logging.Logger:
+    """
+    Get a logger that writes one or more lines per page, registering it for sampling.
+
+    Args:
+        name: Logger name (the class name of the fetcher or crawler)
+
+    Returns:
+        The logger
+    """
+    PER_PAGE_LOGGERS.add(name)
+    return logging.getLogger(name)
+
+
+class SampledLogFilter(logging.Filter):
+    """
+    Let through every WARNING and above, but only one in `rate` lower-level
+    records of the sampled loggers, so per-page INFO lines stop dominating
+    the run time while progress and summary lines are kept.
+    """
+
+    def __init__(self, rate: int = 100, loggers: Optional[Iterable[str]] = None):
+        """
+        Initialize filter.
+
+        Args:
+            rate: Keep one in this many records below WARNING per logger
+            loggers: Names of the loggers to sample (default: every logger
+                registered by per_page_logger(), including later ones)
+        """
+        super().__init__()
+        self.rate = rate
+        self.loggers = PER_PAGE_LOGGERS if loggers is None else set(loggers)
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._dropped = METRICS.counter("lms_log_records_dropped_total", "Log records dropped by sampling")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or record.name not in self.loggers:
+            return True
+        with self._lock:
+            count = self._counts[record.name]
+            self._counts[record.name] = count + 1
+        if count % self.rate == 0:
+            return True
+        self._dropped.inc()
+        return False
+
+
+def enable_sampled_logging(rate: int):
+    """
+    Install a SampledLogFilter for the per-page loggers on every handler of the root logger.
+
+    Args:
+        rate: Keep one in this many records below WARNING per logger
+    """
+    log_filter = SampledLogFilter(rate)
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(log_filter)
@@ -0,0 +1,132 @@
+"""
+Negative cache module for HCMUT LMS Crawler.
+Remembers entity IDs that turned out not to exist or not to be visible
+(e.g. user profiles showing an error alert), so later crawls skip them
+without sending a request.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from utils.sqlite_store import SqliteStore
+
+
+# Reason codes
+REASON_ALERT = "alert"
+REASON_NOT_FOUND = "not_found"
+
+
+class NegativeCache(SqliteStore):
+    """
+    Persistent set of dead entity IDs with a reason code and timestamp.
+
+    Entries expire after a TTL, so IDs that become valid later (e.g. newly
+    created accounts) are eventually retried.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 0):
+        """
+        Open the negative cache database.
+
+        Args:
+            db_path: Path to the SQLite file
+            ttl: Seconds after which an entry expires (0 = never)
+        """
+        self.ttl = ttl
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._hits_lock = threading.Lock()
+        self.hits = 0
+        super().__init__(db_path)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead (
+                category TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (category, entity_id)
+            ) WITHOUT ROWID
+        """)
+
+    def _cutoff(self) -> float:
+        """Get the timestamp before which entries are expired."""
+        return time.time() - self.ttl if self.ttl > 0 else 0
+
+    def is_dead(self, category: str, entity_id: str, count_hit: bool = True) -> bool:
+        """
+        Check whether an entity is known to be dead (and not expired).
+
+        Args:
+            category: Category of the entity (e.g. "users")
+            entity_id: Entity ID
+            count_hit: Count a dead entity in hits (False for lookups that
+                do not skip a crawl, e.g. before prefetching its page)
+
+        Returns:
+            True if the entity should be skipped
+        """
+        rows = self.query(
+            "SELECT 1 FROM dead WHERE category = ? AND entity_id = ? AND recorded_at >= ?",
+            (category, entity_id, self._cutoff())
+        )
+        if rows and count_hit:
+            with self._hits_lock:
+                self.hits += 1
+        return bool(rows)
+
+    def record(self, category: str, entity_id: str, reason: str):
+        """
+        Record a dead entity, refreshing its timestamp if already known.
+
+        Args:
+            category: Category of the entity
+            entity_id: Entity ID
+            reason: Reason code (e.g. REASON_ALERT)
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO dead (category, entity_id, reason, recorded_at) VALUES (?, ?, ?, ?)",
+                (category, entity_id, reason, time.time())
+            )
+
+    def count(self, category: str) -> int:
+        """Count unexpired dead entities of a category."""
+        return self.query(
+            "SELECT COUNT(*) FROM dead WHERE category = ? AND recorded_at >= ?",
+            (category, self._cutoff())
+        )[0][0]
+
+    def density_by_range(
+        self,
+        category: str,
+        block_size: int = 10000,
+        reason: Optional[str] = None
+    ) -> List[Tuple[int, int, int, float]]:
+        """
+        Report how many IDs of each numeric range are dead.
+
+        Args:
+            category: Category of the entities (IDs must be numeric)
+            block_size: Number of IDs per range
+            reason: Only count entries with this reason code
+
+        Returns:
+            (range start, range end, dead count, dead share of the range) tuples, by range
+        """
+        sql = """
+            SELECT CAST(entity_id AS INTEGER) / ? AS block, COUNT(*)
+            FROM dead WHERE category = ? AND recorded_at >= ?
+        """
+        params = [block_size, category, self._cutoff()]
+        if reason:
+            sql += " AND reason = ?"
+            params.append(reason)
+        sql += " GROUP BY block ORDER BY block"
+
+        return [
+            (block * block_size, (block + 1) * block_size - 1, dead, dead / block_size)
+            for block, dead in self.query(sql, tuple(params))
+        ]
@@ -0,0 +1,110 @@
+"""
+Normalization module for HCMUT LMS Crawler.
+Derives the analysis fields that eda.ipynb used to compute on every run
+(course code, semester, program from course names; flat profile columns
+of users) once, at extraction and export time.
+"""
+import re
+from typing import Dict, Optional
+
+
+# Patterns over course names such as "Compilers (CO3005) (CQ_HK252) [L01]"
+COURSE_CODE_PATTERN = re.compile(r"\(([A-Z]{2}\d{4,6})\)")
+SEMESTER_PATTERN = re.compile(r"(HK\d{3,4})")
+PROGRAM_CODE_PATTERN = re.compile(r"\(([A-Z]{2,4})_HK")
+PROGRAM_PATTERN = re.compile(r"\[([^\]]+)\]")
+
+# Semester category names such as "Học kỳ (Semester) 2/2025-2026"
+SEMESTER_TERM_PATTERN = re.compile(r"(\d)\s*/\s*(\d{4})\s*-\s*\d{4}")
+
+# Profile fields kept as columns (see UserCrawler.normalize_description_title)
+PROFILE_FIELDS = ("email", "country", "city", "timezone")
+
+# Role shown on the profiles of teaching staff
+TEACHER_ROLE = "Cán bộ"
+
+
+def _first_group(pattern: re.Pattern, text: str) -> str:
+    match = pattern.search(text)
+    return match.group(1) if match else ""
+
+
+def parse_course_name(course_name: str) -> Dict[str, str]:
+    """
+    Extract the code, semester and program of a course from its name.
+
+    Args:
+        course_name: Course name as shown on the LMS
+
+    Returns:
+        Dictionary with course_code, semester, program_code and program ("" when absent)
+    """
+    course_name = course_name or ""
+    return {
+        "course_code": _first_group(COURSE_CODE_PATTERN, course_name),
+        "semester": _first_group(SEMESTER_PATTERN, course_name),
+        "program_code": _first_group(PROGRAM_CODE_PATTERN, course_name),
+        "program": _first_group(PROGRAM_PATTERN, course_name),
+    }
+
+
+def semester_priority(semester: str) -> int:
+    """
+    Rank a semester by recency.
+
+    Args:
+        semester: Semester category name (e.g. "Học kỳ (Semester) 2/2025-2026")
+            or semester code (e.g. "HK252")
+
+    Returns:
+        Academic year * 10 + term (e.g. 20252), higher for more recent
+        semesters, or 0 if the name has neither form
+    """
+    semester = semester or ""
+    match = SEMESTER_TERM_PATTERN.search(semester)
+    if match:
+        return int(match.group(2)) * 10 + int(match.group(1))
+    code = _first_group(SEMESTER_PATTERN, semester.upper())
+    if len(code) == 5:
+        # HK<yy><term>
+        return 20000 + int(code[2:])
+    return 0
+
+
+def course_name_fields(course: dict) -> Dict[str, str]:
+    """
+    Get the parsed name fields of a course record.
+
+    Records extracted before these fields existed are parsed on the fly.
+
+    Args:
+        course: Course record
+
+    Returns:
+        Dictionary with course_code, semester, program_code and program
+    """
+    if "semester" not in course:
+        return parse_course_name(course.get("course_name"))
+    return {field: course.get(field) or "" for field in ("course_code", "semester", "program_code", "program")}
+
+
+def flatten_profile(user: dict) -> Dict[str, str]:
+    """
+    Flatten the profile details of a user record into columns.
+
+    Args:
+        user: User record with a profile_details dictionary
+
+    Returns:
+        Dictionary with one entry per PROFILE_FIELDS ("" when absent)
+    """
+    details = user.get("profile_details") or {}
+    return {field: details.get(field) or "" for field in PROFILE_FIELDS}
+
+
+def to_int(value) -> Optional[int]:
+    """Convert an entity ID to int, or None if it is missing or not numeric (e.g. "None")."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,336 @@
+"""
+Page metadata module for HCMUT LMS Crawler.
+Keeps response validators, content fingerprints and fetch times of saved
+pages in SQLite, so re-crawls only revalidate pages older than a TTL and
+record which entities actually changed. The course IDs of each semester
+listing are kept too, so a re-crawl knows which semesters gained or lost
+courses.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.sqlite_store import SqliteStore
+
+
+def fingerprint(data: Any) -> str:
+    """
+    Hash extracted page data.
+
+    Moodle pages embed session keys and timestamps, so two fetches of an
+    unchanged page rarely have the same bytes. The fingerprint is computed
+    over the extracted fields instead.
+
+    Args:
+        data: JSON-serializable extracted data
+
+    Returns:
+        SHA-256 hex digest
+    """
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class PageMetadataStore(SqliteStore):
+    """
+    Validators and change log of saved pages.
+
+    A saved page is "stale" once it was last checked more than the TTL of
+    its category ago. Stale pages are revalidated with a conditional request
+    (If-None-Match / If-Modified-Since); a 304 or an identical fingerprint
+    only bumps the check time, anything else is logged as a change.
+
+    The last course IDs seen in each semester listing are diffed against
+    every new listing, and added or removed courses are logged separately.
+    """
+
+    def __init__(self, db_path: str, ttls: Optional[Dict[str, float]] = None):
+        """
+        Open the page metadata database.
+
+        Args:
+            db_path: Path to the SQLite file
+            ttls: Seconds after which saved pages of a category are revalidated
+                (missing or 0 = never, the page is reused forever)
+        """
+        self.ttls = ttls or {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+        super().__init__(db_path)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                category TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fingerprint TEXT,
+                checked_at REAL NOT NULL,
+                changed_at REAL NOT NULL,
+                PRIMARY KEY (category, file_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                category TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                change TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS changes_time ON changes (changed_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                category_id TEXT PRIMARY KEY,
+                listed_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_courses (
+                category_id TEXT NOT NULL,
+                course_id TEXT NOT NULL,
+                PRIMARY KEY (category_id, course_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                category_id TEXT NOT NULL,
+                course_id TEXT NOT NULL,
+                change TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS listing_changes_time ON listing_changes (changed_at)")
+
+    def ttl(self, category: str) -> float:
+        """Get the revalidation TTL of a category in seconds (0 = never)."""
+        return self.ttls.get(category, 0)
+
+    def is_stale(self, category: str, file_id: str) -> bool:
+        """
+        Check whether a saved page should be revalidated.
+
+        Pages saved before metadata was kept count as stale once a TTL is set.
+
+        Args:
+            category: Category of the page (semesters, courses, or users)
+            file_id: ID of the page
+
+        Returns:
+            True if the page is older than the TTL of its category
+        """
+        ttl = self.ttl(category)
+        if ttl <= 0:
+            return False
+        rows = self.query("SELECT checked_at FROM pages WHERE category = ? AND file_id = ?", (category, file_id))
+        return not rows or rows[0][0] < time.time() - ttl
+
+    def conditional_headers(self, category: str, file_id: str) -> Dict[str, str]:
+        """
+        Build the conditional request headers for a saved page.
+
+        Args:
+            category: Category of the page
+            file_id: ID of the page
+
+        Returns:
+            If-None-Match / If-Modified-Since headers (empty if no validators are known)
+        """
+        rows = self.query("SELECT etag, last_modified FROM pages WHERE category = ? AND file_id = ?", (category, file_id))
+        headers = {}
+        if rows:
+            etag, last_modified = rows[0]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def mark_checked(self, category: str, file_id: str):
+        """
+        Record that a saved page was revalidated and found unchanged.
+
+        Args:
+            category: Category of the page
+            file_id: ID of the page
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE pages SET checked_at = ? WHERE category = ? AND file_id = ?",
+                (now, category, file_id)
+            )
+            if cursor.rowcount == 0:
+                conn.execute(
+                    "INSERT INTO pages (category, file_id, checked_at, changed_at) VALUES (?, ?, ?, ?)",
+                    (category, file_id, now, now)
+                )
+
+    def record(
+        self,
+        category: str,
+        file_id: str,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        page_fingerprint: str
+    ) -> Optional[str]:
+        """
+        Store the validators of a freshly fetched page and log it if it changed.
+
+        Args:
+            category: Category of the page
+            file_id: ID of the page
+            url: Fetched URL
+            etag: ETag response header
+            last_modified: Last-Modified response header
+            page_fingerprint: fingerprint() of the extracted data
+
+        Returns:
+            "new", "modified", or None if the extracted data did not change
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT fingerprint FROM pages WHERE category = ? AND file_id = ?",
+                (category, file_id)
+            ).fetchone()
+
+            if row is None or row[0] is None:
+                change = "new"
+            elif row[0] != page_fingerprint:
+                change = "modified"
+            else:
+                change = None
+
+            conn.execute("""
+                INSERT INTO pages (category, file_id, url, etag, last_modified, fingerprint, checked_at, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (category, file_id) DO UPDATE SET
+                    url = excluded.url,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fingerprint = excluded.fingerprint,
+                    checked_at = excluded.checked_at,
+                    changed_at = CASE WHEN ? IS NULL THEN pages.changed_at ELSE excluded.changed_at END
+            """, (category, file_id, url, etag, last_modified, page_fingerprint, now, now, change))
+
+            if change:
+                conn.execute(
+                    "INSERT INTO changes (category, file_id, change, changed_at) VALUES (?, ?, ?, ?)",
+                    (category, file_id, change, now)
+                )
+        return change
+
+    def changes_since(self, since: float) -> List[Tuple[str, str, str, float]]:
+        """
+        List the pages that changed after a point in time.
+
+        Args:
+            since: Unix timestamp
+
+        Returns:
+            (category, file_id, change, changed_at) tuples in order of change
+        """
+        return self.query(
+            "SELECT category, file_id, change, changed_at FROM changes WHERE changed_at >= ? ORDER BY seq",
+            (since,)
+        )
+
+    def count_changes(self, since: float) -> Counter:
+        """
+        Count changed pages per category and change type.
+
+        Args:
+            since: Unix timestamp
+
+        Returns:
+            Counter keyed by (category, change)
+        """
+        rows = self.query(
+            "SELECT category, change, COUNT(*) FROM changes WHERE changed_at >= ? GROUP BY category, change",
+            (since,)
+        )
+        return Counter({(category, change): count for category, change, count in rows})
+
+    def diff_listing(self, category_id: str, course_ids: List[str]) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Store the courses of a semester listing and log how they changed.
+
+        Args:
+            category_id: Category ID of the semester
+            course_ids: IDs of the courses in the listing
+
+        Returns:
+            (added, removed) course IDs since the last listing, or None if
+            the semester was not listed before
+        """
+        course_ids = list(dict.fromkeys(course_ids))
+        now = time.time()
+        with self.transaction() as conn:
+            known = conn.execute("SELECT 1 FROM listings WHERE category_id = ?", (category_id,)).fetchone()
+            previous = {
+                row[0] for row in
+                conn.execute("SELECT course_id FROM listing_courses WHERE category_id = ?", (category_id,))
+            }
+            current = set(course_ids)
+            added = [course_id for course_id in course_ids if course_id not in previous]
+            removed = sorted(previous - current)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO listings (category_id, listed_at) VALUES (?, ?)",
+                (category_id, now)
+            )
+            conn.executemany(
+                "INSERT INTO listing_courses (category_id, course_id) VALUES (?, ?)",
+                [(category_id, course_id) for course_id in added]
+            )
+            conn.executemany(
+                "DELETE FROM listing_courses WHERE category_id = ? AND course_id = ?",
+                [(category_id, course_id) for course_id in removed]
+            )
+            if known:
+                conn.executemany(
+                    "INSERT INTO listing_changes (category_id, course_id, change, changed_at) VALUES (?, ?, ?, ?)",
+                    [(category_id, course_id, "added", now) for course_id in added]
+                    + [(category_id, course_id, "removed", now) for course_id in removed]
+                )
+        return (added, removed) if known else None
+
+    def listing_changes_since(self, since: float) -> List[Tuple[str, str, str, float]]:
+        """
+        List the courses added to or removed from semester listings after a point in time.
+
+        Args:
+            since: Unix timestamp
+
+        Returns:
+            (category_id, course_id, change, changed_at) tuples in order of change
+        """
+        return self.query(
+            "SELECT category_id, course_id, change, changed_at FROM listing_changes WHERE changed_at >= ? ORDER BY seq",
+            (since,)
+        )
+
+    def count_listing_changes(self, since: float) -> Counter:
+        """
+        Count added and removed courses per semester.
+
+        Args:
+            since: Unix timestamp
+
+        Returns:
+            Counter keyed by (category_id, change)
+        """
+        rows = self.query(
+            "SELECT category_id, change, COUNT(*) FROM listing_changes WHERE changed_at >= ? GROUP BY category_id, change",
+            (since,)
+        )
+        return Counter({(category_id, change): count for category_id, change, count in rows})
@@ -0,0 +1,236 @@
+"""
+Rate limiter module for HCMUT LMS Crawler.
+Shares a per-host request budget between all crawlers: a token bucket for
+the request rate, exponential backoff with jitter, Retry-After support and
+AIMD adjustment of the number of concurrent requests.
+"""
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base: Delay of the first retry in seconds
+        maximum: Upper bound of the delay in seconds
+
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value: Header value, either delta-seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if absent or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    """Token bucket, backoff window and AIMD concurrency limit of one host."""
+
+    def __init__(self, rate: float, burst: float, concurrency: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.concurrency = concurrency
+        self.in_flight = 0
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-host rate limiter shared by all fetchers.
+
+    Callers reserve a request with acquire(), which returns how long to wait
+    before sending it (so blocking and asyncio fetchers can both sleep their
+    own way), and report the outcome with release(). Successful fast
+    responses grow the concurrency limit additively; throttling and errors
+    shrink it and the request rate multiplicatively.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0,
+        burst: float = 1,
+        max_concurrency: int = 10,
+        min_concurrency: int = 1,
+        target_latency: float = 2.0,
+        max_backoff: float = 60.0
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rate: Requests per second per host (0 disables the token bucket)
+            burst: Token bucket capacity
+            max_concurrency: Upper bound of concurrent requests per host
+            min_concurrency: Lower bound of concurrent requests per host
+            target_latency: Responses slower than this (seconds) count as congestion
+            max_backoff: Upper bound of any backoff window in seconds
+        """
+        self.max_rate = rate
+        self.burst = max(1.0, burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.max_backoff = max_backoff
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Condition()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Get the host key of a URL."""
+        return urlparse(url).netloc
+
+    def limit_key(self, url: str, key: Optional[str] = None) -> str:
+        """Get the key the limits of a request are tracked under: its host, or its host and session."""
+        host = self.host_of(url)
+        return f"{host}/{key}" if key else host
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(self.max_rate, self.burst, self.max_concurrency)
+            self._hosts[host] = state
+        return state
+
+    def try_acquire(self, url: str, key: Optional[str] = None) -> Optional[float]:
+        """
+        Try to reserve a concurrency slot and a token without blocking.
+
+        Args:
+            url: URL about to be requested
+            key: Session the request is sent with; each session gets its own limits
+
+        Returns:
+            Seconds to wait before sending the request, or None if no
+            concurrency slot is free yet (call again later)
+        """
+        with self._lock:
+            state = self._state(self.limit_key(url, key))
+            if state.in_flight >= int(state.concurrency):
+                return None
+            state.in_flight += 1
+
+            now = time.monotonic()
+            delay = max(0.0, state.blocked_until - now)
+            if state.rate > 0:
+                state.tokens = min(state.burst, state.tokens + (now - state.updated_at) * state.rate)
+                state.updated_at = now
+                state.tokens -= 1
+                if state.tokens < 0:
+                    delay = max(delay, -state.tokens / state.rate)
+            return delay
+
+    def acquire(self, url: str, key: Optional[str] = None) -> float:
+        """
+        Reserve a request slot, blocking while the host is at its concurrency limit.
+
+        Args:
+            url: URL about to be requested
+            key: Session the request is sent with; each session gets its own limits
+
+        Returns:
+            Seconds the caller must still sleep before sending the request
+        """
+        while True:
+            delay = self.try_acquire(url, key)
+            if delay is not None:
+                return delay
+            with self._lock:
+                self._lock.wait(timeout=0.1)
+
+    def release(
+        self,
+        url: str,
+        status: Optional[int],
+        latency: float,
+        retry_after: Optional[str] = None,
+        key: Optional[str] = None
+    ):
+        """
+        Report the outcome of a request and adapt the host's limits.
+
+        Args:
+            url: Requested URL
+            status: HTTP status code, or None for a network error
+            latency: Request duration in seconds
+            retry_after: Retry-After header of the response, if any
+            key: Session the request was sent with
+        """
+        with self._lock:
+            state = self._state(self.limit_key(url, key))
+            state.in_flight = max(0, state.in_flight - 1)
+
+            if status in THROTTLE_STATUS_CODES or status is None or status >= 500:
+                # Multiplicative decrease
+                state.concurrency = max(self.min_concurrency, state.concurrency / 2)
+                if self.max_rate > 0:
+                    state.rate = max(self.max_rate / 16, state.rate / 2)
+
+                wait = parse_retry_after(retry_after)
+                if status in THROTTLE_STATUS_CODES:
+                    wait = max(wait or 0.0, backoff_delay(0, 1.0, self.max_backoff))
+                if wait:
+                    wait = min(wait, self.max_backoff)
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + wait)
+                    self.logger.warning(
+                        f"Throttled by {self.limit_key(url, key)} (status {status}), pausing {wait:.1f}s, "
+                        f"concurrency limit {state.concurrency:.1f}"
+                    )
+            elif latency > self.target_latency:
+                state.concurrency = max(self.min_concurrency, state.concurrency * 0.9)
+            else:
+                # Additive increase: roughly +1 per window of successful requests
+                state.concurrency = min(self.max_concurrency, state.concurrency + 1 / max(1.0, state.concurrency))
+                if self.max_rate > 0:
+                    state.rate = min(self.max_rate, state.rate + self.max_rate / 16)
+
+            self._lock.notify_all()
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Get the current limits of every host.
+
+        Returns:
+            Mapping of host to its rate, concurrency limit and in-flight count
+        """
+        with self._lock:
+            return {
+                host: {
+                    "rate": state.rate,
+                    "concurrency": state.concurrency,
+                    "in_flight": state.in_flight,
+                }
+                for host, state in self._hosts.items()
+            }
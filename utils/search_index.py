@@ -0,0 +1,165 @@
+"""
+Search index module for HCMUT LMS Crawler.
+Prebuilds a sharded inverted index over the per-semester CSV files for the
+static search page (hk252/index.html). The page downloads only the token
+shards of the words in a query and the row chunks of the results it shows,
+instead of every CSV file.
+
+Layout of <semester dir>/index/<dataset>/:
+    meta.json          columns, row count, number of shards and rows per chunk
+    tokens-NNN.json    {token: delta-encoded sorted row ids} for the tokens of one shard
+    rows-NNNN.json     rows [chunk * chunk_rows, (chunk + 1) * chunk_rows) as value lists
+
+Tokens are lowercased and folded (Vietnamese diacritics removed, đ -> d), so
+"nguyen" finds "Nguyễn". A query word of two or more characters matches every
+token it prefixes; all tokens sharing their first two characters are in the
+same shard. The folding, tokenization and shard functions are mirrored in
+index.html and must stay in sync with it.
+"""
+import csv
+import json
+import logging
+import math
+import re
+import shutil
+import unicodedata
+from pathlib import Path
+from typing import Dict, List
+
+
+# Datasets of a semester directory: index name -> CSV file name prefix
+INDEXED_DATASETS = {"courses": "courses", "slot": "slot", "user_course": "user_course"}
+
+# Rows per rows-NNNN.json chunk
+CHUNK_ROWS = 1000
+
+# Postings per token shard (bounds the download for one query word)
+SHARD_POSTINGS = 200_000
+MAX_SHARDS = 256
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+logger = logging.getLogger("SearchIndex")
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase text and strip Vietnamese diacritics.
+
+    Args:
+        text: Text to fold
+
+    Returns:
+        Folded text (e.g. "Nguyễn Đức" -> "nguyen duc")
+    """
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn").replace("đ", "d")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split folded text into its alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+def token_shard(token: str, shards: int) -> int:
+    """
+    Get the shard of a token from its first two characters.
+
+    Args:
+        token: Folded token
+        shards: Number of shards
+
+    Returns:
+        Shard number
+    """
+    h = 0
+    for c in token[:2]:
+        h = h * 31 + ord(c)
+    return h % shards
+
+
+def _write_json(path: Path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_dataset_index(csv_path: Path, index_dir: Path) -> int:
+    """
+    Index one CSV file.
+
+    The index is written next to index_dir and then swapped into place, so
+    the page never reads a half-written index.
+
+    Args:
+        csv_path: CSV file with a header row
+        index_dir: Directory of the index of this dataset
+
+    Returns:
+        Number of rows indexed
+    """
+    postings: Dict[str, List[int]] = {}
+    tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        row_id = -1
+        chunk = []
+        for row_id, row in enumerate(reader):
+            for token in set(tokenize(" ".join(row))):
+                postings.setdefault(token, []).append(row_id)
+            chunk.append(row)
+            if len(chunk) == CHUNK_ROWS:
+                _write_json(tmp_dir / f"rows-{row_id // CHUNK_ROWS:04d}.json", chunk)
+                chunk = []
+        if chunk:
+            _write_json(tmp_dir / f"rows-{row_id // CHUNK_ROWS:04d}.json", chunk)
+    rows = row_id + 1
+
+    total = sum(len(ids) for ids in postings.values())
+    shards = min(MAX_SHARDS, max(1, math.ceil(total / SHARD_POSTINGS)))
+    shard_tokens: List[Dict[str, List[int]]] = [{} for _ in range(shards)]
+    for token, ids in postings.items():
+        # Row ids are ascending; store the gaps
+        shard_tokens[token_shard(token, shards)][token] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+    for shard, tokens in enumerate(shard_tokens):
+        _write_json(tmp_dir / f"tokens-{shard:03d}.json", tokens)
+
+    _write_json(tmp_dir / "meta.json", {
+        "columns": columns,
+        "rows": rows,
+        "shards": shards,
+        "chunk_rows": CHUNK_ROWS,
+    })
+
+    old_dir = index_dir.with_name(index_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if index_dir.exists():
+        index_dir.rename(old_dir)
+    tmp_dir.rename(index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"Indexed {rows} rows of {csv_path} ({len(postings)} tokens in {shards} shards)")
+    return rows
+
+
+def build_search_index(semester_dir: str, semester: str) -> Dict[str, int]:
+    """
+    Index the CSV files of one semester directory.
+
+    Args:
+        semester_dir: Directory holding courses_<semester>.csv, slot_<semester>.csv, ...
+        semester: Semester code (e.g. "hk252")
+
+    Returns:
+        Mapping of index name to number of rows indexed
+    """
+    semester_dir = Path(semester_dir)
+    counts = {}
+    for name, prefix in INDEXED_DATASETS.items():
+        csv_path = semester_dir / f"{prefix}_{semester}.csv"
+        if csv_path.exists():
+            counts[name] = build_dataset_index(csv_path, semester_dir / "index" / name)
+    return counts
@@ -0,0 +1,584 @@
+"""
+Shard coordinator module for HCMUT LMS Crawler.
+Partitions the crawl across worker processes (on one or several machines
+sharing the output directory) by hashing entity IDs into shards. A SQLite
+database hands out shard leases, routes discovered entities to the shard
+that owns them and tracks which shard outputs have been merged.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.crawl_state import MAX_ITEM_ATTEMPTS
+from utils.data_sink import JsonlDataSink
+from utils.sqlite_store import SqliteStore
+
+
+def shard_of(entity_id: str, shards: int) -> int:
+    """
+    Get the shard owning an entity.
+
+    Args:
+        entity_id: Entity ID (course, user or semester category ID)
+        shards: Number of shards
+
+    Returns:
+        Shard number in [0, shards)
+    """
+    return zlib.crc32(str(entity_id).encode("utf-8")) % shards
+
+
+def shard_id_range(min_id: int, max_id: int, shard: int, shards: int) -> Tuple[int, int]:
+    """
+    Get the contiguous part of an ID range swept by a shard.
+
+    The range is split into equal parts (the first ones one ID longer), so
+    every shard sweeps and samples only its own IDs.
+
+    Args:
+        min_id: First ID of the range
+        max_id: Last ID of the range (inclusive)
+        shard: Shard number
+        shards: Number of shards
+
+    Returns:
+        (first, last) IDs of the shard's part; empty (first > last) if the
+        range has fewer IDs than there are shards
+    """
+    size, extra = divmod(max_id - min_id + 1, shards)
+    first = min_id + shard * size + min(shard, extra)
+    return first, first + size + (1 if shard < extra else 0) - 1
+
+
+def shard_dir(output_dir: str, shard: int) -> Path:
+    """Get the output directory of a shard."""
+    return Path(output_dir) / "shards" / f"{shard:03d}"
+
+
+def worker_name(pid: Optional[int] = None) -> str:
+    """Get the lease owner name of a local process (default: this one)."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+class ShardLeaseLost(RuntimeError):
+    """Raised when another worker took over a shard whose lease expired."""
+
+
+class ShardCoordinator(SqliteStore):
+    """
+    Shard leases and cross-shard work queue of a sharded crawl.
+
+    Every shard is owned by at most one worker at a time through a lease
+    that the worker renews with a heartbeat. A worker that dies stops
+    renewing; once its lease expires another worker takes the shard over
+    and the items it had taken are queued again. Items are only marked done
+    after the owning worker saved their records, and the shard's crawl
+    state skips entities that were already saved, so a takeover neither
+    loses nor duplicates work. Items whose handler failed are queued again,
+    up to MAX_ITEM_ATTEMPTS rounds.
+
+    Each shard takes its queued items highest priority first (see
+    CrawlStateStore).
+
+    Each shard starts unseeded: its seed step (discovering semesters, or
+    sweeping the shard's share of the user ID range) must finish before the
+    crawl can be complete.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        key_func: Optional[Callable[[str, Any], Optional[str]]] = None,
+        lease_seconds: float = 120,
+        priority_func: Optional[Callable[[str, Any], Optional[int]]] = None
+    ):
+        """
+        Open the coordinator database.
+
+        Args:
+            db_path: Path to the SQLite file (on storage shared by all workers)
+            key_func: Returns the dedup key of a work item (required to push items)
+            lease_seconds: Seconds a shard lease lasts without a heartbeat
+            priority_func: Returns the priority of a work item, or None to
+                queue it with the priority passed to push_many()
+        """
+        self.key_func = key_func
+        self.priority_func = priority_func
+        self.lease_seconds = lease_seconds
+        self.logger = logging.getLogger(self.__class__.__name__)
+        super().__init__(db_path)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                shard INTEGER PRIMARY KEY,
+                owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0,
+                seeded INTEGER NOT NULL DEFAULT 0,
+                takeovers INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                shard INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                item TEXT NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (kind, entity_id)
+            )
+        """)
+        # Coordinators created before priorities and attempt counts existed
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(items)")]
+        if "priority" not in columns:
+            conn.execute("ALTER TABLE items ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        conn.execute("DROP INDEX IF EXISTS items_shard_state")
+        conn.execute("CREATE INDEX IF NOT EXISTS items_shard_priority ON items (shard, state, priority DESC, seq)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS merged (
+                shard INTEGER NOT NULL,
+                dataset TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                PRIMARY KEY (shard, dataset)
+            ) WITHOUT ROWID
+        """)
+
+    # Shards and leases
+
+    def initialize(self, shards: int, seed_shards: Optional[Iterable[int]] = None):
+        """
+        Create the shards of a new crawl (no-op when resuming one).
+
+        Args:
+            shards: Number of shards
+            seed_shards: Shards that have a seed step (default: all)
+
+        Raises:
+            ValueError: If the database already holds a different number of shards
+        """
+        existing = self.shard_count
+        if existing:
+            if existing != shards:
+                raise ValueError(f"Coordinator {self.db_path} already has {existing} shards, not {shards}")
+            return
+
+        seed_shards = set(range(shards) if seed_shards is None else seed_shards)
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO shards (shard, seeded) VALUES (?, ?)",
+                [(shard, int(shard not in seed_shards)) for shard in range(shards)]
+            )
+        self.logger.info(f"Created {shards} shards")
+
+    @property
+    def shard_count(self) -> int:
+        """Number of shards."""
+        return self.query("SELECT COUNT(*) FROM shards")[0][0]
+
+    def acquire(self, owner: str) -> Optional[int]:
+        """
+        Lease a free shard, preferring shards with pending work.
+
+        A shard is free if nobody owns it or its lease expired. Items the
+        previous owner had taken but not finished are queued again.
+
+        Args:
+            owner: Name of the worker
+
+        Returns:
+            Shard number, or None if every shard is leased
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("""
+                SELECT s.shard, s.owner FROM shards s
+                WHERE s.owner IS NULL OR s.lease_expires < ?
+                ORDER BY (s.seeded = 0 OR EXISTS (
+                    SELECT 1 FROM items i WHERE i.shard = s.shard AND i.state IN ('queued', 'taken')
+                )) DESC, s.shard
+                LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                return None
+
+            shard, previous_owner = row
+            conn.execute(
+                "UPDATE shards SET owner = ?, lease_expires = ?, takeovers = takeovers + ? WHERE shard = ?",
+                (owner, now + self.lease_seconds, int(previous_owner is not None), shard)
+            )
+            requeued = conn.execute(
+                "UPDATE items SET state = 'queued', owner = NULL WHERE shard = ? AND state = 'taken'",
+                (shard,)
+            ).rowcount
+
+        if previous_owner is not None:
+            self.logger.warning(
+                f"Took over shard {shard} from {previous_owner} (lease expired), requeued {requeued} items"
+            )
+        return shard
+
+    def renew(self, shard: int, owner: str):
+        """
+        Extend a shard lease.
+
+        Args:
+            shard: Shard number
+            owner: Name of the worker holding the lease
+
+        Raises:
+            ShardLeaseLost: If the worker no longer owns the shard
+        """
+        with self.transaction() as conn:
+            renewed = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE shard = ? AND owner = ?",
+                (time.time() + self.lease_seconds, shard, owner)
+            ).rowcount
+        if not renewed:
+            raise ShardLeaseLost(f"Shard {shard} is no longer leased to {owner}")
+
+    def release(self, shard: int, owner: str):
+        """Give up a shard lease (e.g. on a clean exit)."""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE shards SET owner = NULL, lease_expires = 0 WHERE shard = ? AND owner = ?",
+                (shard, owner)
+            )
+
+    def expire(self, owner: str) -> int:
+        """
+        Expire the leases of a worker known to be dead, so its shards are taken over right away.
+
+        Args:
+            owner: Name of the dead worker
+
+        Returns:
+            Number of expired leases
+        """
+        with self.transaction() as conn:
+            return conn.execute("UPDATE shards SET lease_expires = 0 WHERE owner = ?", (owner,)).rowcount
+
+    def is_seeded(self, shard: int) -> bool:
+        """Check whether a shard's seed step has finished."""
+        return bool(self.query("SELECT seeded FROM shards WHERE shard = ?", (shard,))[0][0])
+
+    def mark_seeded(self, shard: int):
+        """Record that a shard's seed step has finished."""
+        with self.transaction() as conn:
+            conn.execute("UPDATE shards SET seeded = 1 WHERE shard = ?", (shard,))
+
+    def start_heartbeat(self, shard: int, owner: str) -> threading.Event:
+        """
+        Renew a shard lease from a background thread until the returned event is set.
+
+        The event is also set when the lease is lost.
+
+        Args:
+            shard: Shard number
+            owner: Name of the worker holding the lease
+
+        Returns:
+            Event stopping the heartbeat
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew(shard, owner)
+                except ShardLeaseLost as e:
+                    self.logger.error(str(e))
+                    stop.set()
+
+        threading.Thread(target=beat, name=f"ShardHeartbeat-{shard}", daemon=True).start()
+        return stop
+
+    # Work queue
+
+    def push_many(self, items: Iterable[Tuple[str, Any]], priority: int = 0) -> Dict[str, int]:
+        """
+        Queue items on the shards owning them, skipping items queued before.
+
+        Args:
+            items: (kind, item) pairs
+            priority: Priority of items priority_func does not rank (higher is taken first)
+
+        Returns:
+            Mapping of kind to number of newly queued items
+        """
+        shards = self.shard_count
+        queued = Counter()
+        rows = []
+        for kind, item in items:
+            key = self.key_func(kind, item)
+            if key is not None:
+                item_priority = self.priority_func(kind, item) if self.priority_func else None
+                rows.append((
+                    shard_of(key, shards), kind, key, json.dumps(item, ensure_ascii=False),
+                    priority if item_priority is None else item_priority
+                ))
+
+        if not rows:
+            return queued
+
+        with self.transaction() as conn:
+            for shard, kind, key, item_json, item_priority in rows:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO items (shard, kind, entity_id, item, state, priority) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (shard, kind, key, item_json, item_priority)
+                )
+                queued[kind] += cursor.rowcount
+        return queued
+
+    def take(self, shard: int, owner: str, limit: int) -> List[Tuple[str, Any, int]]:
+        """
+        Take the queued items of a leased shard with the highest priority.
+
+        Args:
+            shard: Shard number
+            owner: Name of the worker holding the lease
+            limit: Maximum number of items
+
+        Returns:
+            (kind, item, priority) tuples
+
+        Raises:
+            ShardLeaseLost: If the worker no longer owns the shard
+        """
+        self.renew(shard, owner)
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT seq, kind, item, priority FROM items WHERE shard = ? AND state = 'queued' "
+                "ORDER BY priority DESC, seq LIMIT ?",
+                (shard, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE items SET state = 'taken', owner = ? WHERE seq = ?",
+                [(owner, row[0]) for row in rows]
+            )
+        return [(kind, json.loads(item), priority) for _, kind, item, priority in rows]
+
+    def complete(self, shard: int, owner: str, succeeded: Iterable[Tuple[str, str]]) -> int:
+        """
+        Mark the items a worker processed as done. Call after their records are saved.
+
+        The worker's other taken items failed (e.g. a fetch gave up after its
+        retries): they are queued again, or marked "failed" once they failed
+        in MAX_ITEM_ATTEMPTS rounds.
+
+        Args:
+            shard: Shard number
+            owner: Name of the worker holding the lease
+            succeeded: (kind, entity_id) pairs of the items processed successfully
+
+        Returns:
+            Number of items marked done
+
+        Raises:
+            ShardLeaseLost: If the worker no longer owns the shard
+        """
+        self.renew(shard, owner)
+        with self.transaction() as conn:
+            done = 0
+            for kind, entity_id in succeeded:
+                done += conn.execute(
+                    "UPDATE items SET state = 'done' "
+                    "WHERE kind = ? AND entity_id = ? AND shard = ? AND owner = ? AND state = 'taken'",
+                    (kind, entity_id, shard, owner)
+                ).rowcount
+            failed = conn.execute("""
+                UPDATE items SET attempts = attempts + 1, owner = NULL,
+                    state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END
+                WHERE shard = ? AND owner = ? AND state = 'taken'
+            """, (MAX_ITEM_ATTEMPTS, shard, owner)).rowcount
+        if failed:
+            self.logger.warning(f"Shard {shard}: {failed} failed items queued again or given up")
+        return done
+
+    def pending_by_kind(self, shard: int) -> Dict[str, int]:
+        """Count queued items of a shard per kind."""
+        return dict(self.query(
+            "SELECT kind, COUNT(*) FROM items WHERE shard = ? AND state = 'queued' GROUP BY kind",
+            (shard,)
+        ))
+
+    def has_orphaned_work(self) -> bool:
+        """Check whether a shard with pending work has no live owner."""
+        return bool(self.query("""
+            SELECT 1 FROM shards s
+            WHERE (s.owner IS NULL OR s.lease_expires < ?)
+            AND (s.seeded = 0 OR EXISTS (
+                SELECT 1 FROM items i WHERE i.shard = s.shard AND i.state IN ('queued', 'taken')
+            ))
+            LIMIT 1
+        """, (time.time(),)))
+
+    def is_idle(self) -> bool:
+        """Check whether the crawl is complete: every shard seeded and no item queued or in progress."""
+        return not self.query("""
+            SELECT 1 FROM shards WHERE seeded = 0
+            UNION ALL
+            SELECT 1 FROM items WHERE state IN ('queued', 'taken')
+            LIMIT 1
+        """)
+
+    def status(self) -> List[Tuple[int, Optional[str], int, int, int, int]]:
+        """
+        Summarize every shard.
+
+        Returns:
+            (shard, owner, queued, taken, done, takeovers) tuples
+        """
+        return self.query("""
+            SELECT s.shard, s.owner,
+                   COUNT(CASE WHEN i.state = 'queued' THEN 1 END),
+                   COUNT(CASE WHEN i.state = 'taken' THEN 1 END),
+                   COUNT(CASE WHEN i.state = 'done' THEN 1 END),
+                   s.takeovers
+            FROM shards s LEFT JOIN items i ON i.shard = s.shard
+            GROUP BY s.shard ORDER BY s.shard
+        """)
+
+    # Output
+
+    def merge_outputs(self, output_dir: str) -> JsonlDataSink:
+        """
+        Append the records written by every shard since the last merge to
+        the main JSON Lines files.
+
+        Only complete lines are copied, so merging while workers are still
+        writing is safe; the rest is picked up by the next merge.
+
+        Args:
+            output_dir: Main output directory (holding shards/)
+
+        Returns:
+            Sink of the main output directory, ready to be exported
+        """
+        data_sink = JsonlDataSink(output_dir, migrate_legacy=True)
+        for shard in range(self.shard_count):
+            shard_sink = JsonlDataSink(str(shard_dir(output_dir, shard)), data_sink.datasets)
+            for dataset in data_sink.datasets:
+                source = shard_sink.get_jsonl_path(dataset)
+                if not source.exists():
+                    continue
+                rows = self.query("SELECT offset FROM merged WHERE shard = ? AND dataset = ?", (shard, dataset))
+                offset = rows[0][0] if rows else 0
+
+                with open(source, "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+                data = data[:data.rfind(b"\n") + 1]
+                if not data:
+                    continue
+
+                with open(data_sink.get_jsonl_path(dataset), "ab") as f:
+                    f.write(data)
+                with self.transaction() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO merged (shard, dataset, offset) VALUES (?, ?, ?)",
+                        (shard, dataset, offset + len(data))
+                    )
+                records = data.count(b"\n")
+                self.logger.info(f"Merged {records} {dataset} records from shard {shard}")
+
+        return data_sink
+
+
+class ShardFrontier:
+    """
+    Frontier of one leased shard, with the interface FrontierScheduler expects.
+
+    Discovered items are routed to the shards owning them. pop() stops after
+    round_size items, so the worker can save its records and mark the round
+    done before taking more work; a worker dying loses at most one round,
+    which its successor takes over. Only items acknowledged with ack() are
+    marked done, the others are queued again.
+    """
+
+    def __init__(self, coordinator: ShardCoordinator, shard: int, owner: str, round_size: int, read_ahead: int = 32):
+        """
+        Initialize shard frontier.
+
+        Args:
+            coordinator: Shared coordinator
+            shard: Leased shard number
+            owner: Name of the worker holding the lease
+            round_size: Maximum number of items handed out per round
+            read_ahead: Number of items taken per query
+        """
+        self.coordinator = coordinator
+        self.shard = shard
+        self.owner = owner
+        self.round_size = round_size
+        self.read_ahead = read_ahead
+        self.handed_out = 0
+        self._succeeded: List[Tuple[str, str]] = []
+        self._buffer = deque()
+        self._lock = threading.Lock()
+
+    def push_many(self, items: Iterable[Tuple[str, Any]], priority: int = 0) -> Dict[str, int]:
+        """Queue discovered items on the shards owning them."""
+        return self.coordinator.push_many(items, priority)
+
+    def ack(self, kind: str, item: Any):
+        """
+        Record that an item of the round was processed successfully.
+
+        Args:
+            kind: Entity type
+            item: Work item
+        """
+        key = self.coordinator.key_func(kind, item)
+        with self._lock:
+            self._succeeded.append((kind, key))
+
+    def pop(self) -> Optional[Tuple[str, Any, int]]:
+        """Take the next item of the shard, or None if it has none or the round is full."""
+        with self._lock:
+            if self.handed_out >= self.round_size:
+                return None
+            if not self._buffer:
+                limit = min(self.read_ahead, self.round_size - self.handed_out)
+                self._buffer.extend(self.coordinator.take(self.shard, self.owner, limit))
+            if not self._buffer:
+                return None
+            self.handed_out += 1
+            return self._buffer.popleft()
+
+    def new_round(self) -> List[Tuple[str, str]]:
+        """
+        Start a new round.
+
+        Returns:
+            (kind, entity_id) pairs of the items acknowledged in the previous
+            round, to be passed to ShardCoordinator.complete()
+        """
+        with self._lock:
+            succeeded, self._succeeded = self._succeeded, []
+            self.handed_out = 0
+            return succeeded
+
+    def pending_by_kind(self) -> Dict[str, int]:
+        """Count queued items of the shard per kind."""
+        with self._lock:
+            counts = Counter(entry[0] for entry in self._buffer)
+        counts.update(self.coordinator.pending_by_kind(self.shard))
+        return dict(counts)
+
+    def __len__(self) -> int:
+        return sum(self.pending_by_kind().values())
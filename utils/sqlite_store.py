@@ -0,0 +1,73 @@
+"""
+SQLite store module for HCMUT LMS Crawler.
+Provides a thread-safe SQLite connection in WAL mode shared by the
+persistent crawl state stores.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class SqliteStore:
+    """Base class for small persistent stores backed by one SQLite file."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the database.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as conn:
+            self._create_tables(conn)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        """Create the store's tables. Overridden by subclasses."""
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run statements atomically while holding the store lock.
+
+        Yields:
+            The underlying connection
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params: tuple = ()) -> list:
+        """
+        Run a read query.
+
+        Args:
+            sql: SQL statement
+            params: Statement parameters
+
+        Returns:
+            All result rows
+        """
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Close the connection."""
+        with self._lock:
+            self._conn.close()